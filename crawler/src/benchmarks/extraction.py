@@ -0,0 +1,53 @@
+"""
+Mede o motor de extração declarativo (`procedure_parsers`) sobre páginas salvas.
+
+Uso (a partir de crawler/src):
+    python -m benchmarks.extraction pagina1.html [pagina2.html ...] [--repeat N]
+
+Cada arquivo é tratado como a página principal de um código; os campos de aba
+são executados sobre o mesmo HTML para medir o custo do motor.
+"""
+import sys
+import time
+import statistics
+
+from procedure_parsers import TAB_FIELDS, classify_page, parse_html, parse_page
+
+def bench(html, repeat):
+    timings = {'classify': [], 'parse_html': [], 'page_fields': [], 'tab_fields': []}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        classify_page(html, 'cpt-codes')
+        timings['classify'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        soup = parse_html(html)
+        timings['parse_html'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        parse_page(soup, True)
+        timings['page_fields'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for field in TAB_FIELDS.values():
+            field(soup)
+        timings['tab_fields'].append(time.perf_counter() - start)
+    return timings
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repeat = 20
+    if '--repeat' in args:
+        index = args.index('--repeat')
+        repeat = int(args[index + 1])
+        del args[index:index + 2]
+
+    totals = {}
+    for path in args:
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        for stage, values in bench(html, repeat).items():
+            totals.setdefault(stage, []).extend(values)
+
+    for stage, values in totals.items():
+        print(f"{stage:<12} median={statistics.median(values) * 1000:.3f}ms mean={statistics.mean(values) * 1000:.3f}ms n={len(values)}")
@@ -0,0 +1,57 @@
+"""
+Verifica o orçamento de tempo de import dos pontos de entrada do crawler.
+
+Cada módulo é importado em um processo novo, com o ambiente vazio (sem as variáveis
+obrigatórias do run), medindo o tempo do import e quais dependências pesadas foram
+carregadas. Sai com status 1 se algum módulo estourar o orçamento ou carregar uma
+dependência que deveria ser lazy.
+
+Uso (a partir de crawler/src):
+    python -m benchmarks.import_time [--budget-ms 300] [módulo ...]
+"""
+import os
+import sys
+import json
+import subprocess
+
+DEFAULT_MODULES = ['procedure_parsers', 'procedure_code', 'reparse', 'discovery']
+HEAVY_MODULES = ['pandas', 'awswrangler', 'pyarrow', 'boto3', 'botocore', 'selenium.webdriver', 'requests']
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'ms': elapsed * 1000, 'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+def measure(module):
+    env = {'PATH': os.environ.get('PATH', ''), 'PYTHONPATH': os.getcwd()}
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return {'ms': None, 'heavy': [], 'error': result.stderr.strip().splitlines()[-1:]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    budget_ms = 300.0
+    if '--budget-ms' in args:
+        index = args.index('--budget-ms')
+        budget_ms = float(args[index + 1])
+        del args[index:index + 2]
+
+    failed = False
+    for module in args or DEFAULT_MODULES:
+        result = measure(module)
+        if result['ms'] is None:
+            failed = True
+            print(f"{module:<18} FAIL import error: {result['error']}")
+            continue
+        ok = result['ms'] <= budget_ms and not result['heavy']
+        failed = failed or not ok
+        heavy = f" heavy={result['heavy']}" if result['heavy'] else ''
+        print(f"{module:<18} {'ok  ' if ok else 'FAIL'} {result['ms']:.0f}ms (budget {budget_ms:.0f}ms){heavy}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,108 @@
+"""
+Mede o custo de logging por código no hot path do crawler: uma mensagem por página e
+uma por letra do ICD-10 CM, como `fetch_procedure_code` e `fetch_icd10_cm` emitem.
+
+Compara o logging antigo (INFO síncrono no stdout a cada item) com o handler em fila
+de `utils.logger`, em texto e JSON, com as mensagens por item amostradas em DEBUG.
+A saída vai para um arquivo temporário no lugar do stdout; os cenários '*_slow_stdout'
+somam uma espera por escrita, como um stdout em pipe com o consumidor atrasado.
+'caller' é o tempo gasto pela thread do crawler; 'total' inclui esvaziar a fila.
+
+Uso (a partir de crawler/src):
+    python -m benchmarks.log_overhead [códigos] [letras por código]
+"""
+import sys
+import time
+import queue
+import logging
+import logging.handlers
+import tempfile
+
+from utils.logger import (
+    DATE_FORMAT, TEXT_FORMAT, ContextFilter, DroppingQueueHandler, JsonFormatter, log_context, log_sampled
+)
+
+URL = 'https://example.com/cpt-codes/'
+SLOW_WRITE_SECONDS = 0.0002
+
+class SlowStream:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        time.sleep(SLOW_WRITE_SECONDS)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+def build_logger(name, formatter, stream, level, asynchronous):
+    stream_handler = logging.StreamHandler(stream)
+    stream_handler.setFormatter(formatter)
+    listener = None
+    if asynchronous:
+        handler = DroppingQueueHandler(queue.Queue(100000))
+        listener = logging.handlers.QueueListener(handler.queue, stream_handler)
+        listener.start()
+    else:
+        handler = stream_handler
+    handler.addFilter(ContextFilter())
+    logger = logging.getLogger(f"benchmark.{name}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(level)
+    return logger, listener
+
+def legacy_hot_path(logger, code, letters):
+    logger.info(f"Extracting procedure modifiers : {URL}{code}")
+    logger.info("Abrindo aba ICD-10 CM X...")
+    logger.info(f"Letras ICD-10 CM disponíveis: {letters}")
+    for letter in letters:
+        logger.info(f"Processando letra: {letter}")
+
+def sampled_hot_path(logger, code, letters):
+    with log_context(code=code):
+        log_sampled(logger, 'page', "Extracting procedure modifiers : %s", URL + code)
+        with log_context(stage='icd10_cm'):
+            logger.debug("Abrindo aba ICD-10 CM X...")
+            log_sampled(logger, 'icd10_letters', "Letras ICD-10 CM disponíveis: %s", letters)
+            for letter in letters:
+                log_sampled(logger, 'icd10_letter', "Processando letra: %s", letter)
+
+TEXT = logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+SCENARIOS = [
+    # nome, hot path, formatter, nível, fila, stdout lento
+    ('sync_text_info', legacy_hot_path, TEXT, logging.INFO, False, False),
+    ('async_text_info', legacy_hot_path, TEXT, logging.INFO, True, False),
+    ('sync_text_info_slow_stdout', legacy_hot_path, TEXT, logging.INFO, False, True),
+    ('async_text_info_slow_stdout', legacy_hot_path, TEXT, logging.INFO, True, True),
+    ('async_text_sampled', sampled_hot_path, TEXT, logging.INFO, True, False),
+    ('async_json_sampled_debug', sampled_hot_path, JsonFormatter(), logging.DEBUG, True, False),
+]
+
+def run(name, hot_path, formatter, level, asynchronous, slow, codes, letters):
+    with tempfile.TemporaryFile('w+') as stream:
+        logger, listener = build_logger(name, formatter, SlowStream(stream) if slow else stream, level, asynchronous)
+        start = time.perf_counter()
+        for index in range(codes):
+            hot_path(logger, f"{99200 + index}", letters)
+        caller = time.perf_counter() - start
+        if listener is not None:
+            listener.stop()
+        stream.flush()
+        total = time.perf_counter() - start
+        written = stream.tell()
+    return caller, total, written
+
+if __name__ == "__main__":
+    codes = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    letter_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    letters = [chr(ord('A') + n % 26) for n in range(letter_count)]
+
+    for name, hot_path, formatter, level, asynchronous, slow in SCENARIOS:
+        caller, total, written = run(name, hot_path, formatter, level, asynchronous, slow, codes, letters)
+        print(
+            f"{name:<28} caller_per_code={caller / codes * 1e6:.1f}us total_per_code={total / codes * 1e6:.1f}us "
+            f"bytes_per_code={written / codes:.0f} codes={codes}"
+        )
@@ -0,0 +1,103 @@
+"""
+Compara o tempo de carregamento de páginas entre o perfil padrão do Chrome e o
+perfil de performance de `get_headless_chrome_driver`.
+
+Uso (a partir de crawler/src):
+    python -m benchmarks.page_load [urls.txt] [repetições]
+
+Sem `urls.txt` (ou com '-'), roda sobre o corpus em benchmarks/fixtures/page_load: páginas
+de código CPT, HCPCS e de índice de intervalos com a mesma carga das páginas do site
+(imagens, fontes, tags de analytics e anúncios), servidas por um servidor local que atrasa
+cada recurso em ASSET_DELAY_SECONDS. Com `urls.txt`, uma URL por linha.
+"""
+import os
+import sys
+import time
+import statistics
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.chrome_config import get_headless_chrome_driver, get_page_load_ms
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'page_load')
+# latência simulada de cada imagem, fonte e script de terceiros do corpus local
+ASSET_DELAY_SECONDS = float(os.environ.get('ASSET_DELAY_SECONDS', 0.15))
+# tamanho e content-type dos recursos gerados pelo servidor, por extensão
+ASSET_TYPES = {
+    '.png': (40000, 'image/png'),
+    '.jpg': (60000, 'image/jpeg'),
+    '.webp': (30000, 'image/webp'),
+    '.svg': (8000, 'image/svg+xml'),
+    '.woff2': (30000, 'font/woff2'),
+    '.js': (20000, 'application/javascript'),
+    '.html': (2000, 'text/html'),
+}
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=FIXTURE_DIR, **kwargs)
+
+    def do_GET(self):
+        if self.path == '/assets/site.css':
+            self.path = '/site.css'
+            return super().do_GET()
+        if self.path.startswith(('/assets/', '/third-party/')):
+            time.sleep(ASSET_DELAY_SECONDS)
+            size, content_type = ASSET_TYPES.get(os.path.splitext(self.path)[1], (1000, 'application/octet-stream'))
+            body = (b'/*' + b' ' * (size - 4) + b'*/') if content_type == 'application/javascript' else b'\0' * size
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        return super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_fixtures():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, name='fixture-server', daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/{name}" for name in sorted(os.listdir(FIXTURE_DIR)) if name.endswith('.html')]
+    return server, urls
+
+def measure(urls, performance_profile, repeat):
+    driver = get_headless_chrome_driver(performance_profile=performance_profile)
+    wall, navigation = [], []
+    try:
+        for _ in range(repeat):
+            for url in urls:
+                start = time.perf_counter()
+                driver.get(url)
+                wall.append((time.perf_counter() - start) * 1000)
+                load_ms = get_page_load_ms(driver)
+                if load_ms is not None:
+                    navigation.append(load_ms)
+    finally:
+        driver.quit()
+    return wall, navigation
+
+def summary(values):
+    if not values:
+        return "n/a"
+    return f"median={statistics.median(values):.0f}ms mean={statistics.mean(values):.0f}ms n={len(values)}"
+
+if __name__ == "__main__":
+    server = None
+    if len(sys.argv) > 1 and sys.argv[1] != '-':
+        with open(sys.argv[1], 'r') as f:
+            urls = [line.strip() for line in f if line.strip()]
+    else:
+        server, urls = serve_fixtures()
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    try:
+        for label, profile in (("default", False), ("performance", True)):
+            wall, navigation = measure(urls, profile, repeat)
+            print(f"{label:<12} driver.get: {summary(wall)} | navigation timing: {summary(navigation)}")
+    finally:
+        if server is not None:
+            server.shutdown()
@@ -0,0 +1,108 @@
+"""
+Compara o custo por código de montar as linhas da extração como DataFrames de uma
+linha (concatenados a cada código) com o de acumular registros e montar o
+DataFrame uma vez por chunk, como o crawler faz hoje.
+
+Uso (a partir de crawler/src):
+    python -m benchmarks.records [códigos por chunk] [repetições]
+"""
+import sys
+import time
+import statistics
+import tracemalloc
+
+import pandas as pd
+
+from procedure_records import (
+    ATHENA_PROCEDURE_CODES_COLUMNS, ATHENA_PROCEDURE_CODE_MODIFIER_COLUMNS, ATHENA_PROCEDURE_CODE_NDC_COLUMNS,
+    ModifierRecord, NdcRecord, ProcedureCodeRecord, records_frame
+)
+
+def sample_values(index):
+    row = dict.fromkeys(ATHENA_PROCEDURE_CODES_COLUMNS)
+    row.update({
+        'code': f"{99200 + index}",
+        'code_type': 'CPT',
+        'main_interval': '99202-99499',
+        'main_interval_name': ['Evaluation and Management Services'],
+        'modifiers': ['25', '59'],
+        'short_description': 'Office or other outpatient visit',
+        'long_description': 'Office or other outpatient visit for the evaluation and management of an established patient',
+        'icd10_cm': [f"A{n:03d}" for n in range(40)],
+    })
+    modifier_rows = [['25', 'Significant, separately identifiable E/M service'], ['59', 'Distinct procedural service']]
+    ndc_rows = [{'ndc_alternate_id': '00000-0000-01', 'drug_name': 'drug', 'labeler_name': 'labeler', 'hcpcs_dosage': '1 mg', 'bill_unit': '1'}]
+    return row, modifier_rows, ndc_rows
+
+def dataframe_result(index):
+    row, modifier_rows, ndc_rows = sample_values(index)
+    return (
+        pd.DataFrame([row], columns=ATHENA_PROCEDURE_CODES_COLUMNS),
+        pd.DataFrame(modifier_rows, columns=ATHENA_PROCEDURE_CODE_MODIFIER_COLUMNS),
+        pd.DataFrame(ndc_rows, columns=ATHENA_PROCEDURE_CODE_NDC_COLUMNS),
+    )
+
+def record_result(index):
+    row, modifier_rows, ndc_rows = sample_values(index)
+    return (
+        ProcedureCodeRecord(*(row[column] for column in ATHENA_PROCEDURE_CODES_COLUMNS)),
+        [ModifierRecord(*modifier_row) for modifier_row in modifier_rows],
+        [NdcRecord(**ndc_row) for ndc_row in ndc_rows],
+    )
+
+def dataframes_per_code(chunk_size):
+    df_codes = pd.DataFrame(columns=ATHENA_PROCEDURE_CODES_COLUMNS)
+    df_modifiers = pd.DataFrame(columns=ATHENA_PROCEDURE_CODE_MODIFIER_COLUMNS)
+    df_ndc = pd.DataFrame(columns=ATHENA_PROCEDURE_CODE_NDC_COLUMNS)
+    for index in range(chunk_size):
+        procedure_code, df_modifier, df_code_ndc = dataframe_result(index)
+        df_codes = pd.concat([df_codes, procedure_code], ignore_index=True)
+        df_modifiers = pd.concat([df_modifiers, df_modifier], ignore_index=True)
+        df_ndc = pd.concat([df_ndc, df_code_ndc], ignore_index=True)
+    return df_codes, df_modifiers, df_ndc
+
+def records_per_chunk(chunk_size):
+    procedure_codes, modifiers, ndcs = [], [], []
+    for index in range(chunk_size):
+        procedure_code, code_modifiers, code_ndcs = record_result(index)
+        procedure_codes.append(procedure_code)
+        modifiers.extend(code_modifiers)
+        ndcs.extend(code_ndcs)
+    return (
+        records_frame(procedure_codes, ProcedureCodeRecord),
+        records_frame(modifiers, ModifierRecord),
+        records_frame(ndcs, NdcRecord),
+    )
+
+def retained_bytes(build_result, chunk_size):
+    """Memória retida por código ao manter o resultado da extração (chunk em montagem, fila de retry)."""
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    results = [build_result(index) for index in range(chunk_size)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return (current - baseline) / chunk_size
+
+def measure(build, chunk_size, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build(chunk_size)
+        timings.append((time.perf_counter() - start) / chunk_size)
+    return timings
+
+if __name__ == "__main__":
+    chunk_size = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    for label, build, build_result in [
+        ('dataframes', dataframes_per_code, dataframe_result),
+        ('records', records_per_chunk, record_result),
+    ]:
+        timings = measure(build, chunk_size, repeat)
+        retained = retained_bytes(build_result, chunk_size)
+        print(
+            f"{label:<10} per_code median={statistics.median(timings) * 1000:.3f}ms "
+            f"retained_per_code={retained / 1024:.1f}KiB chunk={chunk_size} n={repeat}"
+        )
@@ -0,0 +1,107 @@
+"""
+Tabela "current" dos procedure codes: uma linha por código, com o estado mais recente.
+
+A tabela de procedure codes é append-only (uma linha por código a cada run). Ao final do
+run, só as linhas gravadas por ele — os arquivos com os prefixos de `output_file_prefix`
+usados no run — são aplicadas por MERGE numa tabela Iceberg chaveada por `code`, e a
+leitura do estado atual deixa de deduplicar o histórico inteiro.
+
+Na primeira execução a tabela é criada por CTAS a partir do histórico, com a linha mais
+recente de cada código pela coluna `crawled_at` gravada no flush (linhas anteriores a ela
+usam a data de modificação do arquivo).
+"""
+import re
+import time
+
+from procedure_config import CONFIG
+from procedure_records import ATHENA_PROCEDURE_CODES_COLUMNS
+from utils.athena import athena_execute_query, athena_table_exists
+from utils.logger import get_logger
+
+logger = get_logger('current_snapshot')
+
+QUERY_LATEST_ROWS = """
+SELECT {columns} FROM (
+    SELECT {columns}, row_number() OVER (
+        PARTITION BY code ORDER BY coalesce(crawled_at, CAST("$file_modified_time" AS timestamp)) DESC
+    ) AS row_rank
+    FROM "{schema}"."{table}"
+    WHERE code IS NOT NULL {where}
+) WHERE row_rank = 1
+"""
+
+QUERY_CREATE_CURRENT = """
+CREATE TABLE "{schema}"."{current_table}"
+WITH (table_type = 'ICEBERG', location = '{location}', is_external = false)
+AS {latest_rows}
+"""
+
+QUERY_MERGE_CURRENT = """
+MERGE INTO "{schema}"."{current_table}" AS t
+USING ({latest_rows}) AS s
+ON t.code = s.code
+WHEN MATCHED THEN UPDATE SET {updates}
+WHEN NOT MATCHED THEN INSERT ({columns}) VALUES ({values})
+"""
+
+def current_snapshot_enabled():
+    return bool(CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_CURRENT_TABLE_NAME and CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_CURRENT_TABLE_LOCATION)
+
+def _quoted(columns):
+    return ', '.join(f'"{column}"' for column in columns)
+
+def file_prefix_filter(prefixes):
+    """Filtro de "$path" que seleciona só os arquivos com os prefixos gravados no run."""
+    pattern = '|'.join(re.escape(prefix) for prefix in sorted(prefixes))
+    return f"""AND regexp_like("$path", '/({pattern})[^/]*$')"""
+
+def latest_rows_query(where=''):
+    return QUERY_LATEST_ROWS.format(
+        columns=_quoted(ATHENA_PROCEDURE_CODES_COLUMNS),
+        schema=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA,
+        table=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_NAME,
+        where=where
+    )
+
+def create_current_query():
+    return QUERY_CREATE_CURRENT.format(
+        schema=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA,
+        current_table=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_CURRENT_TABLE_NAME,
+        location=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_CURRENT_TABLE_LOCATION,
+        latest_rows=latest_rows_query()
+    )
+
+def merge_current_query(prefixes, skipped_columns=()):
+    """
+    MERGE das linhas do run na tabela current. Colunas puladas pelo perfil de campos
+    (CRAWL_FIELDS) não entram no UPDATE: o código mantém o valor do último run completo.
+    """
+    updates = [column for column in ATHENA_PROCEDURE_CODES_COLUMNS if column != 'code' and column not in skipped_columns]
+    return QUERY_MERGE_CURRENT.format(
+        schema=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA,
+        current_table=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_CURRENT_TABLE_NAME,
+        latest_rows=latest_rows_query(file_prefix_filter(prefixes)),
+        updates=', '.join(f'"{column}" = s."{column}"' for column in updates),
+        columns=_quoted(ATHENA_PROCEDURE_CODES_COLUMNS),
+        values=', '.join(f's."{column}"' for column in ATHENA_PROCEDURE_CODES_COLUMNS)
+    )
+
+def merge_current_snapshot(prefixes, skipped_columns=()):
+    """
+    Aplica na tabela current as linhas gravadas com os prefixos do run.
+    """
+    if not current_snapshot_enabled():
+        return
+    if not prefixes:
+        logger.info("Nenhuma linha gravada no run, tabela current inalterada.")
+        return
+    start = time.perf_counter()
+    schema = CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA
+    current_table = CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_CURRENT_TABLE_NAME
+    if not athena_table_exists(schema, current_table):
+        logger.info(f"Criando a tabela current {schema}.{current_table} a partir do histórico")
+        athena_execute_query(create_current_query(), database=schema, s3_output=CONFIG.ATHENA_QUERY_OUTPUT_LOCATION)
+    else:
+        athena_execute_query(merge_current_query(prefixes, skipped_columns), database=schema, s3_output=CONFIG.ATHENA_QUERY_OUTPUT_LOCATION)
+    elapsed = time.perf_counter() - start
+    logger.info(f"({elapsed:.1f}s) Tabela current {schema}.{current_table} atualizada com os arquivos {sorted(prefixes)}")
@@ -0,0 +1,116 @@
+"""
+Descoberta dos códigos existentes no site a partir das páginas de índice de intervalos.
+
+As páginas de intervalo são percorridas em largura, em paralelo, coletando os links de
+subintervalos e de códigos. O conjunto descoberto é comparado com a entrada do Athena
+para separar códigos novos, retirados e os que precisam ser atualizados.
+"""
+import os
+import time
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+
+from procedure_parsers import RE_CODE_LINK, RE_RANGE_LINK, parse_html, parse_page
+from utils.logger import get_logger
+from utils.lazy import lazy_import
+
+requests = lazy_import('requests')
+pd = lazy_import('pandas')
+
+logger = get_logger('discovery')
+
+DISCOVERY_WORKERS = int(os.environ.get('DISCOVERY_WORKERS', 8))
+DISCOVERY_TIMEOUT_SECONDS = float(os.environ.get('DISCOVERY_TIMEOUT_SECONDS', 30))
+DISCOVERY_STALE_DAYS = float(os.environ.get('DISCOVERY_STALE_DAYS', 30))
+DISCOVERY_MAX_PAGES = int(os.environ.get('DISCOVERY_MAX_PAGES', 5000))
+
+RANGE_INDEX_URLS = [
+    "xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx",
+    "xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx",
+]
+
+def fetch_range_page(session, url):
+    response = session.get(url, timeout=DISCOVERY_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    html = response.text
+
+    range_urls = {urljoin(url, match.group(0)) for match in RE_RANGE_LINK.finditer(html)}
+    codes = {match.group(1).upper() for match in RE_CODE_LINK.finditer(html)}
+
+    interval = None
+    page_values = parse_page(parse_html(html), is_cpt='cpt' in url.lower())
+    if page_values.get('leaf_interval'):
+        interval = (page_values['leaf_interval'], page_values['main_interval'], page_values['main_interval_name'])
+    return range_urls, codes, interval
+
+def discover_codes(root_urls=RANGE_INDEX_URLS, workers=DISCOVERY_WORKERS, interval_index=None):
+    """
+    Percorre as páginas de intervalo a partir de `root_urls` e retorna o conjunto de códigos encontrados.
+    Levanta RuntimeError se alguma página falhar ou se o limite DISCOVERY_MAX_PAGES for atingido
+    antes do fim da travessia: um conjunto incompleto não pode ser comparado com a entrada.
+    Os intervalos lidos nos breadcrumbs alimentam `interval_index`, quando informado.
+    """
+    start = time.perf_counter()
+    session = requests.Session()
+    session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers))
+
+    seen = set(root_urls)
+    frontier = list(root_urls)
+    discovered = set()
+    failed = 0
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='discovery') as executor:
+        while frontier and len(seen) <= DISCOVERY_MAX_PAGES:
+            futures = {url: executor.submit(fetch_range_page, session, url) for url in frontier}
+            frontier = []
+            for url, future in futures.items():
+                try:
+                    range_urls, codes, interval = future.result()
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"Falha ao ler a página de intervalo {url}: {e}")
+                    continue
+                discovered |= codes
+                if interval and interval_index is not None:
+                    # página de intervalo sem links de subintervalo: é folha e lista os códigos
+                    interval_index.add(*interval, is_leaf=not range_urls)
+                for range_url in range_urls - seen:
+                    seen.add(range_url)
+                    frontier.append(range_url)
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"({elapsed:.1f}s) {len(discovered)} códigos descobertos em {len(seen)} páginas de intervalo ({failed} falhas)")
+    if failed:
+        raise RuntimeError(f"{failed} páginas de intervalo falharam; conjunto descoberto incompleto")
+    if frontier:
+        # parar no limite deixaria os códigos das páginas não visitadas como retirados
+        raise RuntimeError(
+            f"Limite de {DISCOVERY_MAX_PAGES} páginas de intervalo atingido com {len(frontier)} páginas por visitar; "
+            f"conjunto descoberto incompleto"
+        )
+    return discovered
+
+def plan_crawl(discovered, input_codes, df_history=None, stale_days=DISCOVERY_STALE_DAYS):
+    """
+    Retorna (códigos a coletar, novos, retirados): os novos (no site e fora da entrada),
+    mais os da entrada que ainda existem no site e estão desatualizados. Sem histórico,
+    todos os códigos da entrada que ainda existem são considerados desatualizados.
+    """
+    input_set = set(input_codes)
+    new_codes = discovered - input_set
+    retired_codes = input_set - discovered
+    active_codes = [code for code in input_codes if code in discovered]
+
+    if df_history is not None and not df_history.empty:
+        cutoff = pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=stale_days)
+        last_crawled_at = pd.to_datetime(df_history['last_crawled_at'], utc=True, errors='coerce')
+        fresh = set(df_history.loc[last_crawled_at >= cutoff, 'code'])
+        stale_codes = [code for code in active_codes if code not in fresh]
+    else:
+        stale_codes = active_codes
+
+    logger.info(
+        f"Discovery: {len(new_codes)} novos, {len(retired_codes)} retirados, "
+        f"{len(stale_codes)} desatualizados de {len(active_codes)} ativos"
+    )
+    return sorted(new_codes) + stale_codes, new_codes, retired_codes
@@ -1,257 +1,141 @@
-import pandas as pd
 import time
-import re
 import os
 import sys
 import logging
 import json
+import multiprocessing
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from bs4 import BeautifulSoup
-from datetime import datetime
+from procedure_parsers import (
+    PAGE_KIND_404, PAGE_KIND_DELETED, PAGE_KIND_GENERIC,
+    classify_page, get_deleted, has_logout_header, parse_capture, parse_html, stages_for_columns
+)
+from procedure_records import (
+    ATHENA_PROCEDURE_CODES_COLUMNS, ModifierRecord, NdcRecord, ProcedureCodeRecord,
+    records_frame, resolve_fields, with_row_metadata
+)
+from datetime import datetime, timezone
 from utils.chrome_config import get_headless_chrome_driver
 from utils.s3 import s3_athena_load_table_parquet_snappy
 from utils.athena import athena_get_generator
 from utils.login import aapc_login
 from utils.config import PROJECT_PATH
-from utils.logger import get_logger
+from utils.logger import get_logger, log_context, log_sampled
 from utils.secret_manager import get_secret
+from utils.postgres import postgres_copy_upsert
+from utils.retry_queue import RetryQueue
+from utils.driver_manager import ManagedDriver
+from utils.driver_pool import DriverPool
+from utils.scheduler import prioritize_codes
+from utils.run_budget import RunBudget, load_progress, save_progress
+from utils.concurrency import AdaptiveConcurrency
+from utils.validation import OutputValidator, load_fill_rates, save_fill_rates, write_quarantine
+from utils.html_archive import HtmlArchive
+from utils.interval_index import IntervalIndex, INTERVAL_DIMENSION_COLUMNS
+from discovery import discover_codes, plan_crawl
+from current_snapshot import merge_current_snapshot
+from utils.leases import LeaseRenewer, postgres_lease_store, sqlite_lease_store
+from utils.lazy import lazy_import
+from procedure_config import CONFIG
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+pd = lazy_import('pandas')
+By = lazy_import('selenium.webdriver.common.by', 'By')
+WebDriverWait = lazy_import('selenium.webdriver.support.ui', 'WebDriverWait')
+EC = lazy_import('selenium.webdriver.support.expected_conditions')
 
 logger = get_logger('procedure_codes')
 
 
-LOGICAL_DATE = os.environ['LOGICAL_DATE']
-AAPC_SECRET_ID = os.environ['AAPC_SECRET_ID']
+CHUNK_SIZE = 200
 
-ATHENA_QUERY_OUTPUT_LOCATION = os.environ['ATHENA_QUERY_OUTPUT_LOCATION']
-ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA = os.environ['ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA']
-ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_NAME = os.environ['ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_NAME']
-ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_LOCATION = os.environ['ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_LOCATION']
-ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_SCHEMA = os.environ['ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_SCHEMA']
-ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_NAME = os.environ['ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_NAME']
-ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_LOCATION = os.environ['ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_LOCATION']
-ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_SCHEMA = os.environ['ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_SCHEMA']
-ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_NAME = os.environ['ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_NAME']
-ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_LOCATION = os.environ['ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_LOCATION']
+# tabela de crosswalk -> (coluna array na tabela de procedure codes, chave de lookup)
+ATHENA_PROCEDURE_CROSSWALK_TABLES = {
+    'procedure_code_x_icd10_cm': ('icd10_cm', 'icd10_cm'),
+    'procedure_code_x_icd10_pcs': ('icd_10_pcs_x', 'icd10_pcs'),
+    'procedure_code_x_revenue_code': ('revenue_lookup', 'revenue_code'),
+    'procedure_code_x_modifier': ('modifiers', 'modifier'),
+}
+ATHENA_PROCEDURE_CROSSWALK_BUCKETS = 16
 
-ATHENA_PROCEDURE_CODES_COLUMNS = ['code', 'code_type', 'main_interval', 'main_interval_name', 'modifiers', 'short_description', 'long_description', 'description', 'summary', 'date_deleted', 'betos_code', 'betos_description', 'guidelines', 'advice', 'lay_term', 'report', 'revenue_lookup', 'icd10_cm', 'ndc_alternate_id', 'icd_10_pcs_x', 'cpt_code_symbols']
-ATHENA_PROCEDURE_CODE_MODIFIER_COLUMNS = ['modifier', 'description']
-ATHENA_PROCEDURE_CODE_NDC_COLUMNS = ['ndc_alternate_id', 'drug_name', 'labeler_name', 'hcpcs_dosage', 'bill_unit']
-
-logger.info(f"Running on date: {LOGICAL_DATE}")
+# tabela espelho no Postgres -> chave do upsert
+POSTGRES_MIRROR_TABLES = {
+    'procedure_code': ['code'],
+    'procedure_code_modifier': ['modifier'],
+    'procedure_code_ndc': ['ndc_alternate_id'],
+}
 
 QUERY_DQL_PROCEDURE_CODE = 'src/queries/dql_procedure_code.sql'
 QUERY_DQL_PROCEDURE_CODE_MODIFIER = 'src/queries/dql_procedure_code_modifiers.sql'
 QUERY_DQL_PROCEDURE_CODE_NDC= 'src/queries/dql_procedure_code_ndc.sql'
+QUERY_DQL_PROCEDURE_CODE_HISTORY = 'src/queries/dql_procedure_code_history.sql'
 BASE_SITE="xxxxxxxxxxxxxxxxxxxxxxxx"
-URL_LOGIN="xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx"
 
-def is_error_404_page(soup):
-    return bool(soup.find('div', class_='container404'))
-
-def is_deleted_hcpcs_page(soup):
-    h1_tag = soup.find('h1')
-    return h1_tag and 'Deleted HCPCS Codes' in h1_tag.get_text(strip=True)
-
-def get_deleted(driver, soup):
-
-    deleted_span = soup.find('span', string=re.compile(r'\bDeleted\b', re.IGNORECASE))
-    if not deleted_span:
-        return None  
-
-    date_deleted = None
-    alert_div = soup.find('div', class_='alert alert-danger')
-    if alert_div:
-        date_deleted = alert_div.get_text(separator=' ', strip=True)
-        date_deleted = ' '.join(date_deleted.split())
-
-    advice = None
-    for div in soup.find_all('div'):
-        text = div.get_text(separator=' ', strip=True)
-        if 'Advice:' in text:
-            p = div.find('p')
-            if p:
-                adv_text = p.get_text(strip=True)
-            else:
-                parts = text.split('Advice:', 1)
-                adv_text = parts[1].strip() if len(parts) > 1 else text.strip()
-            advice = ' '.join(adv_text.split())
-            break
+INTERVAL_INDEX = IntervalIndex()
+# início do processo (UTC), no prefixo dos arquivos gravados
+RUN_STARTED_AT = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
+# criado no início do run quando HTML_ARCHIVE_PATH está definido
+HTML_ARCHIVE = None
+# abas do perfil CRAWL_FIELDS (None = todas) e colunas gravadas nulas por ele; definidos no início do run
+FIELD_STAGES = None
+SKIPPED_COLUMNS = ()
+URL_LOGIN="xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx"
 
-    lay_term = None
-    layterm_divs = soup.find_all('div', class_='panel-body tab-pane')
-    for div in layterm_divs:
-        text = div.get_text(separator=' ', strip=True)
-        if 'The provider administers the first dose' in text and 'COVID–19' in text:
-            lay_term = text.strip()
-            break
+# tabelas do ICD-10 CM visíveis para a letra selecionada (as das demais letras ficam ocultas)
+JS_VISIBLE_POINTS_TABLES = (
+    "return Array.from(document.querySelectorAll('table.points_table'))"
+    ".filter(t => t.offsetParent !== null).map(t => t.outerHTML).join('');"
+)
+# status HTTP da navegação (Navigation Timing); undefined/0 em navegadores sem responseStatus
+JS_NAVIGATION_STATUS = (
+    "const entry = performance.getEntriesByType('navigation')[0];"
+    "return entry && entry.responseStatus ? entry.responseStatus : null;"
+)
+
+def navigation_status(driver):
+    try:
+        return driver.execute_script(JS_NAVIGATION_STATUS)
+    except Exception:
+        return None
 
-    guidelines = None
-    for div in layterm_divs:
-        text = div.get_text(separator=' ', strip=True)
-        if 'Guidelines found' in text or 'No CPT' in text or 'No HCPCS' in text:
-            guidelines = text.strip()
+def is_login_url(current_url):
+    return current_url.lower().startswith(URL_LOGIN.lower())
+
+def is_login_page(current_url, html):
+    return is_login_url(current_url) or has_logout_header(html)
+
+def capture_element(driver, css_selector):
+    """
+    Snapshot (outerHTML) do primeiro elemento do seletor, em lista vazia se ele não existir:
+    só o painel da aba segue para o parse, não a página inteira.
+    """
+    elements = driver.find_elements(By.CSS_SELECTOR, css_selector)
+    return [elements[0].get_attribute('outerHTML')] if elements else []
+
+def fetch_tab(driver, tab_selector, pane_selector):
+    if safe_click_tab(driver, tab_selector):
+        return capture_element(driver, pane_selector)
+    return []
+
+def fetch_betos(driver):
+    snapshots = []
+    for tab_selector, pane_selector in [('a[href="#cpt_betos"]', 'div#cpt_betos'), ('a[href="#hcpcs_betos"]', 'div#hcpcs_betos')]:
+        snapshots += fetch_tab(driver, tab_selector, pane_selector)
+        if snapshots and ('Code:' in snapshots[-1] or 'Description:' in snapshots[-1]):
             break
-        
-    description = None
-    panels = soup.find_all('div', class_='panel panel-default')
-    for panel in panels:
-        heading = panel.find('div', class_='panel-heading')
-        if heading and 'Code Descriptor' in heading.get_text():
-            body = panel.find('div', class_='panel-body tab-pane')
-            if body:
-                raw_text = body.get_text(strip=True, separator=' ')
-                description = re.sub(r'\s+', ' ', raw_text)
-                break
+    return 'betos', snapshots
 
-    return date_deleted, advice, lay_term, guidelines, description
-
-def get_short_description(soup, is_cpt):
-    short_description = ''
-    description_div = soup.find('div', class_='layout2_code')
-    if description_div:
-        h1_tag = description_div.find('h1')
-        if h1_tag:
-            full_text = h1_tag.get_text().strip()
-            parts = full_text.split(',', 1)
-            if len(parts) > 1:
-                short_description = parts[1].strip()
-            else:
-                short_description = full_text
-    return short_description
-
-def get_long_description(soup):
-    long_description = ''
-    second_text_div = soup.find('div', class_='sub_head_detail')
-    if second_text_div:
-        long_description = second_text_div.get_text().strip()
-    else:
-        h2_tag = soup.find('h2', class_='sub_head_detail')
-        if h2_tag:
-            long_description = h2_tag.get_text().strip()
-    return long_description
-
-def get_main_interval_name(soup):
-    main_interval_name = []
-
-    breadcrumbs_div = soup.find('div', class_='div newbread')
-    if not breadcrumbs_div:
-        breadcrumbs_div = soup.find('div', class_='newbread logout-header')
-
-    if breadcrumbs_div:
-        all_divs = breadcrumbs_div.find_all('div', class_='div')
-        
-        index_start = -1
-        for i, div in enumerate(all_divs):
-            a_tag = div.find('a')
-            if a_tag and a_tag.get_text(strip=True) in ["CPT Codes", "HCPCS Codes"]:
-                index_start = i
-
-        if index_start != -1:
-            for div in all_divs[index_start + 1:]:
-                if div.find('a'):
-                    span = div.find('span')
-                    if span:
-                        main_interval_name.append(span.get_text(strip=True))
-                else:
-                    break
-
-    return main_interval_name if main_interval_name else None
-
-def get_main_interval(soup, is_cpt):
-    main_interval = ''
-    breadcrumbs_div = soup.find('div', class_='div newbread')
-
-    if breadcrumbs_div:
-        if is_cpt:
-            links = breadcrumbs_div.find_all('a', href=True)
-            for link in links:
-                href = link['href']
-                match = re.search(r'/cpt-codes-range/(\d{4,5}T?-\d{4,5}T?)/', href)
-                if match:
-                    main_interval = match.group(1)
-                    break
-        else:
-            span_elements = breadcrumbs_div.find_all('span')
-            for span in span_elements:
-                text = span.get_text().strip()
-                match = re.search(r'\b([A-Z]\d{4}-[A-Z]\d{4})\b', text)
-                if match:
-                    main_interval = match.group(1)
-                    break
-    return main_interval
-
-def get_modifier_description(soup):
-    data = []
-    modifier_codes = []
-    
-    divDescription = soup.find('div', class_='modcross_list')
-    if divDescription:
-        table = divDescription.find('tbody')
-        if table:
-            rows = table.find_all('tr')
-            for row in rows:
-                cells = row.find_all('td')
-                if cells and len(cells) >= 2:
-                    modifier = cells[0].get_text().strip()
-                    modifier_description = cells[1].get_text().strip()
-                    data.append([modifier, modifier_description])
-                    modifier_codes.append(modifier)
-                    
-    return data, modifier_codes
-
-def get_betos(driver):
-    betos_code = None
-    betos_description = None
-    
-    betos_div = extract_tab_content_with_fallback(
-        driver,
-        tab_selectors=['a[href="#cpt_betos"]', 'a[href="#hcpcs_betos"]'],
-        div_ids=['cpt_betos', 'hcpcs_betos']
-    )
+def fetch_guidelines(driver):
+    return 'guidelines', fetch_tab(driver, 'a[href="#cpt_guidelines"]', 'div#cpt_guidelines')
 
-    if betos_div:
-        for inner_div in betos_div.find_all('div'):
-            strong_tag = inner_div.find('strong')
-            if strong_tag:
-                if 'Code:' in strong_tag.text:
-                    betos_code = inner_div.get_text().replace('Code:', '').strip()
-                elif 'Description:' in strong_tag.text:
-                    betos_description = inner_div.get_text().replace('Description:', '').strip()
-                    
-    return betos_code, betos_description
-
-def get_guidelines(driver):
-    guidelines = None
-    if safe_click_tab(driver, 'a[href="#cpt_guidelines"]'):
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        div = soup.find('div', id='cpt_guidelines')
-        if div:
-            guidelines = div.get_text(separator=' ', strip=True)
-            
-    return guidelines
-
-def get_advice(driver):
-    advice = None
-    if safe_click_tab(driver, 'a[href="#cpt_advice"]'):
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        div = soup.find('div', id='cpt_advice')
-        if div:
-            advice = div.get_text(separator=' ', strip=True)
-    return advice
-
-def get_lay_term(driver):
-    lay_term = None
-    summary = None
+def fetch_advice(driver):
+    return 'advice', fetch_tab(driver, 'a[href="#cpt_advice"]', 'div#cpt_advice')
 
+def fetch_lay_term(driver):
     tab_clicked = safe_click_tab(driver, 'a[href="#cpt_layterm"]') or safe_click_tab(driver, 'a[href="#hcpcs_layterm"]')
     if not tab_clicked:
-        logger.info("Aba 'Lay Term' não disponível.")
-        return None, None
+        logger.debug("Aba 'Lay Term' não disponível.")
+        return 'lay_term', []
 
     time.sleep(0.5)
 
@@ -270,79 +154,32 @@ def get_lay_term(driver):
         WebDriverWait(driver, 3).until(
             EC.presence_of_element_located((By.ID, 'fullLayterm'))
         )
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        full_div = soup.find('div', id='fullLayterm')
-
-        if full_div:
-            first_p = full_div.find('p')
-            if first_p:
-                summary = first_p.get_text(strip=True)
-
-            read_less_link = full_div.find('a', string=re.compile(r'Read Less', re.IGNORECASE))
-            if read_less_link:
-                read_less_link.decompose()
-
-            lay_term = full_div.get_text(separator=' ', strip=True)
-
-            if lay_term.lower().endswith("read less"):
-                lay_term = lay_term[:-len("Read Less")].strip()
+        return 'lay_term', capture_element(driver, 'div#fullLayterm')
 
     except Exception as e:
         logger.error(f"Erro ao extrair conteúdo do Lay Term: {e}")
 
-    return summary, lay_term
+    return 'lay_term', []
 
-def get_report(driver):
-    report = None
-    if safe_click_tab(driver, 'a[href="#cpt_report"]'):
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        div = soup.find('div', id='cpt_report')
-        if div:
-            report = div.get_text(separator=' ', strip=True)
-    return report
-
-def get_revenue_code_lookup(driver):
-    revenue_lookup_array = None
+def fetch_report(driver):
+    return 'report', fetch_tab(driver, 'a[href="#cpt_report"]', 'div#cpt_report')
 
+def fetch_revenue_code_lookup(driver):
     if safe_click_tab(driver, 'a[href="#cpt_revenue_lookup"]'):
         try:
             WebDriverWait(driver, 10).until(
                 lambda d: "loading" not in d.find_element(By.ID, "cpt_revenue_cross").text.lower()
             )
             time.sleep(0.5)
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            revenue_div = soup.find('div', id='cpt_revenue_cross')
-
-            if revenue_div:
-                if "Data Not Available" in revenue_div.get_text():
-                    logger.info("Revenue lookup: Dados não disponíveis.")
-                    revenue_lookup_array = None 
-                else:
-                    table = revenue_div.select_one('table.points_table')
-                    if table:
-                        rows = table.find_all('tr')
-                        extracted_codes = []
-                        for row in rows[1:]:  
-                            cols = row.find_all('td')
-                            if len(cols) >= 1:
-                                rev_code = cols[0].get_text(strip=True)
-                                if rev_code:
-                                    extracted_codes.append(rev_code)
-
-                        revenue_lookup_array = extracted_codes if extracted_codes else []
-                        if not revenue_lookup_array:
-                            logger.debug("Revenue Code Lookup: Nenhum código extraído.")
-                    else:
-                        logger.debug("Revenue Code Lookup: Tabela não encontrada.")
-            else:
-                logger.debug("Revenue Code Lookup: Div não encontrada.")
+            return 'revenue_lookup', capture_element(driver, 'div#cpt_revenue_cross')
         except Exception as e:
             logger.error(f"Erro no carregamento da aba Revenue Code Lookup: {e}")
-    return revenue_lookup_array
+            raise e
+    return 'revenue_lookup', []
 
-def get_icd10_cm(driver):
-    icd10_results = []
-    logger.info("Abrindo aba ICD-10 CM X...")
+def fetch_icd10_cm(driver):
+    snapshots = []
+    logger.debug("Abrindo aba ICD-10 CM X...")
 
     try:
         icd10_tab = WebDriverWait(driver, 10).until(
@@ -353,7 +190,7 @@ def get_icd10_cm(driver):
         time.sleep(1.0)
     except TimeoutException:
         logger.warning("Aba 'ICD-10 CM X' não encontrada.")
-        return None
+        return 'icd10_cm', []
 
     try:
         WebDriverWait(driver, 10).until(
@@ -361,304 +198,376 @@ def get_icd10_cm(driver):
         )
     except TimeoutException:
         logger.warning("Botões de letras ICD-10 CM não encontrados.")
-        return None
+        return 'icd10_cm', []
 
     letter_buttons = driver.find_elements(By.CSS_SELECTOR, 'a.ab_links')
     available_letters = [btn.text.strip() for btn in letter_buttons if btn.text.strip()]
 
     if not available_letters:
-        logger.info("Nenhuma letra encontrada na aba ICD-10 CM.")
-        return None
-    else:
-        logger.info(f"Letras ICD-10 CM disponíveis: {available_letters}")
-        for letter in available_letters:
-            logger.info(f"Processando letra: {letter}")
-            try:
-                letter_button = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((
-                        By.XPATH,
-                        f'//a[contains(@class, "ab_links") and normalize-space(text())="{letter}"]'
-                    ))
-                )
-                if 'selected' not in letter_button.get_attribute('class'):
-                    driver.execute_script("arguments[0].scrollIntoView(true);", letter_button)
-                    driver.execute_script("arguments[0].click();", letter_button)
-                    time.sleep(0.5)
-
-                WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "table.points_table tbody tr td"))
-                )
-
-                rows = driver.find_elements(By.CSS_SELECTOR, "table.points_table tbody tr")
-                for row in rows:
-                    cols = row.find_elements(By.TAG_NAME, "td")
-                    texts = [col.text.strip() for col in cols]
-                    if len(texts) >= 1 and texts[0]:
-                        code_cm = texts[0].replace('.', '')
-                        icd10_results.append(code_cm)
-
-            except TimeoutException:
-                logger.warning(f"Tabela não encontrada para a letra: {letter}. Pulando...")
-
-    return icd10_results if icd10_results else None
-
-def get_ndc(driver):
-    ndc_full_extracted_data = None
-    ndc_full = None
-    alternate_ids = []
-
-    if safe_click_tab(driver, 'a[href="#ndc"]'):
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        div = soup.find('div', id='ndc')
-        if div:
-            table = div.find('table')
-            if table:
-                rows = table.select('tbody tr')
-                ndc_rows = []
-                for row in rows:
-                    cols = row.find_all('td')
-                    if cols:
-                        values = [col.text.strip() for col in cols]
-                        if any(values):  # ao menos uma célula com conteúdo
-                            ndc_rows.append(values)
-                ndc_full = ndc_rows if ndc_rows else None
-            else:
-                logger.info("Tabela NDC não encontrada.")
-        else:
-            logger.info("Div #ndc não encontrada.")
-    else:
-        logger.info("Aba NDC não disponível ou não clicável.")
-
-    if ndc_full:
-        ndc_full_extracted_data = []
-        for row in ndc_full:
-            if len(row) >= 5:
-                alternate_ids.append(row[0])
-                ndc_full_extracted_data.append({
-                    'ndc_alternate_id': row[0],
-                    'drug_name': row[1],
-                    'labeler_name': row[2],
-                    'hcpcs_dosage': row[3],
-                    'bill_unit': row[4].strip() if row[4] else ''
-                })
-
-    return alternate_ids if alternate_ids else None, ndc_full_extracted_data
-
-def get_icd_pcs_x(driver):
-    pcs = None
+        logger.debug("Nenhuma letra encontrada na aba ICD-10 CM.")
+        return 'icd10_cm', []
+
+    log_sampled(logger, 'icd10_letters', "Letras ICD-10 CM disponíveis: %s", available_letters)
+    for letter in available_letters:
+        log_sampled(logger, 'icd10_letter', "Processando letra: %s", letter)
+        try:
+            letter_button = WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((
+                    By.XPATH,
+                    f'//a[contains(@class, "ab_links") and normalize-space(text())="{letter}"]'
+                ))
+            )
+            if 'selected' not in letter_button.get_attribute('class'):
+                driver.execute_script("arguments[0].scrollIntoView(true);", letter_button)
+                driver.execute_script("arguments[0].click();", letter_button)
+                time.sleep(0.5)
+
+            WebDriverWait(driver, 5).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "table.points_table tbody tr td"))
+            )
+            snapshots.append(driver.execute_script(JS_VISIBLE_POINTS_TABLES))
+
+        except TimeoutException:
+            logger.warning(f"Tabela não encontrada para a letra: {letter}. Pulando...")
+
+    return 'icd10_cm', snapshots
+
+def fetch_ndc(driver):
+    snapshots = fetch_tab(driver, 'a[href="#ndc"]', 'div#ndc')
+    if not snapshots:
+        logger.debug("Aba NDC não disponível ou não clicável.")
+    return 'ndc', snapshots
+
+def fetch_icd_pcs_x(driver):
     if safe_click_tab(driver, 'a[href="#PCS"]'):
         try:
             WebDriverWait(driver, 10).until(
                 lambda d: "loading" not in d.find_element(By.ID, "pcsdata").text.lower()
             )
             time.sleep(0.5)
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            div = soup.find('div', id='pcsdata')
-            if div:
-                table = div.select_one('table.points_table')
-                if table:
-                    pcs_codes = []
-                    rows = table.select('tbody tr')
-                    for row in rows:
-                        cols = row.find_all('td')
-                        if len(cols) >= 1:
-                            pcs_code = cols[0].get_text(strip=True)
-                            if pcs_code:
-                                pcs_codes.append(pcs_code)
-                    pcs = pcs_codes if pcs_codes else None
-                    if not pcs:
-                        logger.debug("PCS: Tabela encontrada, mas nenhum código foi extraído.")
-                else:
-                    logger.debug("PCS: Tabela não encontrada na div.")
-            else:
-                logger.debug("PCS: Div #pcsdata não encontrada.")
+            return 'icd_10_pcs_x', capture_element(driver, 'div#pcsdata')
         except Exception as e:
             logger.error(f"Erro ao aguardar carregamento da aba PCS: {e}")
-      
-    return pcs
+            raise e
 
-def get_cpt_code_symbols(driver):
-    cpt_code_symbols = None
-    current_url = driver.current_url.lower()
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
+    return 'icd_10_pcs_x', []
 
+def fetch_cpt_code_symbols(driver):
+    current_url = driver.current_url.lower()
     if 'cpt-codes' in current_url:
-        cpt_symbol_div = soup.find('div', id='cpt_symbol_div')
-        if cpt_symbol_div:
-            icon_divs = cpt_symbol_div.find_all('div', class_='icon-dic-o')
-            extracted_symbols = []
-            for icon_div in icon_divs:
-                full_text = icon_div.get_text(separator=' ', strip=True)
-                parts = full_text.split(':', 1)
-                if len(parts) == 2:
-                    description = parts[1].strip()
-                    if description:
-                        extracted_symbols.append(description)
-            if extracted_symbols:
-                cpt_code_symbols = extracted_symbols
-
+        return 'cpt_code_symbols_cpt', capture_element(driver, 'div#cpt_symbol_div')
     elif 'hcpcs-codes' in current_url:
-        hcpcs_title = soup.find('p', class_='box-detail-head', string='HCPCS Code Symbols')
-        if hcpcs_title:
-            box_detail_div = hcpcs_title.find_parent('div', class_='box-detail box-blue')
-            if box_detail_div:
-                icon_divs = box_detail_div.find_all('div', class_='icon-dic-o')
-                extracted_symbols = []
-                for icon_div in icon_divs:
-                    for img_tag in icon_div.find_all('img'):
-                        img_tag.decompose()
-                    full_text = icon_div.get_text(separator=' ', strip=True)
-                    parts = full_text.split(':', 1)
-                    if len(parts) == 2:
-                        description = parts[1].strip()
-                        if description:
-                            extracted_symbols.append(description)
-                if extracted_symbols:
-                    cpt_code_symbols = extracted_symbols
-                    
-    return cpt_code_symbols
-
-def get_official_descriptor(driver):
+        return 'cpt_code_symbols_hcpcs', [driver.page_source]
+    return 'cpt_code_symbols_cpt', []
+
+def fetch_official_descriptor(driver):
     try:
         WebDriverWait(driver, 10).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, 'div.tab-pane'))
         )
+        return 'description', capture_element(driver, 'div.tab-pane')
 
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        descriptor_div = soup.select_one('div.tab-pane')
-
-        if descriptor_div:
-            descriptor_text = ' '.join(descriptor_div.stripped_strings)
-            return descriptor_text if descriptor_text else None
+    except Exception as e:
+        logger.error(f"Erro ao extrair o Official Descriptor: {e}")
+        raise e
+
+# estágio (aba) -> fetch que devolve (aba, snapshots de HTML); as colunas de cada
+# estágio estão em procedure_parsers.TAB_COLUMNS
+TAB_FETCHERS = {
+    'betos': fetch_betos,
+    'guidelines': fetch_guidelines,
+    'advice': fetch_advice,
+    'lay_term': fetch_lay_term,
+    'report': fetch_report,
+    'revenue_lookup': fetch_revenue_code_lookup,
+    'icd10_cm': fetch_icd10_cm,
+    'ndc': fetch_ndc,
+    'icd_10_pcs_x': fetch_icd_pcs_x,
+    'cpt_code_symbols': fetch_cpt_code_symbols,
+    'description': fetch_official_descriptor,
+}
+# falhas que refazem o código inteiro no retry; 'validation' é a linha reprovada no flush
+PAGE_STAGES = ('navigation', 'parse', 'validation')
+
+def empty_extraction(failures=None):
+    return None, [], [], failures or {}
+
+def field_selection(spec):
+    """
+    Resolve CRAWL_FIELDS em (abas a capturar, colunas puladas); o perfil completo devolve (None, ()).
+    """
+    columns = resolve_fields(spec)
+    skipped = tuple(column for column in ATHENA_PROCEDURE_CODES_COLUMNS if column not in columns)
+    if not skipped:
+        return None, ()
+    return stages_for_columns(columns), skipped
+
+def skip_columns(procedure_code):
+    if procedure_code is None or not SKIPPED_COLUMNS:
+        return procedure_code
+    return procedure_code._replace(**dict.fromkeys(SKIPPED_COLUMNS))
+
+def code_type(is_cpt):
+    return 'CPT' if is_cpt else 'HCPCS'
+
+def deleted_extraction(code, is_cpt, deleted_check):
+    date_deleted, advice, lay_term, guidelines, description = deleted_check
+    procedure_code = ProcedureCodeRecord(
+        code=code, code_type=code_type(is_cpt), date_deleted=date_deleted, advice=advice,
+        lay_term=lay_term, guidelines=guidelines, description=description
+    )
+    return skip_columns(procedure_code), [], [], {}
 
+def new_html_archive():
+    if not CONFIG.HTML_ARCHIVE_PATH:
         return None
+    return HtmlArchive(CONFIG.HTML_ARCHIVE_PATH, CONFIG.CRAWL_RUN_ID, writer_id=CONFIG.CRAWL_NODE_ID)
 
+def flush_html_archive():
+    if HTML_ARCHIVE is None:
+        return
+    try:
+        HTML_ARCHIVE.flush()
     except Exception as e:
-        logger.error(f"Erro ao extrair o Official Descriptor: {e}")
-        return None
+        logger.warning(f"Manifest do arquivo de HTML não gravado, fica para o próximo flush: {e}")
 
-def extracted_procedure_modifiers_v2(driver, code):
+def archive_html(code, html, tabs=None, is_cpt=None, page_kind=None, merge_tabs=False):
+    if HTML_ARCHIVE is None:
+        return
+    try:
+        HTML_ARCHIVE.add(code, html, tabs=tabs, is_cpt=is_cpt, page_kind=page_kind, merge_tabs=merge_tabs)
+    except Exception as e:
+        logger.warning(f"HTML do código {code} não arquivado: {e}")
+
+def fetch_procedure_code(driver, code, stages=None, partial=None):
+  """
+  Etapa de fetch: navega até o código e captura o HTML da página e das abas, sem parse.
+  'result' vem preenchido quando a extração termina aqui (falha de navegação, 404,
+  página genérica ou código deletado); senão a captura segue para `parse_capture`.
+  """
   url = BASE_SITE + code.strip()
-
-  logger.info(f"Extracting procedure modifiers : {url}")
+  capture = {
+    'code': code, 'result': None, 'html': None, 'is_cpt': False, 'skip_breadcrumb': False,
+    'interval': None, 'partial': None, 'tabs': {}, 'failures': {},
+    # sinais para o controle de concorrência
+    'latency': None, 'status': None, 'timeouts': 0, 'login_redirect': False
+  }
+
+  log_sampled(logger, 'page', "Extracting procedure modifiers : %s", url)
+  start = time.perf_counter()
   try:
     driver.get(url)
     WebDriverWait(driver, 10).until(
       EC.presence_of_element_located((By.TAG_NAME, "body"))
     )
+  except Exception as e:
+    logger.error(f"Erro ao acessar a página {url} para o código {code}: {e}")
+    capture['latency'] = time.perf_counter() - start
+    capture['timeouts'] += isinstance(e, TimeoutException)
+    capture['result'] = empty_extraction({'navigation': str(e)})
+    return capture
+  capture['latency'] = time.perf_counter() - start
 
-    is_cpt = 'cpt' in driver.current_url.lower()
+  try:
+    current_url = driver.current_url
+    is_cpt = 'cpt' in current_url.lower()
     html_content = driver.page_source
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    date_deleted = None
+    status = capture['status'] = navigation_status(driver)
+
+    if status == 429 or (status is not None and status >= 500):
+        logger.warning(f"Código {code} recebeu HTTP {status}, fica para o retry.")
+        capture['result'] = empty_extraction({'navigation': f"HTTP {status}"})
+        return capture
+    if is_login_page(current_url, html_content):
+        logger.warning(f"Sessão expirada no código {code}: página de login ou deslogada.")
+        capture['login_redirect'] = True
+        capture['result'] = empty_extraction({'navigation': 'login redirect'})
+        return capture
+
+    page_kind = classify_page(html_content, current_url, status)
 
-    if is_error_404_page(soup):
+    if page_kind == PAGE_KIND_404:
         logger.warning(f"Código {code} ignorado por retornar página de erro 404.")
-        return (
-            pd.DataFrame([], columns=ATHENA_PROCEDURE_CODES_COLUMNS),
-            pd.DataFrame([], columns=ATHENA_PROCEDURE_CODE_MODIFIER_COLUMNS),
-            pd.DataFrame([], columns=ATHENA_PROCEDURE_CODE_NDC_COLUMNS)
-        )
+        capture['result'] = empty_extraction()
+        return capture
 
-    if is_deleted_hcpcs_page(soup):
+    if page_kind == PAGE_KIND_GENERIC:
         logger.info(f'Código {code} ignorado por ser página genérica de Deleted HCPCS Codes.')
-        return (
-            pd.DataFrame([], columns=ATHENA_PROCEDURE_CODES_COLUMNS),
-            pd.DataFrame([], columns=ATHENA_PROCEDURE_CODE_MODIFIER_COLUMNS),
-            pd.DataFrame([], columns=ATHENA_PROCEDURE_CODE_NDC_COLUMNS)
-        )
+        capture['result'] = empty_extraction()
+        return capture
 
-    deleted_check = get_deleted(driver, soup)
+    capture['is_cpt'] = is_cpt
+    # páginas de código deletado são raras e não têm abas: o parse fica no fetch
+    deleted_check = get_deleted(parse_html(html_content)) if page_kind == PAGE_KIND_DELETED else None
     if deleted_check:
-        date_deleted, advice, lay_term, guidelines, description = deleted_check
-
-        procedure_code = pd.DataFrame([[
-            code,
-            'CPT' if is_cpt else 'HCPCS',
-            None,  
-            None,  
-            None,  
-            None,  
-            None,  
-            description,
-            None, 
-            date_deleted,
-            None, 
-            None, 
-            guidelines,
-            advice,
-            lay_term,
-            None,  
-            None,  
-            None,  
-            None,  
-            None,  
-            None   
-        ]], columns=ATHENA_PROCEDURE_CODES_COLUMNS)
-        return procedure_code, pd.DataFrame([], columns=ATHENA_PROCEDURE_CODE_MODIFIER_COLUMNS), pd.DataFrame([], columns=ATHENA_PROCEDURE_CODE_NDC_COLUMNS)
-
-            
-    code_type = 'CPT' if is_cpt else 'HCPCS'
-    main_interval = get_main_interval(soup, is_cpt)
-    short_description = get_short_description(soup, is_cpt) 
-    long_description = get_long_description(soup) 
-    main_interval_name = get_main_interval_name(soup)
-    data, modifiers = get_modifier_description(soup)
-    betos_code, betos_description = get_betos(driver)
-    guidelines = get_guidelines(driver)
-    advice = get_advice(driver)
-    summary, lay_term = get_lay_term(driver)
-    report = get_report(driver)
-    revenue_lookup = get_revenue_code_lookup(driver)
-    icd10_cm = get_icd10_cm(driver)
-    ndc_alternate_id, ndc_all = get_ndc(driver)   
-    icd_10_pcs_x = get_icd_pcs_x(driver)
-    cpt_code_symbols = get_cpt_code_symbols(driver)
-    description = get_official_descriptor(driver)
-    
-    procedure_code = pd.DataFrame( [ 
-        [
-            code,
-            code_type,
-            main_interval,
-            main_interval_name,
-            modifiers,
-            short_description,
-            long_description,
-            description,
-            summary,
-            date_deleted,
-            betos_code,
-            betos_description,
-            guidelines,
-            advice,
-            lay_term,
-            report,
-            revenue_lookup,
-            icd10_cm,
-            ndc_alternate_id,
-            icd_10_pcs_x,
-            cpt_code_symbols
-        ]
-    ], columns = ATHENA_PROCEDURE_CODES_COLUMNS )
-    
-    df_modifier = pd.DataFrame(data, columns=ATHENA_PROCEDURE_CODE_MODIFIER_COLUMNS)
-    df_ndc = pd.DataFrame(ndc_all, columns=ATHENA_PROCEDURE_CODE_NDC_COLUMNS)
-  
-    return procedure_code, df_modifier, df_ndc
+        archive_html(code, html_content, is_cpt=is_cpt, page_kind=page_kind)
+        capture['result'] = deleted_extraction(code, is_cpt, deleted_check)
+        return capture
+
+    if stages is not None and partial is not None and partial[0] is not None:
+        capture['partial'] = partial
+    else:
+        stages = None
+        capture['html'] = html_content
+        capture['interval'] = INTERVAL_INDEX.lookup(code)
+        capture['skip_breadcrumb'] = capture['interval'] is not None
+  except Exception as e:
+    logger.error(f"Erro ao processar a página {url} para o código {code}: {e}")
+    capture['result'] = empty_extraction({'parse': str(e)})
+    return capture
+
+  for stage, fetch in TAB_FETCHERS.items():
+    if stages is not None and stage not in stages:
+        continue
+    if FIELD_STAGES is not None and stage not in FIELD_STAGES:
+        continue
+    try:
+        with log_context(stage=stage):
+            capture['tabs'][stage] = fetch(driver)
+    except Exception as e:
+        logger.error(f"Erro na aba {stage} para o código {code}: {e}")
+        capture['failures'][stage] = str(e)
+        capture['timeouts'] += isinstance(e, TimeoutException)
+
+  # a sessão pode cair durante as abas; o redirect invalida a captura inteira
+  try:
+    redirected = bool(capture['tabs']) and is_login_url(driver.current_url)
   except Exception as e:
-      logger.error(f"Erro ao acessar a página {url} para o código {code}: {e}")
-    
-def extract_tab_content_with_fallback(driver, tab_selectors, div_ids):
-
-    for tab_selector, div_id in zip(tab_selectors, div_ids):
-        if safe_click_tab(driver, tab_selector):
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            div = soup.find('div', id=div_id)
-            if div:
-                return div
-    return None
+    logger.error(f"Erro ao checar a sessão após as abas do código {code}: {e}")
+    redirected = False
+  if redirected:
+    logger.warning(f"Sessão expirada durante as abas do código {code}.")
+    capture['login_redirect'] = True
+    capture['result'] = empty_extraction({'navigation': 'login redirect'})
+    return capture
+
+  if capture['html'] is not None:
+    archive_html(code, capture['html'], tabs=capture['tabs'], is_cpt=is_cpt, page_kind=page_kind)
+  elif capture['partial'] is not None and capture['tabs']:
+    # retry só das abas que falharam: o manifest sobrepõe estas abas à captura anterior
+    archive_html(code, html_content, tabs=capture['tabs'], is_cpt=is_cpt, page_kind=page_kind, merge_tabs=True)
+  return capture
+
+def submit_parse(parse_executor, capture):
+    """
+    Envia a captura para a etapa de parse e devolve um Future com (valores, falhas),
+    ou None quando a extração já terminou no fetch. Sem executor o parse roda na thread atual.
+    """
+    if capture['result'] is not None:
+        return None
+    args = (capture['html'], capture['is_cpt'], capture['tabs'], capture['skip_breadcrumb'])
+    if parse_executor is None:
+        future = Future()
+        future.set_result(parse_capture(*args))
+        return future
+    return parse_executor.submit(parse_capture, *args)
+
+def collect_parse(future):
+    if future is None:
+        return None
+    try:
+        return future.result()
+    except Exception as e:
+        return {}, {'parse': str(e)}
+
+def assemble_extraction(capture, parsed):
+  """
+  Junta a captura ao resultado do parse em (procedure_code, modifiers, ndcs, failures):
+  um ProcedureCodeRecord (None quando o código não gera linha), listas de ModifierRecord
+  e NdcRecord, e failures mapeando o estágio que falhou ('navigation', 'parse' ou a aba) para o erro.
+  """
+  if capture['result'] is not None:
+    return capture['result']
+  code = capture['code']
+  values, parse_failures = parsed
+
+  if 'parse' in parse_failures:
+    logger.error(f"Erro ao processar a página do código {code}: {parse_failures['parse']}")
+    return empty_extraction({'parse': parse_failures['parse']})
+  for stage, error in parse_failures.items():
+    logger.error(f"Erro na aba {stage} para o código {code}: {error}")
+
+  partial = capture['partial']
+  if partial is not None:
+    row = partial[0]._asdict()
+    modifiers = partial[1]
+    ndcs = partial[2]
+  else:
+    row = dict.fromkeys(ATHENA_PROCEDURE_CODES_COLUMNS)
+    row['code'] = code
+    row['code_type'] = code_type(capture['is_cpt'])
+    modifiers = [ModifierRecord(*modifier_row) for modifier_row in values.pop('modifier_rows')]
+    leaf_interval = values.pop('leaf_interval', None)
+    if capture['interval']:
+        values['main_interval'], values['main_interval_name'] = capture['interval']
+    elif leaf_interval:
+        INTERVAL_INDEX.add(leaf_interval, values['main_interval'], values['main_interval_name'])
+    ndcs = []
+  if '_ndc_rows' in values:
+    ndcs = [NdcRecord(**ndc_row) for ndc_row in values.pop('_ndc_rows') or []]
+  row.update(values)
+
+  procedure_code = skip_columns(ProcedureCodeRecord(*(row[column] for column in ATHENA_PROCEDURE_CODES_COLUMNS)))
+  return procedure_code, modifiers, ndcs, {**capture['failures'], **parse_failures}
+
+def extracted_procedure_modifiers_v2(driver, code, stages=None, partial=None):
+  """
+  Fetch e parse em sequência na mesma thread.
+  Com `stages` e `partial` apenas as abas indicadas são refeitas sobre o resultado parcial.
+  """
+  capture = fetch_procedure_code(driver, code, stages=stages, partial=partial)
+  return assemble_extraction(capture, collect_parse(submit_parse(None, capture)))
+
+def retry_stages(failures):
+    if any(stage in PAGE_STAGES for stage in failures):
+        return None
+    return set(failures)
+
+def build_crosswalks(df_procedure_codes):
+    crosswalks = {}
+    for table_name, (source_column, lookup_column) in ATHENA_PROCEDURE_CROSSWALK_TABLES.items():
+        if df_procedure_codes.empty or source_column not in df_procedure_codes.columns:
+            crosswalks[table_name] = pd.DataFrame(columns=[lookup_column, 'code'])
+            continue
+        df = df_procedure_codes[['code', source_column]].explode(source_column, ignore_index=True)
+        df = df.rename(columns={source_column: lookup_column})[[lookup_column, 'code']]
+        df = df[df[lookup_column].notna() & (df[lookup_column].astype(str).str.strip() != '')]
+        df = df.drop_duplicates().sort_values([lookup_column, 'code'], ignore_index=True)
+        crosswalks[table_name] = df
+    return crosswalks
+
+def load_crosswalks(df_procedure_codes, s3_file_prefix):
+    if not (CONFIG.ATHENA_OUTPUT_PROCEDURE_CROSSWALK_TABLE_SCHEMA and CONFIG.ATHENA_OUTPUT_PROCEDURE_CROSSWALK_TABLE_LOCATION):
+        return
+    for table_name, df_crosswalk in build_crosswalks(df_procedure_codes).items():
+        if df_crosswalk.empty:
+            continue
+        lookup_column = ATHENA_PROCEDURE_CROSSWALK_TABLES[table_name][1]
+        s3_athena_load_table_parquet_snappy(
+            df=df_crosswalk,
+            database=CONFIG.ATHENA_OUTPUT_PROCEDURE_CROSSWALK_TABLE_SCHEMA,
+            table_name=table_name,
+            table_location=f"{CONFIG.ATHENA_OUTPUT_PROCEDURE_CROSSWALK_TABLE_LOCATION.rstrip('/')}/{table_name}/",
+            s3_file_prefix=s3_file_prefix,
+            insert_mode='append',
+            bucketing_info=([lookup_column], ATHENA_PROCEDURE_CROSSWALK_BUCKETS)
+        )
+        logger.info(f"{df_crosswalk.shape[0]} linhas inseridas no crosswalk {table_name}")
+
+def mirror_to_postgres(df, table_name):
+    if not (CONFIG.POSTGRES_MIRROR_SECRET_ID and CONFIG.POSTGRES_MIRROR_SCHEMA) or df.empty:
+        return
+    try:
+        postgres_copy_upsert(
+            secret_id=CONFIG.POSTGRES_MIRROR_SECRET_ID,
+            data=df,
+            table=table_name,
+            schema=CONFIG.POSTGRES_MIRROR_SCHEMA,
+            key_columns=POSTGRES_MIRROR_TABLES[table_name]
+        )
+        logger.info(f"{df.shape[0]} linhas espelhadas em {CONFIG.POSTGRES_MIRROR_SCHEMA}.{table_name}")
+    except Exception as e:
+        logger.error(f"Falha ao espelhar {table_name} no Postgres: {e}")
 
 def safe_click_tab(driver, css_selector: str, timeout: int = 10) -> bool:
     try:
@@ -674,10 +583,476 @@ def safe_click_tab(driver, css_selector: str, timeout: int = 10) -> bool:
         logger.error(f"Erro ao clicar em {css_selector}: {e}")
     return False
 
+def login_driver(driver, aapc_email, aapc_pw):
+    aapc_login(
+      driver=driver,
+      url_login=URL_LOGIN,
+      aapc_email=aapc_email,
+      aapc_pw=aapc_pw,
+      primary_login='next',
+      second_login='continue',
+      username_field_id='userProvidedSignInName',
+      password_field_id='password',
+      second_login_button_id='btnSignIn',
+      subscription_menu_selector='#ctl00_Body_ctl00_mnuCodifySubscription'
+    )
+
+def is_session_active(driver):
+    return not is_login_page(driver.current_url, driver.page_source)
+
+def new_driver_manager(aapc_email, aapc_pw):
+    return ManagedDriver(
+        driver_factory=get_headless_chrome_driver,
+        login=lambda driver: login_driver(driver, aapc_email, aapc_pw),
+        session_url=BASE_SITE,
+        is_logged_in=is_session_active
+    )
+
+def new_driver_pool(aapc_email, aapc_pw):
+    driver_pool = DriverPool(
+        manager_factory=lambda: new_driver_manager(aapc_email, aapc_pw),
+        size=max(CONFIG.DRIVER_POOL_SIZE, CONFIG.CRAWL_MAX_WORKERS)
+    )
+    driver_pool.start()
+    return driver_pool
+
+def fetch_with_session(driver_manager, code, stages=None, partial=None):
+    """
+    Fetch com checagem de sessão: se a página cair no login ou vier deslogada, reautentica
+    o driver e refaz o código uma vez. Se a sessão não voltar, a captura segue como falha
+    de navegação (vai para o retry e nada é gravado).
+    """
+    with log_context(code=code):
+        capture = fetch_procedure_code(driver_manager.driver, code, stages=stages, partial=partial)
+        if not capture['login_redirect']:
+            return capture
+        if not driver_manager.relogin(f"session expired on code {code}"):
+            return capture
+        capture = fetch_procedure_code(driver_manager.driver, code, stages=stages, partial=partial)
+        capture['login_redirect'] = True
+        return capture
+
+def crawl_code(ctx, code):
+    """
+    Faz o fetch do código com um driver do pool e devolve (captura, Future do parse):
+    o driver é liberado para o próximo código enquanto o parse roda nos processos.
+    """
+    if ctx.budget.should_stop():
+        return None
+    with ctx.concurrency.slot():
+        if ctx.budget.should_stop():
+            return None
+        with ctx.driver_pool.lease() as driver_manager:
+            start = time.perf_counter()
+            capture = fetch_with_session(driver_manager, code)
+            driver_manager.record_page(time.perf_counter() - start)
+    ctx.concurrency.record(
+        capture['latency'], status=capture['status'], timeouts=capture['timeouts'], login_redirect=capture['login_redirect']
+    )
+    return capture, submit_parse(ctx.parse_executor, capture)
+
+def crawl_code_or_error(ctx, code):
+    """
+    crawl_code para o executor: uma exceção (driver que não recicla, pool fechado...) é
+    devolvida no lugar do resultado, para o código ir para o retry sem derrubar o chunk.
+    """
+    try:
+        return crawl_code(ctx, code)
+    except Exception as e:
+        return e
+
+def new_parse_executor():
+    if CONFIG.PARSER_WORKERS <= 0:
+        return None
+    # spawn: o processo principal já tem threads do Selenium quando o pool sobe
+    return ProcessPoolExecutor(max_workers=CONFIG.PARSER_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+
+def extract_with_manager(driver_manager, code, stages=None, partial=None):
+    start = time.perf_counter()
+    capture = fetch_with_session(driver_manager, code, stages=stages, partial=partial)
+    result = assemble_extraction(capture, collect_parse(submit_parse(None, capture)))
+    driver_manager.record_page(time.perf_counter() - start)
+    return result
+
+class CrawlContext:
+    def __init__(self, driver_pool, crawl_executor, parse_executor, df_procedure_modifiers, df_procedure_ndc, budget, concurrency=None, validator=None):
+        self.driver_pool = driver_pool
+        self.budget = budget
+        self.concurrency = concurrency
+        self.validator = validator
+        # prefixos dos arquivos gravados na tabela de procedure codes, aplicados na tabela current
+        self.written_prefixes = set()
+        self.crawl_executor = crawl_executor
+        self.parse_executor = parse_executor
+        self.df_procedure_modifiers = df_procedure_modifiers
+        self.df_procedure_ndc = df_procedure_ndc
+        self.retry_queue = RetryQueue()
+
+def output_file_prefix():
+    """
+    Prefixo dos arquivos gravados pelo processo: início do processo e CRAWL_RUN_ID (mais o nó
+    no modo distribuído), para o MERGE da tabela current não pegar arquivos de outros runs do dia.
+    """
+    run_id = ''.join(c if c.isalnum() or c in '-.' else '_' for c in str(CONFIG.CRAWL_RUN_ID))
+    if CONFIG.CRAWL_MODE == 'standalone':
+        return f'{RUN_STARTED_AT}_{run_id}_'
+    return f'{RUN_STARTED_AT}_{run_id}_{CONFIG.CRAWL_NODE_ID}_'
+
+def new_output_validator():
+    columns = [column for column in ATHENA_PROCEDURE_CODES_COLUMNS if column not in SKIPPED_COLUMNS]
+    return OutputValidator(columns, baseline=load_fill_rates(CONFIG.VALIDATION_STATS_PATH))
+
+def validate_outputs(ctx, procedure_codes, modifiers, ndcs, label):
+    """
+    Passa o chunk pelo validador: as linhas reprovadas vão para a quarentena e, se o
+    preenchimento de algum campo colapsou, o chunk inteiro fica retido e o run para.
+    Modifiers e NDCs só seguem junto com um código aceito. Retorna os registros aceitos
+    e os códigos em quarentena (código -> motivos).
+    """
+    if ctx.validator is None:
+        return procedure_codes, modifiers, ndcs, {}
+    procedure_codes, ndcs, quarantine = ctx.validator.validate(procedure_codes, ndcs)
+    quarantined_codes = {
+        entry['row']['code']: entry['reasons'] for entry in quarantine if entry['table'] == 'procedure_code'
+    }
+    if quarantined_codes:
+        # sem o código, os modifiers e NDCs dele ficariam órfãos no Athena e no Postgres
+        accepted_modifiers = {modifier for record in procedure_codes for modifier in record.modifiers or []}
+        accepted_ndcs = {ndc for record in procedure_codes for ndc in record.ndc_alternate_id or []}
+        modifiers = [modifier for modifier in modifiers if modifier.modifier in accepted_modifiers]
+        ndcs = [ndc for ndc in ndcs if ndc.ndc_alternate_id in accepted_ndcs]
+    if quarantine:
+        if CONFIG.VALIDATION_QUARANTINE_PATH:
+            try:
+                write_quarantine(CONFIG.VALIDATION_QUARANTINE_PATH, CONFIG.CRAWL_RUN_ID, f"{output_file_prefix()}{label}", quarantine)
+            except Exception as e:
+                logger.error(f"Falha ao gravar a quarentena do chunk {label}: {e}")
+        for entry in quarantine[:5]:
+            logger.warning(f"Linha em quarentena ({entry['table']}): {entry['row'].get('code') or entry['row'].get('ndc_alternate_id')} {entry['reasons']}")
+    if ctx.validator.aborted and ctx.budget is not None:
+        logger.error(f"Preenchimento colapsado em {sorted(ctx.validator.collapsed)}, interrompendo o run")
+        ctx.budget.request_stop()
+    return procedure_codes, modifiers, ndcs, quarantined_codes
+
+def flush_outputs(ctx, procedure_codes, modifiers, ndcs, label):
+    """
+    Valida o chunk, monta os DataFrames a partir dos registros e grava as três tabelas.
+    Retorna os códigos em quarentena (código -> motivos), que não foram gravados.
+    """
+    procedure_codes, modifiers, ndcs, quarantined_codes = validate_outputs(ctx, procedure_codes, modifiers, ndcs, label)
+    df_chunk_procedure_codes = records_frame(procedure_codes, ProcedureCodeRecord)
+    df_modifiers = records_frame(modifiers, ModifierRecord)
+    df_new_procedure_ndc = records_frame(ndcs, NdcRecord)
+
+    if not df_new_procedure_ndc.empty:
+        if 'ndc_alternate_id' in ctx.df_procedure_ndc.columns and 'ndc_alternate_id' in df_new_procedure_ndc.columns:
+            df_new_procedure_ndc = df_new_procedure_ndc[
+                ~df_new_procedure_ndc['ndc_alternate_id'].isin(ctx.df_procedure_ndc['ndc_alternate_id'])
+            ]
+
+    if 'modifier' in df_modifiers.columns and 'modifier' in ctx.df_procedure_modifiers.columns:
+        df_modifiers = df_modifiers[
+            ~df_modifiers['modifier'].isin(ctx.df_procedure_modifiers['modifier'])
+        ]
+
+    if not df_chunk_procedure_codes.empty:
+        file_prefix = output_file_prefix()
+        s3_athena_load_table_parquet_snappy(
+            df=with_row_metadata(df_chunk_procedure_codes, datetime.now(timezone.utc).replace(tzinfo=None)),
+            database=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA,
+            table_name=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_NAME,
+            table_location=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_LOCATION,
+            s3_file_prefix=file_prefix,
+            insert_mode='append'
+        )
+        ctx.written_prefixes.add(file_prefix)
+        logger.info(f"Códigos inseridos para o chunk {label}")
+        load_crosswalks(
+            df_procedure_codes=df_chunk_procedure_codes,
+            s3_file_prefix=file_prefix
+        )
+        # no Postgres o upsert só toca as colunas do perfil: as puladas mantêm o valor anterior
+        mirror_to_postgres(
+            df_chunk_procedure_codes.drop(columns=list(SKIPPED_COLUMNS)),
+            'procedure_code'
+        )
+    else:
+        logger.info(f"Nenhum código novo para inserir no chunk {label}")
+
+    if not df_modifiers.empty:
+        s3_athena_load_table_parquet_snappy(
+            df=df_modifiers,
+            database=CONFIG.ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_SCHEMA,
+            table_name=CONFIG.ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_NAME,
+            table_location=CONFIG.ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_LOCATION,
+            s3_file_prefix=output_file_prefix(),
+            insert_mode='append'
+        )
+        logger.info(f"Modifiers inseridos para o chunk {label}")
+        mirror_to_postgres(df_modifiers, 'procedure_code_modifier')
+    else:
+        logger.info(f"Nenhum modifier novo para inserir no chunk {label}")
+
+    if not df_new_procedure_ndc.empty:
+        s3_athena_load_table_parquet_snappy(
+            df=df_new_procedure_ndc,
+            database=CONFIG.ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_SCHEMA,
+            table_name=CONFIG.ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_NAME,
+            table_location=CONFIG.ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_LOCATION,
+            s3_file_prefix=output_file_prefix(),
+            insert_mode='append'
+        )
+        logger.info(f"NDCs inseridos para o chunk {label}")
+        mirror_to_postgres(df_new_procedure_ndc, 'procedure_code_ndc')
+    else:
+        logger.info(f"Nenhum NDC novo para inserir no chunk {label}")
+
+    flush_html_archive()
+    return quarantined_codes
+
+def retry_failed_codes(retry_queue, driver_manager, should_stop=None, wait=time.sleep):
+    """
+    Reprocessa a fila de retry com backoff exponencial, reciclando o driver a cada rodada.
+    Retorna a lista de extrações (inclusive parciais das entradas esgotadas).
+    """
+    def before_attempt(attempt):
+        driver_manager.recycle(f"retry {attempt}")
+
+    def handler(entry):
+        result = extract_with_manager(
+            driver_manager,
+            entry['key'],
+            stages=retry_stages(entry['failures']),
+            partial=entry['partial']
+        )
+        return result[:3], result[3]
+
+    completed, exhausted = retry_queue.process(handler, before_attempt=before_attempt, should_stop=should_stop, wait=wait)
+    for entry in exhausted:
+        if entry['partial'] is not None and entry['partial'][0] is not None:
+            logger.warning(f"Código {entry['key']} gravado com as abas {sorted(entry['failures'])} vazias.")
+            completed.append(entry['partial'])
+    return completed
+
+def crawl_codes(ctx, codes, label=''):
+    """
+    Processa os códigos em chunks e retorna os que não foram iniciados por esgotar o prazo do run.
+    """
+    pending = []
+    for start_idx in range(0, len(codes), CHUNK_SIZE):
+        if ctx.budget.should_stop():
+            pending.extend(codes[start_idx:])
+            break
+        end_idx = min(start_idx + CHUNK_SIZE, len(codes))
+        chunk_codes = codes[start_idx:end_idx]
+
+        chunk_procedure_codes = []
+        chunk_modifiers = []
+        chunk_ndcs = []
+        chunk_results = ctx.crawl_executor.map(lambda code: crawl_code_or_error(ctx, code), chunk_codes)
+        for code, fetched in zip(chunk_codes, chunk_results):
+            if fetched is None:
+                pending.append(code)
+                continue
+            if isinstance(fetched, Exception):
+                logger.error(f"Falha no crawl do código {code}: {fetched}")
+                ctx.retry_queue.add(code, {'navigation': str(fetched)})
+                continue
+            capture, future = fetched
+            procedure_code, modifiers, ndcs, failures = assemble_extraction(capture, collect_parse(future))
+            if failures:
+                ctx.retry_queue.add(code, failures, partial=(procedure_code, modifiers, ndcs))
+                continue
+
+            if procedure_code is not None:
+                chunk_procedure_codes.append(procedure_code)
+            chunk_modifiers.extend(modifiers)
+            chunk_ndcs.extend(ndcs)
+
+        quarantined_codes = flush_outputs(
+            ctx, chunk_procedure_codes, chunk_modifiers, chunk_ndcs,
+            label=f"{label}{start_idx}-{end_idx - 1}"
+        )
+        for code, reasons in quarantined_codes.items():
+            ctx.retry_queue.add(code, {'validation': '; '.join(reasons)})
+    return pending
+
+def process_retries(ctx, label='retry'):
+    """
+    Reprocessa a fila de retry e retorna os códigos que ficaram pendentes por esgotar o prazo do run.
+    """
+    if not len(ctx.retry_queue):
+        return []
+    with ctx.driver_pool.lease() as driver_manager:
+        retried = retry_failed_codes(ctx.retry_queue, driver_manager, should_stop=ctx.budget.should_stop, wait=ctx.budget.wait)
+    quarantined_codes = {}
+    if retried:
+        quarantined_codes = flush_outputs(
+            ctx,
+            [r[0] for r in retried if r[0] is not None],
+            [modifier for r in retried for modifier in r[1]],
+            [ndc for r in retried for ndc in r[2]],
+            label=label
+        )
+    # códigos reprovados de novo na validação ficam para o próximo run
+    pending = [entry['key'] for entry in ctx.retry_queue.entries()]
+    pending += [code for code in quarantined_codes if code not in pending]
+    ctx.retry_queue = RetryQueue()
+    return pending
+
+def get_lease_store():
+    if CONFIG.CRAWL_LEASE_BACKEND.startswith('sqlite:///'):
+        lease_store = sqlite_lease_store(CONFIG.CRAWL_LEASE_BACKEND[len('sqlite:///'):])
+    else:
+        lease_store = postgres_lease_store(CONFIG.CRAWL_LEASE_SECRET_ID, CONFIG.CRAWL_LEASE_SCHEMA)
+    lease_store.create_table()
+    return lease_store
+
+def run_worker(ctx, lease_store):
+    while not ctx.budget.should_stop():
+        claimed = lease_store.claim(CONFIG.CRAWL_RUN_ID, CONFIG.CRAWL_NODE_ID)
+        if claimed is None:
+            progress = lease_store.progress(CONFIG.CRAWL_RUN_ID)
+            if not progress.get('claimed'):
+                logger.info(f"Nenhum lease disponível para o run {CONFIG.CRAWL_RUN_ID}: {progress}")
+                break
+            # leases ainda com outros nós: se um deles cair, o lease expira e é reivindicado aqui
+            interval = lease_store.ttl / 3
+            logger.info(f"{progress['claimed']} leases em andamento em outros nós, nova tentativa em {interval:.0f}s: {progress}")
+            ctx.budget.wait(interval)
+            continue
+        lease_id, codes = claimed
+        try:
+            with LeaseRenewer(lease_store, CONFIG.CRAWL_RUN_ID, lease_id, CONFIG.CRAWL_NODE_ID) as renewer:
+                pending = crawl_codes(ctx, codes, label=f"lease {lease_id} ")
+                pending += process_retries(ctx, label=f"lease {lease_id} retry")
+        except Exception:
+            lease_store.release(CONFIG.CRAWL_RUN_ID, lease_id, CONFIG.CRAWL_NODE_ID)
+            raise
+        if renewer.lost.is_set():
+            logger.warning(f"Lease {lease_id} perdido durante o processamento; outro nó irá reprocessá-lo.")
+        elif pending:
+            lease_store.requeue(CONFIG.CRAWL_RUN_ID, lease_id, CONFIG.CRAWL_NODE_ID, pending)
+            logger.info(f"Lease {lease_id} devolvido com {len(pending)} códigos pendentes.")
+        else:
+            lease_store.complete(CONFIG.CRAWL_RUN_ID, lease_id, CONFIG.CRAWL_NODE_ID)
+
+def interval_dimension_enabled():
+    return bool(
+        CONFIG.ATHENA_OUTPUT_PROCEDURE_INTERVAL_TABLE_SCHEMA
+        and CONFIG.ATHENA_OUTPUT_PROCEDURE_INTERVAL_TABLE_NAME
+        and CONFIG.ATHENA_OUTPUT_PROCEDURE_INTERVAL_TABLE_LOCATION
+    )
+
+def load_interval_index():
+    if not interval_dimension_enabled():
+        return
+    try:
+        df_intervals = athena_get_generator(
+            athena_query=f"SELECT {', '.join(INTERVAL_DIMENSION_COLUMNS)} FROM {CONFIG.ATHENA_OUTPUT_PROCEDURE_INTERVAL_TABLE_SCHEMA}.{CONFIG.ATHENA_OUTPUT_PROCEDURE_INTERVAL_TABLE_NAME}",
+            athena_database=CONFIG.ATHENA_OUTPUT_PROCEDURE_INTERVAL_TABLE_SCHEMA,
+            s3_output=CONFIG.ATHENA_QUERY_OUTPUT_LOCATION
+        )
+        if df_intervals is not None:
+            INTERVAL_INDEX.load_rows(df_intervals.to_dict('records'))
+    except Exception as e:
+        logger.warning(f"Dimensão de intervalos do run anterior não carregada: {e}")
+
+def write_interval_dimension():
+    if not interval_dimension_enabled() or not len(INTERVAL_INDEX):
+        return
+    df_intervals = pd.DataFrame(INTERVAL_INDEX.rows(), columns=INTERVAL_DIMENSION_COLUMNS)
+    s3_athena_load_table_parquet_snappy(
+        df=df_intervals,
+        database=CONFIG.ATHENA_OUTPUT_PROCEDURE_INTERVAL_TABLE_SCHEMA,
+        table_name=CONFIG.ATHENA_OUTPUT_PROCEDURE_INTERVAL_TABLE_NAME,
+        table_location=CONFIG.ATHENA_OUTPUT_PROCEDURE_INTERVAL_TABLE_LOCATION,
+        s3_file_prefix=output_file_prefix(),
+        insert_mode='overwrite' if CONFIG.CRAWL_MODE == 'standalone' else 'append'
+    )
+    logger.info(f"{df_intervals.shape[0]} intervalos gravados na dimensão de intervalos")
+
+def update_current_snapshot(ctx):
+    try:
+        merge_current_snapshot(ctx.written_prefixes, SKIPPED_COLUMNS)
+    except Exception as e:
+        logger.error(f"Falha ao atualizar a tabela current de procedure codes: {e}")
+
+def load_known_modifiers_and_ndc():
+    """
+    Modifiers e NDCs já gravados, usados para não reinserir linhas no flush.
+    """
+    with open(os.path.join(PROJECT_PATH, QUERY_DQL_PROCEDURE_CODE_MODIFIER), 'r') as f:
+        qry_dql_procedure_code_modifier_table = ''.join(f.readlines()).format(
+            ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_SCHEMA=CONFIG.ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_SCHEMA,
+            ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_NAME=CONFIG.ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_NAME
+        )
+    with open(os.path.join(PROJECT_PATH, QUERY_DQL_PROCEDURE_CODE_NDC), 'r') as f:
+        qry_dql_procedure_code_ndc_table = ''.join(f.readlines()).format(
+            ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_SCHEMA=CONFIG.ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_SCHEMA,
+            ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_NAME=CONFIG.ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_NAME
+        )
+    df_procedure_modifiers = athena_get_generator(
+        athena_query=qry_dql_procedure_code_modifier_table,
+        athena_database=CONFIG.ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_SCHEMA,
+        s3_output=CONFIG.ATHENA_QUERY_OUTPUT_LOCATION
+    )
+    df_procedure_ndc = athena_get_generator(
+        athena_query=qry_dql_procedure_code_ndc_table,
+        athena_database=CONFIG.ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_SCHEMA,
+        s3_output=CONFIG.ATHENA_QUERY_OUTPUT_LOCATION
+    )
+    return df_procedure_modifiers, df_procedure_ndc
+
+def load_code_history():
+    history_query_path = os.path.join(PROJECT_PATH, QUERY_DQL_PROCEDURE_CODE_HISTORY)
+    if not os.path.exists(history_query_path):
+        logger.warning(f"Query de histórico {history_query_path} não encontrada: códigos na ordem do Athena, sem prioridade.")
+        return None
+    with open(history_query_path, 'r') as f:
+        qry_dql_procedure_code_history = ''.join(f.readlines()).format(
+            LOGICAL_DATE=CONFIG.LOGICAL_DATE,
+            ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA,
+            ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_NAME=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_NAME
+        )
+    try:
+        return athena_get_generator(
+            athena_query=qry_dql_procedure_code_history,
+            athena_database=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA,
+            s3_output=CONFIG.ATHENA_QUERY_OUTPUT_LOCATION
+        )
+    except Exception as e:
+        # ex.: primeiro run depois do deploy, antes de content_fingerprint/crawled_at existirem na tabela
+        logger.warning(f"Histórico de crawl não carregado, códigos na ordem do Athena, sem prioridade: {e}")
+        return None
+
+def discover_crawl_codes(input_codes, df_history):
+    """
+    Troca a lista do Athena pelo delta descoberto no site (novos + desatualizados).
+    Em caso de falha na descoberta, mantém a lista do Athena.
+    """
+    try:
+        discovered = discover_codes(interval_index=INTERVAL_INDEX)
+    except Exception as e:
+        logger.error(f"Descoberta de códigos falhou, usando a lista do Athena: {e}")
+        return input_codes
+    if not discovered:
+        logger.warning("Nenhum código descoberto, usando a lista do Athena.")
+        return input_codes
+    codes, new_codes, retired_codes = plan_crawl(discovered, input_codes, df_history)
+    if retired_codes:
+        logger.info(f"Códigos fora do site ignorados: {sorted(retired_codes)[:50]}")
+    return codes
+
 if __name__ == "__main__":
     logger.info("Início do processo")
+    logger.info(f"Running on date: {CONFIG.LOGICAL_DATE}")
     try:
-        secret_json = get_secret(secret_name=AAPC_SECRET_ID)
+        HTML_ARCHIVE = new_html_archive()
+        FIELD_STAGES, SKIPPED_COLUMNS = field_selection(CONFIG.CRAWL_FIELDS)
+        if SKIPPED_COLUMNS:
+            logger.info(f"Perfil de campos '{CONFIG.CRAWL_FIELDS}': abas {sorted(FIELD_STAGES)}, colunas nulas {list(SKIPPED_COLUMNS)}")
+        secret_json = get_secret(secret_name=CONFIG.AAPC_SECRET_ID)
         secret_dict = json.loads(secret_json)
 
         aapc_email = secret_dict['aapc']['email']
@@ -685,131 +1060,72 @@ if __name__ == "__main__":
 
         with open(os.path.join(PROJECT_PATH, QUERY_DQL_PROCEDURE_CODE), 'r') as f:
             qry_dql_procedure_code_table = ''.join(f.readlines()).format(
-                LOGICAL_DATE=LOGICAL_DATE,
-                ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA=ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA,
-                ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_NAME=ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_NAME
+                LOGICAL_DATE=CONFIG.LOGICAL_DATE,
+                ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA,
+                ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_NAME=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_NAME
             )
-        with open(os.path.join(PROJECT_PATH, QUERY_DQL_PROCEDURE_CODE_MODIFIER), 'r') as f:
-            qry_dql_procedure_code_modifier_table = ''.join(f.readlines()).format(
-                ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_SCHEMA=ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_SCHEMA,
-                ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_NAME=ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_NAME
-            )
-        with open(os.path.join(PROJECT_PATH, QUERY_DQL_PROCEDURE_CODE_NDC), 'r') as f:
-            qry_dql_procedure_code_ndc_table = ''.join(f.readlines()).format(
-                ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_SCHEMA=ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_SCHEMA,
-                ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_NAME=ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_NAME
-            )
-
         logger.info("Consultas carregadas com sucesso")
 
-        df_procedure_codes = athena_get_generator(
-            athena_query=qry_dql_procedure_code_table,
-            athena_database=ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA,
-            s3_output=ATHENA_QUERY_OUTPUT_LOCATION
-        )
-        df_procedure_modifiers = athena_get_generator(
-            athena_query=qry_dql_procedure_code_modifier_table,
-            athena_database=ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_SCHEMA,
-            s3_output=ATHENA_QUERY_OUTPUT_LOCATION
-        )
-        df_procedure_ndc = athena_get_generator(
-            athena_query=qry_dql_procedure_code_ndc_table,
-            athena_database=ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_SCHEMA,
-            s3_output=ATHENA_QUERY_OUTPUT_LOCATION
-        )
+        if CONFIG.CRAWL_MODE != 'worker':
+            df_procedure_codes = athena_get_generator(
+                athena_query=qry_dql_procedure_code_table,
+                athena_database=CONFIG.ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA,
+                s3_output=CONFIG.ATHENA_QUERY_OUTPUT_LOCATION
+            )
 
-        df_procedure_codes.loc[df_procedure_codes['code'].str.strip() == '', 'code'] = None
-        df_procedure_codes.loc[df_procedure_codes['code'].str.strip().str.lower() == 'false', 'code'] = None
-        df_procedure_codes.dropna(inplace=True, ignore_index=True)
-
-        chunk_size = 200
-        total_codes = df_procedure_codes.shape[0]
-
-        DRIVER_LOGGED = get_headless_chrome_driver()
-
-        aapc_login(
-          driver=DRIVER_LOGGED,
-          url_login=URL_LOGIN,
-          aapc_email=aapc_email,
-          aapc_pw=aapc_pw,
-          primary_login='next',
-          second_login='continue',
-          username_field_id='userProvidedSignInName',
-          password_field_id='password',
-          second_login_button_id='btnSignIn',
-          subscription_menu_selector='#ctl00_Body_ctl00_mnuCodifySubscription'
-        )
-        
-        logger.info("Login realizado para extração logada")
-
-        for start_idx in range(0, total_codes, chunk_size):
-            end_idx = min(start_idx + chunk_size, total_codes)
-            chunk_codes = df_procedure_codes['code'].iloc[start_idx:end_idx]
-
-            list_data_descriptions_modifiers = {}
-
-            df_chunk_procedure_codes = pd.DataFrame(columns = ATHENA_PROCEDURE_CODES_COLUMNS)
-            df_modifiers = pd.DataFrame(columns = ATHENA_PROCEDURE_CODE_MODIFIER_COLUMNS)
-            df_new_procedure_ndc = pd.DataFrame(columns=ATHENA_PROCEDURE_CODE_NDC_COLUMNS)
-            for code in chunk_codes:
-              procedure_code, df_modifier, ndc_all = extracted_procedure_modifiers_v2(DRIVER_LOGGED, code)
-  
-              df_chunk_procedure_codes = pd.concat([df_chunk_procedure_codes, procedure_code], ignore_index=True)
-              
-              df_modifiers = pd.concat([df_modifiers, df_modifier], ignore_index=True)
-
-              df_new_procedure_ndc = pd.concat([df_new_procedure_ndc, ndc_all], ignore_index=True)
-
-              if not df_new_procedure_ndc.empty and not df_new_procedure_ndc.empty:
-                  if 'ndc_alternate_id' in df_procedure_ndc.columns and 'ndc_alternate_id' in df_new_procedure_ndc.columns:
-                      df_new_procedure_ndc = df_new_procedure_ndc[
-                          ~df_new_procedure_ndc['ndc_alternate_id'].isin(df_procedure_ndc['ndc_alternate_id'])
-                      ]
-
-              if 'modifier' in df_modifiers.columns and 'modifier' in df_procedure_modifiers.columns:
-                  df_modifiers = df_modifiers[
-                      ~df_modifiers['modifier'].isin(df_procedure_modifiers['modifier'])
-                  ]
-
-            if not df_chunk_procedure_codes.empty:
-                s3_athena_load_table_parquet_snappy(
-                    df=df_chunk_procedure_codes,
-                    database=ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA,
-                    table_name=ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_NAME,
-                    table_location=ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_LOCATION,
-                    s3_file_prefix=f'{datetime.now().strftime("%Y%m%d")}_',
-                    insert_mode='append'
-                )
-                logger.info(f"Códigos inseridos para o chunk {start_idx}-{end_idx - 1}")
-            else:
-                logger.info(f"Nenhum código novo para inserir no chunk {start_idx}-{end_idx - 1}")
-
-            if not df_modifiers.empty:
-                s3_athena_load_table_parquet_snappy(
-                    df=df_modifiers,
-                    database=ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_SCHEMA,
-                    table_name=ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_NAME,
-                    table_location=ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_LOCATION,
-                    s3_file_prefix=f'{datetime.now().strftime("%Y%m%d")}_',
-                    insert_mode='append'
-                )
-                logger.info(f"Modifiers inseridos para o chunk {start_idx}-{end_idx - 1}")
-            else:
-                logger.info(f"Nenhum modifier novo para inserir no chunk {start_idx}-{end_idx - 1}")
-
-            if not df_new_procedure_ndc.empty:
-                s3_athena_load_table_parquet_snappy(
-                    df=df_new_procedure_ndc,
-                    database=ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_SCHEMA,
-                    table_name=ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_NAME,
-                    table_location=ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_LOCATION,
-                    s3_file_prefix=f'{datetime.now().strftime("%Y%m%d")}_',
-                    insert_mode='append'
-                )
-                logger.info(f"NDCs inseridos para o chunk {start_idx}-{end_idx - 1}")
-            else:
-                logger.info(f"Nenhum NDC novo para inserir no chunk {start_idx}-{end_idx - 1}")
-
-        DRIVER_LOGGED.quit()
+            df_procedure_codes.loc[df_procedure_codes['code'].str.strip() == '', 'code'] = None
+            df_procedure_codes.loc[df_procedure_codes['code'].str.strip().str.lower() == 'false', 'code'] = None
+            df_procedure_codes.dropna(inplace=True, ignore_index=True)
+            codes = df_procedure_codes['code'].str.strip().tolist()
+            df_history = load_code_history()
+            load_interval_index()
+            if CONFIG.DISCOVERY_ENABLED:
+                codes = discover_crawl_codes(codes, df_history)
+            if df_history is not None:
+                codes = prioritize_codes(codes, df_history)
+            if CONFIG.CRAWL_MODE == 'standalone':
+                pending_codes = load_progress(CONFIG.CRAWL_PROGRESS_PATH)
+                pending_set = set(pending_codes)
+                codes = pending_codes + [c for c in codes if c not in pending_set]
+
+        df_procedure_modifiers, df_procedure_ndc = load_known_modifiers_and_ndc()
+
+        if CONFIG.CRAWL_MODE == 'coordinator':
+            lease_store = get_lease_store()
+            lease_store.create_leases(CONFIG.CRAWL_RUN_ID, codes, CHUNK_SIZE)
+        else:
+            driver_pool = new_driver_pool(aapc_email, aapc_pw)
+            crawl_executor = ThreadPoolExecutor(max_workers=CONFIG.CRAWL_MAX_WORKERS, thread_name_prefix='crawler')
+            parse_executor = new_parse_executor()
+            budget = RunBudget()
+            budget.install_signal_handlers()
+            concurrency = AdaptiveConcurrency(CONFIG.CRAWL_MAX_WORKERS, initial_workers=CONFIG.CRAWLER_WORKERS)
+            validator = new_output_validator()
+            ctx = CrawlContext(driver_pool, crawl_executor, parse_executor, df_procedure_modifiers, df_procedure_ndc, budget, concurrency, validator)
+            if CONFIG.CRAWL_MODE == 'worker':
+                load_interval_index()
+
+            logger.info("Login realizado para extração logada")
+
+            try:
+                if CONFIG.CRAWL_MODE == 'worker':
+                    run_worker(ctx, get_lease_store())
+                else:
+                    pending_codes = crawl_codes(ctx, codes)
+                    pending_codes += process_retries(ctx)
+                    save_progress(CONFIG.CRAWL_PROGRESS_PATH, CONFIG.CRAWL_RUN_ID, pending_codes)
+                logger.info(f"Validação da saída: {validator.summary()}")
+                if validator.aborted:
+                    raise RuntimeError(f"Run abortado pela validação: preenchimento colapsado em {sorted(validator.collapsed)}")
+                save_fill_rates(CONFIG.VALIDATION_STATS_PATH, CONFIG.CRAWL_RUN_ID, validator)
+                update_current_snapshot(ctx)
+            finally:
+                crawl_executor.shutdown()
+                if parse_executor is not None:
+                    parse_executor.shutdown()
+                driver_pool.close()
+                logger.info(f"Concorrência do crawl ao final do run: {concurrency.summary()}")
+                write_interval_dimension()
+                flush_html_archive()
     finally:
         logger.info("Processo finalizado.")
@@ -0,0 +1,102 @@
+"""
+Configuração do crawler de procedure codes, lida do ambiente no primeiro uso e não
+no import: `procedure_code` (e os workers de parse que o reimportam) sobe sem as
+variáveis obrigatórias, que só são exigidas quando um run de fato as usa.
+
+Os atributos têm o mesmo nome das variáveis de ambiente.
+"""
+import os
+import socket
+import threading
+
+from utils.config import LIFEMED_PG_SECRET_ID
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+class CrawlerConfig:
+    REQUIRED = (
+        'LOGICAL_DATE',
+        'AAPC_SECRET_ID',
+        'ATHENA_QUERY_OUTPUT_LOCATION',
+        'ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA',
+        'ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_NAME',
+        'ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_LOCATION',
+        'ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_SCHEMA',
+        'ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_NAME',
+        'ATHENA_OUTPUT_PROCEDURE_MODIFIERS_TABLE_LOCATION',
+        'ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_SCHEMA',
+        'ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_NAME',
+        'ATHENA_OUTPUT_PROCEDURE_NDC_TABLE_LOCATION',
+    )
+    OPTIONAL = (
+        'ATHENA_OUTPUT_PROCEDURE_CROSSWALK_TABLE_SCHEMA',
+        'ATHENA_OUTPUT_PROCEDURE_CROSSWALK_TABLE_LOCATION',
+        'ATHENA_OUTPUT_PROCEDURE_INTERVAL_TABLE_SCHEMA',
+        'ATHENA_OUTPUT_PROCEDURE_INTERVAL_TABLE_NAME',
+        'ATHENA_OUTPUT_PROCEDURE_INTERVAL_TABLE_LOCATION',
+        # tabela Iceberg com o estado atual de cada código (mesmo schema da tabela de procedure codes)
+        'ATHENA_OUTPUT_PROCEDURE_CODES_CURRENT_TABLE_NAME',
+        'ATHENA_OUTPUT_PROCEDURE_CODES_CURRENT_TABLE_LOCATION',
+        'POSTGRES_MIRROR_SECRET_ID',
+        'POSTGRES_MIRROR_SCHEMA',
+        # diretório (local ou s3://) do arquivo de HTML bruto; vazio desliga o arquivamento
+        'HTML_ARCHIVE_PATH',
+        # arquivo (local ou s3://) com os códigos que ficaram pendentes no último run
+        'CRAWL_PROGRESS_PATH',
+        # arquivo (local ou s3://) com as taxas de preenchimento do último run, baseline da validação
+        'VALIDATION_STATS_PATH',
+        # diretório (local ou s3://) das linhas em quarentena; vazio só registra no log
+        'VALIDATION_QUARANTINE_PATH',
+    )
+
+    def __init__(self, environ=None):
+        environ = os.environ if environ is None else environ
+        missing = [name for name in self.REQUIRED if name not in environ]
+        if missing:
+            logger.error(f"Missing env vars {missing}")
+            raise KeyError(missing[0])
+        for name in self.REQUIRED:
+            setattr(self, name, environ[name])
+        for name in self.OPTIONAL:
+            setattr(self, name, environ.get(name))
+
+        self.CRAWLER_WORKERS = int(environ.get('CRAWLER_WORKERS', 1))
+        # teto do controle adaptativo de concorrência; CRAWLER_WORKERS é o ponto de partida
+        self.CRAWL_MAX_WORKERS = max(self.CRAWLER_WORKERS, int(environ.get('CRAWL_MAX_WORKERS', self.CRAWLER_WORKERS)))
+        self.DRIVER_POOL_SIZE = int(environ.get('DRIVER_POOL_SIZE', self.CRAWL_MAX_WORKERS + 1))
+        # processos da etapa de parse; 0 faz o parse na própria thread do driver
+        self.PARSER_WORKERS = int(environ.get('PARSER_WORKERS', os.cpu_count() or 1))
+
+        # standalone | coordinator (cria os leases) | worker (processa leases)
+        self.CRAWL_MODE = environ.get('CRAWL_MODE', 'standalone')
+        self.CRAWL_RUN_ID = environ.get('CRAWL_RUN_ID', self.LOGICAL_DATE)
+        self.CRAWL_NODE_ID = environ.get('CRAWL_NODE_ID', f"{socket.gethostname()}-{os.getpid()}")
+        # 'postgres' ou 'sqlite:///caminho/leases.db'
+        self.CRAWL_LEASE_BACKEND = environ.get('CRAWL_LEASE_BACKEND', 'postgres')
+        self.CRAWL_LEASE_SECRET_ID = environ.get('CRAWL_LEASE_SECRET_ID', LIFEMED_PG_SECRET_ID)
+        self.CRAWL_LEASE_SCHEMA = environ.get('CRAWL_LEASE_SCHEMA', 'teste')
+        self.DISCOVERY_ENABLED = _flag(environ.get('DISCOVERY_ENABLED', 'false'))
+        # perfis/colunas extraídos no run (procedure_records.FIELD_PROFILES), ex.: 'core,ndc'
+        self.CRAWL_FIELDS = environ.get('CRAWL_FIELDS', 'full')
+
+_config = None
+_config_lock = threading.Lock()
+
+def get_config():
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                _config = CrawlerConfig()
+    return _config
+
+class _ConfigProxy:
+    """Acesso a `get_config()` por atributo: CONFIG.LOGICAL_DATE lê o ambiente na primeira vez."""
+    def __getattr__(self, name):
+        return getattr(get_config(), name)
+
+CONFIG = _ConfigProxy()
@@ -0,0 +1,413 @@
+"""
+Parsers das páginas de procedure codes.
+
+Cada campo é declarado como um `Field` (seletores + pós-processador) em uma tabela
+compilada no import; `parse_page` e `parse_tab` executam essas tabelas sobre o HTML.
+`parse_capture` é a etapa de parse do pipeline: recebe o HTML capturado pelo fetch
+de um código e pode rodar em outro processo.
+Este módulo depende apenas de bs4/soupsieve, sem Selenium.
+"""
+import re
+from bs4 import BeautifulSoup
+
+from utils.extraction import Field, run_fields
+
+PAGE_KIND_ACTIVE_CPT = 'active_cpt'
+PAGE_KIND_ACTIVE_HCPCS = 'active_hcpcs'
+PAGE_KIND_DELETED = 'deleted'
+PAGE_KIND_404 = '404'
+PAGE_KIND_GENERIC = 'generic'
+
+RE_H1 = re.compile(r'<h1[^>]*>(.*?)</h1>', re.IGNORECASE | re.DOTALL)
+RE_DELETED_SPAN = re.compile(r'<span[^>]*>[^<]*\bDeleted\b[^<]*</span>', re.IGNORECASE)
+RE_DELETED = re.compile(r'\bDeleted\b', re.IGNORECASE)
+RE_ADVICE = re.compile(r'Advice:')
+RE_WHITESPACE = re.compile(r'\s+')
+RE_READ_LESS = re.compile(r'Read Less', re.IGNORECASE)
+RE_CPT_RANGE_HREF = re.compile(r'/cpt-codes-range/(\d{4,5}T?-\d{4,5}T?)/')
+RE_HCPCS_RANGE = re.compile(r'\b([A-Z]\d{4}-[A-Z]\d{4})\b')
+RE_RANGE_LINK = re.compile(r'/(?:cpt|hcpcs)-codes-range/[^/"\'\s]+/')
+# <div class="... newbread ... logout-header ..."> (breadcrumb da página deslogada), em qualquer ordem
+RE_LOGOUT_HEADER = re.compile(
+    r'<div\b[^>]*\bclass\s*=\s*["\'](?=[^"\']*(?<![\w-])newbread(?![\w-]))(?=[^"\']*(?<![\w-])logout-header(?![\w-]))',
+    re.IGNORECASE
+)
+# <div class="... container404 ..."> da página de erro (is_error_404_page)
+RE_CONTAINER_404 = re.compile(
+    r'<div\b[^>]*\bclass\s*=\s*["\'](?=[^"\']*(?<![\w-])container404(?![\w-]))',
+    re.IGNORECASE
+)
+RE_CODE_LINK = re.compile(r'/(?:cpt|hcpcs)-codes/([0-9A-Za-z]\d{3}[0-9A-Za-z])\b')
+
+BREADCRUMB_ROOTS = ("CPT Codes", "HCPCS Codes")
+
+def parse_html(html):
+    return BeautifulSoup(html, 'html.parser')
+
+def classify_page(html, url, status=None):
+    """
+    Classifica a página pelo status HTTP (quando disponível), pela URL e por uma
+    varredura textual do HTML, sem montar a árvore do BeautifulSoup.
+    """
+    if status == 404 or RE_CONTAINER_404.search(html):
+        return PAGE_KIND_404
+    h1 = RE_H1.search(html)
+    if h1 and 'Deleted HCPCS Codes' in h1.group(1):
+        return PAGE_KIND_GENERIC
+    if RE_DELETED_SPAN.search(html):
+        return PAGE_KIND_DELETED
+    return PAGE_KIND_ACTIVE_CPT if 'cpt' in url.lower() else PAGE_KIND_ACTIVE_HCPCS
+
+def has_logout_header(html):
+    """
+    Breadcrumb `div.newbread.logout-header`, só renderizado para visitantes sem sessão.
+    Procura a tag, não o texto: o nome da classe também aparece no CSS e no JS das páginas logadas.
+    """
+    return bool(RE_LOGOUT_HEADER.search(html))
+
+def is_error_404_page(soup):
+    return bool(soup.find('div', class_='container404'))
+
+def is_deleted_hcpcs_page(soup):
+    h1_tag = soup.find('h1')
+    return h1_tag and 'Deleted HCPCS Codes' in h1_tag.get_text(strip=True)
+
+def get_deleted(soup):
+
+    deleted_span = soup.find('span', string=RE_DELETED)
+    if not deleted_span:
+        return None  
+
+    date_deleted = None
+    alert_div = soup.find('div', class_='alert alert-danger')
+    if alert_div:
+        date_deleted = alert_div.get_text(separator=' ', strip=True)
+        date_deleted = ' '.join(date_deleted.split())
+
+    advice = None
+    advice_label = soup.find(string=RE_ADVICE)
+    if advice_label:
+        for div in advice_label.find_parents('div'):
+            p = div.find('p')
+            if p:
+                adv_text = p.get_text(strip=True)
+            else:
+                text = div.get_text(separator=' ', strip=True)
+                adv_text = text.split('Advice:', 1)[1].strip()
+                if not adv_text:
+                    continue
+            advice = ' '.join(adv_text.split())
+            break
+
+    lay_term = None
+    layterm_divs = soup.find_all('div', class_='panel-body tab-pane')
+    for div in layterm_divs:
+        text = div.get_text(separator=' ', strip=True)
+        if 'The provider administers the first dose' in text and 'COVID–19' in text:
+            lay_term = text.strip()
+            break
+
+    guidelines = None
+    for div in layterm_divs:
+        text = div.get_text(separator=' ', strip=True)
+        if 'Guidelines found' in text or 'No CPT' in text or 'No HCPCS' in text:
+            guidelines = text.strip()
+            break
+        
+    description = None
+    panels = soup.find_all('div', class_='panel panel-default')
+    for panel in panels:
+        heading = panel.find('div', class_='panel-heading')
+        if heading and 'Code Descriptor' in heading.get_text():
+            body = panel.find('div', class_='panel-body tab-pane')
+            if body:
+                raw_text = body.get_text(strip=True, separator=' ')
+                description = RE_WHITESPACE.sub(' ', raw_text)
+                break
+
+    return date_deleted, advice, lay_term, guidelines, description
+
+# pós-processadores
+
+def _text(element):
+    return element.get_text().strip()
+
+def _spaced_text(element):
+    return element.get_text(separator=' ', strip=True)
+
+def _short_description(h1_tag):
+    full_text = h1_tag.get_text().strip()
+    parts = full_text.split(',', 1)
+    return parts[1].strip() if len(parts) > 1 else full_text
+
+def _main_interval_name(breadcrumbs_div):
+    main_interval_name = []
+    all_divs = breadcrumbs_div.find_all('div', class_='div')
+
+    index_start = -1
+    for i, div in enumerate(all_divs):
+        a_tag = div.find('a')
+        if a_tag and a_tag.get_text(strip=True) in BREADCRUMB_ROOTS:
+            index_start = i
+
+    if index_start != -1:
+        for div in all_divs[index_start + 1:]:
+            if div.find('a'):
+                span = div.find('span')
+                if span:
+                    main_interval_name.append(span.get_text(strip=True))
+            else:
+                break
+
+    return main_interval_name if main_interval_name else None
+
+def _cpt_intervals(breadcrumbs_div):
+    intervals = []
+    for link in breadcrumbs_div.find_all('a', href=True):
+        match = RE_CPT_RANGE_HREF.search(link['href'])
+        if match:
+            intervals.append(match.group(1))
+    return intervals
+
+def _hcpcs_intervals(breadcrumbs_div):
+    intervals = []
+    for span in breadcrumbs_div.find_all('span'):
+        match = RE_HCPCS_RANGE.search(span.get_text().strip())
+        if match:
+            intervals.append(match.group(1))
+    return intervals
+
+def _first_or_empty(intervals):
+    return intervals[0] if intervals else ''
+
+def _last_or_none(intervals):
+    return intervals[-1] if intervals else None
+
+def _modifier_rows(tbody):
+    data = []
+    for row in tbody.find_all('tr'):
+        cells = row.find_all('td')
+        if cells and len(cells) >= 2:
+            data.append([cells[0].get_text().strip(), cells[1].get_text().strip()])
+    return data
+
+def _betos(betos_div):
+    betos_code = None
+    betos_description = None
+    for inner_div in betos_div.find_all('div'):
+        strong_tag = inner_div.find('strong')
+        if strong_tag:
+            if 'Code:' in strong_tag.text:
+                betos_code = inner_div.get_text().replace('Code:', '').strip()
+            elif 'Description:' in strong_tag.text:
+                betos_description = inner_div.get_text().replace('Description:', '').strip()
+    return betos_code, betos_description
+
+def _lay_term(full_div):
+    summary = None
+    first_p = full_div.find('p')
+    if first_p:
+        summary = first_p.get_text(strip=True)
+
+    read_less_link = full_div.find('a', string=RE_READ_LESS)
+    if read_less_link:
+        read_less_link.decompose()
+
+    lay_term = full_div.get_text(separator=' ', strip=True)
+
+    if lay_term.lower().endswith("read less"):
+        lay_term = lay_term[:-len("Read Less")].strip()
+    return summary, lay_term
+
+def _first_column_codes(table, skip_header):
+    codes = []
+    rows = table.find_all('tr')[1:] if skip_header else table.select('tbody tr')
+    for row in rows:
+        cols = row.find_all('td')
+        if len(cols) >= 1:
+            code = cols[0].get_text(strip=True)
+            if code:
+                codes.append(code)
+    return codes
+
+def _revenue_lookup(revenue_div):
+    if "Data Not Available" in revenue_div.get_text():
+        return None
+    table = revenue_div.select_one('table.points_table')
+    if not table:
+        return None
+    return _first_column_codes(table, skip_header=True)
+
+def _icd_pcs(pcs_div):
+    table = pcs_div.select_one('table.points_table')
+    if not table:
+        return None
+    return _first_column_codes(table, skip_header=False) or None
+
+def _icd10_cm_codes(table):
+    codes = []
+    for row in table.select('tbody tr'):
+        cols = row.find_all('td')
+        if cols:
+            text = cols[0].get_text().strip()
+            if text:
+                codes.append(text.replace('.', ''))
+    return codes
+
+def _ndc(ndc_div):
+    table = ndc_div.find('table')
+    if not table:
+        return None, None
+    alternate_ids = []
+    ndc_rows = []
+    for row in table.select('tbody tr'):
+        values = [col.text.strip() for col in row.find_all('td')]
+        if any(values) and len(values) >= 5:
+            alternate_ids.append(values[0])
+            ndc_rows.append({
+                'ndc_alternate_id': values[0],
+                'drug_name': values[1],
+                'labeler_name': values[2],
+                'hcpcs_dosage': values[3],
+                'bill_unit': values[4].strip() if values[4] else ''
+            })
+    return alternate_ids or None, ndc_rows or None
+
+def _symbol_descriptions(container, drop_images):
+    extracted_symbols = []
+    for icon_div in container.find_all('div', class_='icon-dic-o'):
+        if drop_images:
+            for img_tag in icon_div.find_all('img'):
+                img_tag.decompose()
+        parts = icon_div.get_text(separator=' ', strip=True).split(':', 1)
+        if len(parts) == 2:
+            description = parts[1].strip()
+            if description:
+                extracted_symbols.append(description)
+    return extracted_symbols or None
+
+def _hcpcs_symbols(soup):
+    hcpcs_title = soup.find('p', class_='box-detail-head', string='HCPCS Code Symbols')
+    if hcpcs_title:
+        box_detail_div = hcpcs_title.find_parent('div', class_='box-detail box-blue')
+        if box_detail_div:
+            return _symbol_descriptions(box_detail_div, drop_images=True)
+    return None
+
+def _descriptor(descriptor_div):
+    return ' '.join(descriptor_div.stripped_strings) or None
+
+# campos da página principal, por tipo de código
+
+_COMMON_PAGE_FIELDS = [
+    Field('short_description', ['div.layout2_code h1'], _short_description, default=''),
+    Field('long_description', ['div.sub_head_detail', 'h2.sub_head_detail'], _text, default=''),
+    Field('main_interval_name', ['div.div.newbread', 'div.newbread.logout-header'], _main_interval_name),
+    Field('modifier_rows', ['div.modcross_list tbody'], _modifier_rows),
+]
+PAGE_FIELDS = {
+    True: _COMMON_PAGE_FIELDS + [
+        Field('main_interval', ['div.div.newbread'], lambda div: _first_or_empty(_cpt_intervals(div)), default=''),
+        Field('leaf_interval', ['div.div.newbread'], lambda div: _last_or_none(_cpt_intervals(div))),
+    ],
+    False: _COMMON_PAGE_FIELDS + [
+        Field('main_interval', ['div.div.newbread'], lambda div: _first_or_empty(_hcpcs_intervals(div)), default=''),
+        Field('leaf_interval', ['div.div.newbread'], lambda div: _last_or_none(_hcpcs_intervals(div))),
+    ],
+}
+# campos derivados do breadcrumb, dispensáveis quando o índice de intervalos resolve o código
+BREADCRUMB_FIELDS = ('main_interval', 'main_interval_name', 'leaf_interval')
+
+# campos das abas, aplicados ao HTML capturado depois do clique na aba
+
+TAB_FIELDS = {
+    'betos': Field('betos', ['div#cpt_betos', 'div#hcpcs_betos'], _betos, default=(None, None)),
+    'guidelines': Field('guidelines', ['div#cpt_guidelines'], _spaced_text),
+    'advice': Field('advice', ['div#cpt_advice'], _spaced_text),
+    'lay_term': Field('lay_term', ['div#fullLayterm'], _lay_term, default=(None, None)),
+    'report': Field('report', ['div#cpt_report'], _spaced_text),
+    'revenue_lookup': Field('revenue_lookup', ['div#cpt_revenue_cross'], _revenue_lookup),
+    'icd10_cm': Field('icd10_cm', None, _icd10_cm_codes),
+    'ndc': Field('ndc', ['div#ndc'], _ndc, default=(None, None)),
+    'icd_10_pcs_x': Field('icd_10_pcs_x', ['div#pcsdata'], _icd_pcs),
+    'cpt_code_symbols_cpt': Field('cpt_code_symbols', ['div#cpt_symbol_div'], lambda div: _symbol_descriptions(div, drop_images=False)),
+    'cpt_code_symbols_hcpcs': Field('cpt_code_symbols', None, _hcpcs_symbols),
+    'description': Field('description', ['div.tab-pane'], _descriptor),
+}
+# abas cujo resultado é a união dos snapshots (uma letra do ICD-10 CM por snapshot)
+TAB_MERGED = ('icd10_cm',)
+
+# estágio (aba) -> colunas preenchidas; '_ndc_rows' alimenta a tabela de NDC
+TAB_COLUMNS = {
+    'betos': ['betos_code', 'betos_description'],
+    'guidelines': ['guidelines'],
+    'advice': ['advice'],
+    'lay_term': ['summary', 'lay_term'],
+    'report': ['report'],
+    'revenue_lookup': ['revenue_lookup'],
+    'icd10_cm': ['icd10_cm'],
+    'ndc': ['ndc_alternate_id', '_ndc_rows'],
+    'icd_10_pcs_x': ['icd_10_pcs_x'],
+    'cpt_code_symbols': ['cpt_code_symbols'],
+    'description': ['description'],
+}
+
+def stages_for_columns(columns):
+    columns = set(columns)
+    return {stage for stage, stage_columns in TAB_COLUMNS.items() if columns.intersection(stage_columns)}
+
+def parse_page(soup, is_cpt, exclude=()):
+    fields = PAGE_FIELDS[is_cpt]
+    if exclude:
+        fields = [field for field in fields if field.name not in exclude]
+    values = run_fields(fields, soup)
+    values['modifier_rows'] = values['modifier_rows'] or []
+    values['modifiers'] = [row[0] for row in values['modifier_rows']]
+    return values
+
+def parse_tab(name, html):
+    soup = html if isinstance(html, BeautifulSoup) else parse_html(html)
+    return TAB_FIELDS[name](soup)
+
+def parse_captured_tab(name, snapshots):
+    """
+    Aplica o campo da aba aos snapshots capturados (um por clique): devolve o primeiro
+    resultado não vazio, ou a união dos resultados para as abas em TAB_MERGED.
+    """
+    if name in TAB_MERGED:
+        merged = []
+        for html in snapshots:
+            merged.extend(parse_tab(name, html) or [])
+        return merged or None
+    value = TAB_FIELDS[name].default
+    for html in snapshots:
+        value = parse_tab(name, html)
+        if value is not None and value != (None, None):
+            break
+    return value
+
+def parse_capture(html, is_cpt, tabs, skip_breadcrumb=False):
+    """
+    Etapa de parse de um código capturado pelo fetch: `html` é a página principal
+    (None quando só abas são refeitas) e `tabs` mapeia estágio -> (aba, snapshots).
+    Retorna (valores por coluna, falhas por estágio).
+    """
+    values = {}
+    failures = {}
+    if html is not None:
+        try:
+            values = parse_page(parse_html(html), is_cpt, exclude=BREADCRUMB_FIELDS if skip_breadcrumb else ())
+        except Exception as e:
+            return {}, {'parse': str(e)}
+
+    for stage, (name, snapshots) in tabs.items():
+        try:
+            tab_values = parse_captured_tab(name, snapshots)
+        except Exception as e:
+            failures[stage] = str(e)
+            continue
+        columns = TAB_COLUMNS[stage]
+        if len(columns) == 1:
+            tab_values = (tab_values,)
+        values.update(zip(columns, tab_values))
+    return values, failures
@@ -0,0 +1,74 @@
+"""
+Registros das linhas extraídas por código.
+
+A extração devolve namedtuples (uma tupla por linha, sem dict por instância) e o
+DataFrame só é montado no flush, uma vez por chunk, com `records_frame`.
+"""
+import json
+import hashlib
+from collections import namedtuple
+from utils.lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+ATHENA_PROCEDURE_CODES_COLUMNS = ['code', 'code_type', 'main_interval', 'main_interval_name', 'modifiers', 'short_description', 'long_description', 'description', 'summary', 'date_deleted', 'betos_code', 'betos_description', 'guidelines', 'advice', 'lay_term', 'report', 'revenue_lookup', 'icd10_cm', 'ndc_alternate_id', 'icd_10_pcs_x', 'cpt_code_symbols']
+ATHENA_PROCEDURE_CODE_MODIFIER_COLUMNS = ['modifier', 'description']
+ATHENA_PROCEDURE_CODE_NDC_COLUMNS = ['ndc_alternate_id', 'drug_name', 'labeler_name', 'hcpcs_dosage', 'bill_unit']
+
+# colunas que vêm da página principal, preenchidas em todo perfil
+PAGE_COLUMNS = ['code', 'code_type', 'main_interval', 'main_interval_name', 'modifiers', 'short_description', 'long_description', 'date_deleted']
+
+# perfis de CRAWL_FIELDS -> colunas da tabela de procedure codes; as demais vão nulas
+FIELD_PROFILES = {
+    'core': PAGE_COLUMNS,
+    'ndc': ['ndc_alternate_id'],
+    'betos': ['betos_code', 'betos_description'],
+    'text': ['description', 'summary', 'guidelines', 'advice', 'lay_term', 'report'],
+    'crosswalks': ['icd10_cm', 'icd_10_pcs_x', 'revenue_lookup'],
+    'symbols': ['cpt_code_symbols'],
+    'full': ATHENA_PROCEDURE_CODES_COLUMNS,
+}
+
+# colunas de controle acrescentadas no flush à tabela de procedure codes (não fazem parte do registro)
+ATHENA_PROCEDURE_CODES_METADATA_COLUMNS = ['content_fingerprint', 'crawled_at']
+# o fingerprint cobre todas as colunas gravadas, inclusive as das abas; colunas puladas
+# pelo perfil de CRAWL_FIELDS vão nulas, então trocar de perfil também muda o fingerprint
+FINGERPRINT_COLUMNS = ATHENA_PROCEDURE_CODES_COLUMNS
+
+ProcedureCodeRecord = namedtuple('ProcedureCodeRecord', ATHENA_PROCEDURE_CODES_COLUMNS, defaults=(None,) * len(ATHENA_PROCEDURE_CODES_COLUMNS))
+ModifierRecord = namedtuple('ModifierRecord', ATHENA_PROCEDURE_CODE_MODIFIER_COLUMNS)
+NdcRecord = namedtuple('NdcRecord', ATHENA_PROCEDURE_CODE_NDC_COLUMNS)
+
+def resolve_fields(spec):
+    """
+    Colunas selecionadas por CRAWL_FIELDS ('core,ndc', 'full', 'core,icd10_cm'...):
+    aceita perfis e nomes de coluna, e sempre inclui as colunas da página principal.
+    """
+    columns = set(PAGE_COLUMNS)
+    for name in (part.strip() for part in spec.split(',')):
+        if not name:
+            continue
+        if name in FIELD_PROFILES:
+            columns.update(FIELD_PROFILES[name])
+        elif name in ATHENA_PROCEDURE_CODES_COLUMNS:
+            columns.add(name)
+        else:
+            raise ValueError(f"Unknown field or profile '{name}' in CRAWL_FIELDS")
+    return [column for column in ATHENA_PROCEDURE_CODES_COLUMNS if column in columns]
+
+def records_frame(records, record_type):
+    return pd.DataFrame.from_records(records, columns=record_type._fields)
+
+def content_fingerprint(values):
+    payload = json.dumps(list(values), ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def with_row_metadata(df, crawled_at):
+    """
+    Acrescenta content_fingerprint (hash das FINGERPRINT_COLUMNS) e crawled_at às linhas de
+    procedure codes: o histórico do scheduler conta as mudanças de fingerprint entre crawls.
+    """
+    df = df.copy()
+    df['content_fingerprint'] = [content_fingerprint(values) for values in df[FINGERPRINT_COLUMNS].itertuples(index=False)]
+    df['crawled_at'] = pd.Timestamp(crawled_at)
+    return df
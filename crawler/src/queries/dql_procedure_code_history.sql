@@ -0,0 +1,30 @@
+-- Histórico de crawl por código, lido pelo scheduler (utils/scheduler.py, HISTORY_COLUMNS).
+-- change_count conta as mudanças de content_fingerprint entre crawls consecutivos; linhas
+-- gravadas antes das colunas de controle usam a data do arquivo e não contam mudanças.
+WITH crawls AS (
+    SELECT
+        code,
+        date_deleted,
+        content_fingerprint,
+        coalesce(crawled_at, CAST("$file_modified_time" AS timestamp)) AS crawled_at
+    FROM "{ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA}"."{ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_NAME}"
+    WHERE code IS NOT NULL
+),
+ordered AS (
+    SELECT
+        code,
+        date_deleted,
+        crawled_at,
+        content_fingerprint,
+        lag(content_fingerprint) OVER (PARTITION BY code ORDER BY crawled_at) AS previous_fingerprint,
+        row_number() OVER (PARTITION BY code ORDER BY crawled_at DESC) AS recency
+    FROM crawls
+)
+SELECT
+    code,
+    max(crawled_at) AS last_crawled_at,
+    count(*) AS crawl_count,
+    count_if(content_fingerprint <> previous_fingerprint) AS change_count,
+    coalesce(bool_or(recency = 1 AND coalesce(date_deleted, '') <> ''), false) AS is_deleted
+FROM ordered
+GROUP BY code
@@ -0,0 +1,97 @@
+"""
+Reconstrói as tabelas de saída a partir do arquivo de HTML bruto de um run
+(`utils.html_archive`), sem browser nem rede: útil depois de corrigir um parser ou
+acrescentar uma coluna em ATHENA_PROCEDURE_CODES_COLUMNS.
+
+Uso (a partir de crawler/src, com as mesmas variáveis de ambiente do crawler):
+    HTML_ARCHIVE_PATH=s3://bucket/html-archive REPARSE_RUN_ID=2025-06-01 python reparse.py
+"""
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from procedure_parsers import PAGE_KIND_DELETED, get_deleted, parse_capture, parse_html
+from procedure_config import CONFIG
+from procedure_code import (
+    CHUNK_SIZE, CrawlContext, assemble_extraction, deleted_extraction,
+    flush_outputs, load_known_modifiers_and_ndc, update_current_snapshot
+)
+from utils.html_archive import HtmlArchive
+from utils.logger import get_logger
+
+logger = get_logger('reparse')
+
+REPARSE_WORKERS = int(os.environ.get('REPARSE_WORKERS', os.cpu_count() or 1))
+
+_worker_archives = {}
+
+def reparse_entry(archive_root, run_id, entry):
+    """
+    Parse de uma entrada do manifest em um processo do pool: lê os blobs e devolve
+    (deleted_check, (valores, falhas)).
+    """
+    archive = _worker_archives.get(archive_root)
+    if archive is None:
+        archive = _worker_archives[archive_root] = HtmlArchive(archive_root, run_id)
+    html = archive.get_blob(entry['html'])
+    if entry['page_kind'] == PAGE_KIND_DELETED:
+        deleted_check = get_deleted(parse_html(html))
+        if deleted_check:
+            return deleted_check, None
+    tabs = {
+        stage: (name, [archive.get_blob(digest) for digest in digests])
+        for stage, (name, digests) in entry['tabs'].items()
+    }
+    return None, parse_capture(html, entry['is_cpt'], tabs)
+
+def rebuild_extraction(entry, result):
+    deleted_check, parsed = result
+    if deleted_check:
+        return deleted_extraction(entry['code'], entry['is_cpt'], deleted_check)
+    capture = {
+        'code': entry['code'], 'result': None, 'is_cpt': entry['is_cpt'],
+        'interval': None, 'partial': None, 'failures': {}
+    }
+    return assemble_extraction(capture, parsed)
+
+def reparse_run(archive, run_id, ctx, workers=REPARSE_WORKERS):
+    entries = archive.entries(run_id)
+    logger.info(f"{len(entries)} códigos arquivados no run {run_id}")
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(reparse_entry, archive.root, run_id, entry) for entry in entries]
+        for start_idx in range(0, len(entries), CHUNK_SIZE):
+            chunk = entries[start_idx:start_idx + CHUNK_SIZE]
+            chunk_codes, chunk_modifiers, chunk_ndcs = [], [], []
+            for entry, future in zip(chunk, futures[start_idx:start_idx + CHUNK_SIZE]):
+                try:
+                    procedure_code, modifiers, ndcs, failures = rebuild_extraction(entry, future.result())
+                except Exception as e:
+                    logger.error(f"Erro no re-parse do código {entry['code']}: {e}")
+                    failed.append(entry['code'])
+                    continue
+                if failures:
+                    logger.warning(f"Código {entry['code']} com falhas no re-parse: {sorted(failures)}")
+                if procedure_code is not None:
+                    chunk_codes.append(procedure_code)
+                chunk_modifiers.extend(modifiers)
+                chunk_ndcs.extend(ndcs)
+            quarantined_codes = flush_outputs(
+                ctx, chunk_codes, chunk_modifiers, chunk_ndcs,
+                label=f"reparse {start_idx}-{start_idx + len(chunk) - 1}"
+            )
+            failed.extend(quarantined_codes)
+    return failed
+
+if __name__ == "__main__":
+    REPARSE_RUN_ID = os.environ.get('REPARSE_RUN_ID') or CONFIG.CRAWL_RUN_ID
+    logger.info(f"Início do re-parse do run {REPARSE_RUN_ID}")
+    if not CONFIG.HTML_ARCHIVE_PATH:
+        raise ValueError("HTML_ARCHIVE_PATH não definido")
+    df_procedure_modifiers, df_procedure_ndc = load_known_modifiers_and_ndc()
+    ctx = CrawlContext(None, None, None, df_procedure_modifiers, df_procedure_ndc, None)
+    failed = reparse_run(HtmlArchive(CONFIG.HTML_ARCHIVE_PATH, REPARSE_RUN_ID), REPARSE_RUN_ID, ctx)
+    if failed:
+        logger.warning(f"{len(failed)} códigos não reprocessados: {failed[:50]}")
+    update_current_snapshot(ctx)
+    logger.info("Re-parse finalizado.")
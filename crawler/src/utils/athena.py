@@ -1,10 +1,11 @@
 import types
-import awswrangler as wr
-
-import pandas as pd
 import time
 
 from utils.logger import get_logger
+from utils.lazy import lazy_import
+
+wr = lazy_import('awswrangler')
+pd = lazy_import('pandas')
 
 logger = get_logger(__name__)
 
@@ -51,4 +52,12 @@ def athena_get_generator(
   except Exception as e:
     logger.error("Fail to create Athena generator")
     logger.error(e)
-    raise e
\ No newline at end of file
+    raise e
+
+def athena_table_exists(database, table):
+  try:
+    return wr.catalog.does_table_exist(database=database, table=table)
+  except Exception as e:
+    logger.error(f"Fail to check table {database}.{table} on Glue catalog")
+    logger.error(e)
+    raise e
@@ -0,0 +1,144 @@
+import os
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CRAWL_MIN_WORKERS = int(os.environ.get('CRAWL_MIN_WORKERS', 1))
+CRAWL_TARGET_LATENCY_SECONDS = float(os.environ.get('CRAWL_TARGET_LATENCY_SECONDS', 5))
+CRAWL_INCREASE_EVERY = int(os.environ.get('CRAWL_INCREASE_EVERY', 20))
+CRAWL_DECREASE_FACTOR = float(os.environ.get('CRAWL_DECREASE_FACTOR', 0.5))
+CRAWL_DECREASE_COOLDOWN_SECONDS = float(os.environ.get('CRAWL_DECREASE_COOLDOWN_SECONDS', 15))
+CRAWL_DELAY_STEP_SECONDS = float(os.environ.get('CRAWL_DELAY_STEP_SECONDS', 0.5))
+CRAWL_MAX_DELAY_SECONDS = float(os.environ.get('CRAWL_MAX_DELAY_SECONDS', 30))
+
+OUTCOME_OK = 'ok'
+OUTCOME_SLOW = 'slow'
+OUTCOME_TIMEOUT = 'timeout'
+OUTCOME_THROTTLED = 'throttled'
+OUTCOME_SERVER_ERROR = 'server_error'
+OUTCOME_LOGIN_REDIRECT = 'login_redirect'
+
+# sinais de que o site está pedindo para desacelerar: além de reduzir os workers, espaçam as requisições
+RATE_OUTCOMES = (OUTCOME_THROTTLED, OUTCOME_SERVER_ERROR, OUTCOME_LOGIN_REDIRECT)
+
+def classify_outcome(latency, status=None, timeouts=0, login_redirect=False, target_latency=CRAWL_TARGET_LATENCY_SECONDS):
+  if status == 429:
+    return OUTCOME_THROTTLED
+  if status is not None and status >= 500:
+    return OUTCOME_SERVER_ERROR
+  if login_redirect:
+    return OUTCOME_LOGIN_REDIRECT
+  if timeouts:
+    return OUTCOME_TIMEOUT
+  if latency is not None and latency > target_latency:
+    return OUTCOME_SLOW
+  return OUTCOME_OK
+
+class AdaptiveConcurrency:
+  """
+  Controle AIMD do crawl: o número de workers ativos sobe de um a cada `increase_every`
+  páginas saudáveis e cai pelo `decrease_factor` em latência alta, timeout, 429/5xx ou
+  redirect para o login (no máximo uma redução por `cooldown_seconds`, para uma rajada
+  de erros contar como um evento só). 429/5xx e login também espaçam o início das
+  requisições; o espaçamento volta a cair antes de os workers voltarem a subir.
+  """
+  def __init__(self, max_workers, min_workers=CRAWL_MIN_WORKERS, initial_workers=None,
+               target_latency_seconds=CRAWL_TARGET_LATENCY_SECONDS, increase_every=CRAWL_INCREASE_EVERY,
+               decrease_factor=CRAWL_DECREASE_FACTOR, cooldown_seconds=CRAWL_DECREASE_COOLDOWN_SECONDS,
+               delay_step_seconds=CRAWL_DELAY_STEP_SECONDS, max_delay_seconds=CRAWL_MAX_DELAY_SECONDS):
+    self.max_workers = max(1, max_workers)
+    self.min_workers = max(1, min(min_workers, self.max_workers))
+    self.limit = min(self.max_workers, max(self.min_workers, initial_workers or self.max_workers))
+    self.delay = 0.0
+    self.target_latency_seconds = target_latency_seconds
+    self.increase_every = increase_every
+    self.decrease_factor = decrease_factor
+    self.cooldown_seconds = cooldown_seconds
+    self.delay_step_seconds = delay_step_seconds
+    self.max_delay_seconds = max_delay_seconds
+    self.outcomes = Counter()
+    self.adjustments = 0
+    self._active = 0
+    self._healthy = 0
+    self._next_start = 0.0
+    self._last_decrease = None
+    self._cond = threading.Condition()
+
+  def acquire(self):
+    with self._cond:
+      while self._active >= self.limit:
+        self._cond.wait()
+      self._active += 1
+      now = time.monotonic()
+      start_at = max(now, self._next_start)
+      self._next_start = start_at + self.delay
+    if start_at > now:
+      time.sleep(start_at - now)
+
+  def release(self):
+    with self._cond:
+      self._active -= 1
+      self._cond.notify()
+
+  @contextmanager
+  def slot(self):
+    self.acquire()
+    try:
+      yield
+    finally:
+      self.release()
+
+  def record(self, latency, status=None, timeouts=0, login_redirect=False):
+    outcome = classify_outcome(latency, status, timeouts, login_redirect, self.target_latency_seconds)
+    with self._cond:
+      self.outcomes[outcome] += 1
+      if outcome == OUTCOME_OK:
+        self._healthy += 1
+        if self._healthy >= self.increase_every:
+          self._healthy = 0
+          self._increase()
+      else:
+        self._healthy = 0
+        self._decrease(outcome, latency, status)
+    return outcome
+
+  def _increase(self):
+    if self.delay > 0:
+      self._adjust(self.limit, max(0.0, self.delay - self.delay_step_seconds), f"{self.increase_every} healthy pages")
+    elif self.limit < self.max_workers:
+      self._adjust(self.limit + 1, self.delay, f"{self.increase_every} healthy pages")
+
+  def _decrease(self, outcome, latency, status):
+    now = time.monotonic()
+    if self._last_decrease is not None and now - self._last_decrease < self.cooldown_seconds:
+      return
+    self._last_decrease = now
+    limit = max(self.min_workers, int(self.limit * self.decrease_factor))
+    delay = self.delay
+    if outcome in RATE_OUTCOMES:
+      delay = min(self.max_delay_seconds, max(self.delay * 2, self.delay_step_seconds))
+    detail = f"status {status}" if status is not None and outcome in (OUTCOME_THROTTLED, OUTCOME_SERVER_ERROR) else f"latency {latency:.1f}s" if latency is not None else ''
+    self._adjust(limit, delay, f"{outcome} {detail}".strip())
+
+  def _adjust(self, limit, delay, reason):
+    if limit == self.limit and delay == self.delay:
+      return
+    logger.info(f"Crawl concurrency {self.limit}->{limit} workers, request delay {self.delay:.2f}s->{delay:.2f}s ({reason})")
+    grew = limit > self.limit
+    self.limit = limit
+    self.delay = delay
+    self.adjustments += 1
+    if grew:
+      self._cond.notify_all()
+
+  def summary(self):
+    with self._cond:
+      return (
+        f"limit={self.limit}/{self.max_workers} delay={self.delay:.2f}s "
+        f"adjustments={self.adjustments} outcomes={dict(self.outcomes)}"
+      )
@@ -0,0 +1,202 @@
+import os
+import time
+import threading
+from collections import deque
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DRIVER_MAX_PAGES = int(os.environ.get('DRIVER_MAX_PAGES', 500))
+DRIVER_MAX_RSS_MB = float(os.environ.get('DRIVER_MAX_RSS_MB', 1500))
+DRIVER_MAX_LATENCY_SECONDS = float(os.environ.get('DRIVER_MAX_LATENCY_SECONDS', 20))
+DRIVER_LATENCY_WINDOW = int(os.environ.get('DRIVER_LATENCY_WINDOW', 50))
+DRIVER_RSS_CHECK_EVERY = int(os.environ.get('DRIVER_RSS_CHECK_EVERY', 25))
+
+# a conta é a mesma em todos os drivers: quando a sessão cai, um relogin por vez
+_RELOGIN_LOCK = threading.Lock()
+
+def process_tree_rss_mb(root_pid):
+  """
+  Soma o RSS (MB) do processo e de todos os descendentes lendo /proc (chromedriver -> chrome -> renderers).
+  """
+  children = {}
+  for entry in os.listdir('/proc'):
+    if not entry.isdigit():
+      continue
+    try:
+      with open(f'/proc/{entry}/stat', 'r') as f:
+        stat = f.read()
+      ppid = int(stat[stat.rindex(')') + 2:].split()[1])
+      children.setdefault(ppid, []).append(int(entry))
+    except (OSError, ValueError, IndexError):
+      continue
+
+  total_kb = 0
+  pending = [root_pid]
+  while pending:
+    pid = pending.pop()
+    pending.extend(children.get(pid, []))
+    try:
+      with open(f'/proc/{pid}/status', 'r') as f:
+        for line in f:
+          if line.startswith('VmRSS:'):
+            total_kb += int(line.split()[1])
+            break
+    except OSError:
+      continue
+  return total_kb / 1024
+
+def _driver_pid(driver):
+  try:
+    return driver.service.process.pid
+  except Exception:
+    return None
+
+class ManagedDriver:
+  """
+  Mantém um driver logado e o recicla após `max_pages` páginas, ou quando o RSS
+  do navegador ou a latência mediana das páginas passam dos limites.
+  A sessão do driver novo é restaurada pelos cookies; o login completo é o fallback.
+  """
+  def __init__(self, driver_factory, login, session_url, is_logged_in,
+               max_pages=DRIVER_MAX_PAGES, max_rss_mb=DRIVER_MAX_RSS_MB,
+               max_latency_seconds=DRIVER_MAX_LATENCY_SECONDS, latency_window=DRIVER_LATENCY_WINDOW,
+               rss_check_every=DRIVER_RSS_CHECK_EVERY):
+    self.driver_factory = driver_factory
+    self.login = login
+    self.session_url = session_url
+    self.is_logged_in = is_logged_in
+    self.max_pages = max_pages
+    self.max_rss_mb = max_rss_mb
+    self.max_latency_seconds = max_latency_seconds
+    self.rss_check_every = rss_check_every
+    self.driver = None
+    self.pages = 0
+    self.recycles = 0
+    self.relogins = 0
+    self._latencies = deque(maxlen=latency_window)
+    self._cookies = None
+
+  def start(self):
+    self.driver = self.driver_factory()
+    try:
+      self.login(self.driver)
+    except Exception:
+      # sem isso cada tentativa de login que falha deixa um Chrome aberto
+      self.quit()
+      raise
+    self._reset()
+    return self.driver
+
+  def _reset(self):
+    self.pages = 0
+    self._latencies.clear()
+    self._save_cookies()
+
+  def _save_cookies(self):
+    try:
+      self._cookies = self.driver.get_cookies()
+    except Exception as e:
+      logger.warning(f"Fail to save driver cookies: {e}")
+
+  def rss_mb(self):
+    pid = _driver_pid(self.driver)
+    return process_tree_rss_mb(pid) if pid else None
+
+  def median_latency(self):
+    if not self._latencies:
+      return None
+    ordered = sorted(self._latencies)
+    return ordered[len(ordered) // 2]
+
+  def recycle_reason(self):
+    if self.max_pages and self.pages >= self.max_pages:
+      return f"{self.pages} pages"
+    latency = self.median_latency()
+    if latency is not None and len(self._latencies) == self._latencies.maxlen and latency > self.max_latency_seconds:
+      return f"median page latency {latency:.1f}s"
+    if self.rss_check_every and self.pages % self.rss_check_every == 0:
+      rss = self.rss_mb()
+      if rss is not None and rss > self.max_rss_mb:
+        return f"browser RSS {rss:.0f}MB"
+    return None
+
+  def record_page(self, elapsed):
+    self.pages += 1
+    self._latencies.append(elapsed)
+    reason = self.recycle_reason()
+    if reason:
+      self.recycle(reason)
+
+  def restore_session(self, driver, cookies):
+    if not cookies:
+      return False
+    try:
+      driver.get(self.session_url)
+      driver.delete_all_cookies()
+      for cookie in cookies:
+        cookie = {k: v for k, v in cookie.items() if k != 'sameSite'}
+        if 'expiry' in cookie:
+          cookie['expiry'] = int(cookie['expiry'])
+        try:
+          driver.add_cookie(cookie)
+        except Exception as e:
+          logger.debug(f"Cookie {cookie.get('name')} not restored: {e}")
+      driver.get(self.session_url)
+      return self.is_logged_in(driver)
+    except Exception as e:
+      logger.warning(f"Fail to restore driver session from cookies: {e}")
+      return False
+
+  def recycle(self, reason):
+    start = time.perf_counter()
+    cookies = self._cookies
+    try:
+      cookies = self.driver.get_cookies() or cookies
+    except Exception:
+      pass
+    self.quit()
+
+    self.driver = self.driver_factory()
+    restored = self.restore_session(self.driver, cookies)
+    if not restored:
+      logger.info("Session not restored from cookies, running full login")
+      self.login(self.driver)
+    self.recycles += 1
+    self._reset()
+    elapsed = time.perf_counter() - start
+    logger.info(f"({elapsed:.1f}s) Driver recycled ({reason}), cookies restored: {restored}")
+
+  def relogin(self, reason):
+    """
+    Reautentica o driver atual sem recriá-lo: cookies salvos primeiro, login completo
+    como fallback. Retorna False se a sessão continuar deslogada.
+    """
+    start = time.perf_counter()
+    with _RELOGIN_LOCK:
+      restored = self.restore_session(self.driver, self._cookies)
+      logged_in = restored
+      if not restored:
+        logger.info("Session not restored from cookies, running full login")
+        try:
+          self.login(self.driver)
+          self.driver.get(self.session_url)
+          logged_in = self.is_logged_in(self.driver)
+        except Exception as e:
+          logger.error(f"Fail to log in again ({reason}): {e}")
+    if logged_in:
+      self.relogins += 1
+      self._save_cookies()
+    elapsed = time.perf_counter() - start
+    logger.info(f"({elapsed:.1f}s) Driver session renewed ({reason}), cookies restored: {restored}, logged in: {logged_in}")
+    return logged_in
+
+  def quit(self):
+    if self.driver is None:
+      return
+    try:
+      self.driver.quit()
+    except Exception as e:
+      logger.warning(f"Fail to quit driver: {e}")
+    self.driver = None
@@ -0,0 +1,174 @@
+import os
+import time
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DRIVER_POOL_KEEPALIVE_SECONDS = float(os.environ.get('DRIVER_POOL_KEEPALIVE_SECONDS', 240))
+DRIVER_POOL_CHECKOUT_TIMEOUT_SECONDS = float(os.environ.get('DRIVER_POOL_CHECKOUT_TIMEOUT_SECONDS', 600))
+DRIVER_POOL_START_TIMEOUT_SECONDS = float(os.environ.get('DRIVER_POOL_START_TIMEOUT_SECONDS', 600))
+# falhas seguidas ao criar drivers (login recusado, Chrome que não sobe) antes de o pool desistir
+DRIVER_POOL_MAX_CREATE_FAILURES = int(os.environ.get('DRIVER_POOL_MAX_CREATE_FAILURES', 5))
+DRIVER_POOL_RETRY_BASE_DELAY_SECONDS = float(os.environ.get('DRIVER_POOL_RETRY_BASE_DELAY_SECONDS', 5))
+DRIVER_POOL_RETRY_MAX_DELAY_SECONDS = float(os.environ.get('DRIVER_POOL_RETRY_MAX_DELAY_SECONDS', 120))
+
+class DriverPoolError(RuntimeError):
+  pass
+
+class DriverPool:
+  """
+  Pool de ManagedDriver já logados. Os workers fazem checkout/checkin; drivers
+  descartados são substituídos em background e drivers ociosos recebem um ping
+  periódico para manter a sessão viva. Criações que falham são refeitas com backoff
+  exponencial; depois de `max_create_failures` falhas seguidas o pool deixa de tentar
+  e `start`/`checkout` levantam DriverPoolError.
+  """
+  def __init__(self, manager_factory, size, keepalive_seconds=DRIVER_POOL_KEEPALIVE_SECONDS, checkout_timeout=DRIVER_POOL_CHECKOUT_TIMEOUT_SECONDS,
+               start_timeout=DRIVER_POOL_START_TIMEOUT_SECONDS, max_create_failures=DRIVER_POOL_MAX_CREATE_FAILURES,
+               retry_base_delay=DRIVER_POOL_RETRY_BASE_DELAY_SECONDS, retry_max_delay=DRIVER_POOL_RETRY_MAX_DELAY_SECONDS):
+    self.manager_factory = manager_factory
+    self.size = size
+    self.keepalive_seconds = keepalive_seconds
+    self.checkout_timeout = checkout_timeout
+    self.start_timeout = start_timeout
+    self.max_create_failures = max_create_failures
+    self.retry_base_delay = retry_base_delay
+    self.retry_max_delay = retry_max_delay
+    self.create_failures = 0
+    self.last_error = None
+    self._failures_lock = threading.Lock()
+    self._failed = threading.Event()
+    self._idle = queue.Queue()
+    self._builder = ThreadPoolExecutor(max_workers=size, thread_name_prefix='driver-pool')
+    self._closed = threading.Event()
+    self._keepalive = None
+
+  def start(self, wait_for=1):
+    for _ in range(self.size):
+      self._spawn()
+    self._keepalive = threading.Thread(target=self._keepalive_loop, name='driver-pool-keepalive', daemon=True)
+    self._keepalive.start()
+    start = time.perf_counter()
+    while self._idle.qsize() < wait_for and not self._closed.is_set():
+      if self._failed.is_set():
+        self.close()
+        raise DriverPoolError(f"Driver pool gave up after {self.max_create_failures} consecutive failures: {self.last_error}")
+      if time.perf_counter() - start > self.start_timeout:
+        self.close()
+        raise DriverPoolError(f"No pooled driver ready after {self.start_timeout}s (last error: {self.last_error})")
+      time.sleep(0.5)
+    logger.info(f"({time.perf_counter() - start:.1f}s) Driver pool ready with {self._idle.qsize()}/{self.size} warm drivers")
+
+  def _create(self):
+    if self._closed.is_set():
+      return
+    try:
+      manager = self.manager_factory()
+      manager.start()
+    except Exception as e:
+      with self._failures_lock:
+        self.create_failures += 1
+        self.last_error = e
+        failures = self.create_failures
+      if failures >= self.max_create_failures:
+        logger.error(f"Fail to create pooled driver ({failures} consecutive failures), giving up: {e}")
+        self._failed.set()
+        return
+      delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** (failures - 1)))
+      logger.error(f"Fail to create pooled driver ({failures} consecutive failures), retrying in {delay}s: {e}")
+      if not self._closed.wait(delay):
+        self._spawn()
+      return
+    with self._failures_lock:
+      self.create_failures = 0
+    self._idle.put((manager, time.monotonic()))
+
+  def _spawn(self):
+    if not self._closed.is_set() and not self._failed.is_set():
+      self._builder.submit(self._create)
+
+  def is_healthy(self, manager):
+    try:
+      return manager.driver is not None and manager.driver.execute_script("return document.readyState") is not None
+    except Exception:
+      return False
+
+  def _discard(self, manager):
+    manager.quit()
+    self._spawn()
+
+  def checkout(self):
+    deadline = time.monotonic() + self.checkout_timeout
+    while True:
+      try:
+        manager, _ = self._idle.get(timeout=1)
+      except queue.Empty:
+        if self._failed.is_set():
+          raise DriverPoolError(f"Driver pool gave up after {self.max_create_failures} consecutive failures: {self.last_error}")
+        if time.monotonic() > deadline:
+          raise TimeoutError(f"No pooled driver available after {self.checkout_timeout}s")
+        continue
+      if self.is_healthy(manager):
+        return manager
+      logger.warning("Discarding unhealthy pooled driver")
+      self._discard(manager)
+
+  def checkin(self, manager, healthy=True):
+    if self._closed.is_set():
+      manager.quit()
+    elif healthy and self.is_healthy(manager):
+      self._idle.put((manager, time.monotonic()))
+    else:
+      self._discard(manager)
+
+  @contextmanager
+  def lease(self):
+    manager = self.checkout()
+    healthy = True
+    try:
+      yield manager
+    except Exception:
+      healthy = self.is_healthy(manager)
+      raise
+    finally:
+      self.checkin(manager, healthy)
+
+  def _ping(self, manager):
+    try:
+      manager.driver.get(manager.session_url)
+      if not manager.is_logged_in(manager.driver):
+        manager.recycle("session expired while idle")
+      return True
+    except Exception as e:
+      logger.warning(f"Keep-alive ping failed: {e}")
+      return False
+
+  def _keepalive_loop(self):
+    while not self._closed.wait(self.keepalive_seconds / 2):
+      now = time.monotonic()
+      for _ in range(self._idle.qsize()):
+        try:
+          manager, last_used = self._idle.get_nowait()
+        except queue.Empty:
+          break
+        if now - last_used < self.keepalive_seconds:
+          self._idle.put((manager, last_used))
+        elif self._ping(manager):
+          self._idle.put((manager, time.monotonic()))
+        else:
+          self._discard(manager)
+
+  def close(self):
+    self._closed.set()
+    self._builder.shutdown(wait=True)
+    while True:
+      try:
+        manager, _ = self._idle.get_nowait()
+      except queue.Empty:
+        break
+      manager.quit()
@@ -1,38 +1,151 @@
+import os
 import json
 import ast
-import pandas as pd
+import atexit
+import tempfile
+import threading
 from datetime import datetime
 from json.decoder import JSONDecodeError
 
 from utils.logger import get_logger
-from utils.postgres import postgres_to_sql_from_secret
+from utils.postgres import postgres_pooled_connection, postgres_to_sql_from_connection
 from utils.config import LIFEMED_PG_SECRET_ID
+from utils.lazy import lazy_import
+
+pd = lazy_import('pandas')
 
 logger = get_logger(__name__)
 
-def register_error(airflow, error):
+ERROR_COLUMNS = [ "dag_id", "task_id", "run_id", "error" ]
+ERROR_SINK_BATCH_SIZE = int(os.environ.get('ERROR_SINK_BATCH_SIZE', 100))
+ERROR_SINK_FLUSH_SECONDS = float(os.environ.get('ERROR_SINK_FLUSH_SECONDS', 10))
+ERROR_SINK_SPILL_PATH = os.environ.get('ERROR_SINK_SPILL_PATH', os.path.join(tempfile.gettempdir(), 'airflow_errors.spill.jsonl'))
+
+class ErrorSink:
+  def __init__(self, secret_id=LIFEMED_PG_SECRET_ID, schema='teste', table='airflow_errors', batch_size=ERROR_SINK_BATCH_SIZE, flush_seconds=ERROR_SINK_FLUSH_SECONDS, spill_path=ERROR_SINK_SPILL_PATH):
+    self.secret_id = secret_id
+    self.schema = schema
+    self.table = table
+    self.batch_size = batch_size
+    self.flush_seconds = flush_seconds
+    self.spill_path = spill_path
+    self._buffer = []
+    self._lock = threading.Lock()
+    self._flush_lock = threading.Lock()
+    self._wakeup = threading.Event()
+    self._stopped = threading.Event()
+    self._thread = None
+
+  def start(self):
+    with self._lock:
+      if self._thread is None or not self._thread.is_alive():
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='error-sink', daemon=True)
+        self._thread.start()
+
+  def put(self, record):
+    self.start()
+    with self._lock:
+      self._buffer.append(record)
+      full = len(self._buffer) >= self.batch_size
+    if full:
+      self._wakeup.set()
+
+  def _run(self):
+    while not self._stopped.is_set():
+      self._wakeup.wait(self.flush_seconds)
+      self._wakeup.clear()
+      self.flush()
+
+  def _write(self, records):
+    error_df = pd.DataFrame(data=[[r[c] for c in ERROR_COLUMNS] for r in records], columns=ERROR_COLUMNS)
+    with postgres_pooled_connection(self.secret_id) as pg_connection:
+      postgres_to_sql_from_connection(pg_connection, error_df, table=self.table, schema=self.schema)
+
+  def _spill(self, records):
+    with open(self.spill_path, 'a') as f:
+      for record in records:
+        f.write(json.dumps(record) + '\n')
+
+  def _replay_path(self):
+    return self.spill_path + '.replay'
+
+  def _take_spill(self):
+    """
+    Lê os registros do spill, movido para <spill>.replay. O arquivo de replay só é
+    apagado depois que os registros chegam ao Postgres (`_drop_replay`).
+    """
+    records = []
+    replay_path = self._replay_path()
+    if os.path.exists(self.spill_path) and not os.path.exists(replay_path):
+      os.replace(self.spill_path, replay_path)
+    if os.path.exists(replay_path):
+      with open(replay_path, 'r') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return records
+
+  def _drop_replay(self):
+    replay_path = self._replay_path()
+    if os.path.exists(replay_path):
+      os.remove(replay_path)
+
+  def flush(self):
+    with self._flush_lock:
+      with self._lock:
+        records, self._buffer = self._buffer, []
+      replayed = []
+      try:
+        replayed = self._take_spill()
+      except Exception as e:
+        logger.error(f"Fail to read error spill file {self.spill_path}")
+        logger.error(e)
+      if not replayed and not records:
+        return
+      try:
+        self._write(replayed + records)
+        logger.debug(f"Flushed {len(replayed) + len(records)} errors to {self.schema}.{self.table}")
+      except Exception as e:
+        # os registros do replay continuam no arquivo de replay; só os novos vão para o spill
+        logger.warning(f"Postgres unreachable, spilling {len(records)} errors to {self.spill_path}")
+        logger.warning(e)
+        try:
+          self._spill(records)
+        except Exception as spill_error:
+          logger.error(f"Fail to spill {len(records)} errors")
+          logger.error(spill_error)
+        return
+      try:
+        self._drop_replay()
+      except Exception as e:
+        logger.error(f"Fail to remove error replay file {self._replay_path()}")
+        logger.error(e)
+
+  def close(self):
+    self._stopped.set()
+    self._wakeup.set()
+    if self._thread is not None:
+      self._thread.join(timeout=self.flush_seconds)
+    self.flush()
+
+ERROR_SINK = ErrorSink()
+atexit.register(ERROR_SINK.close)
+
+def parse_run_spec(airflow):
   try:
-    try:
-      run_spec = json.loads(airflow)
-    except JSONDecodeError as e:
-      run_spec = ast.literal_eval(airflow)
-    
-    dag_id = run_spec['DAG_ID']
-    task_id = run_spec['TASK_ID']
-    run_id = run_spec['RUN_ID']
-    error = ' '.join([str(type(error)), str(error)])
-    
-    error_df = pd.DataFrame(
-      data    = [[ dag_id, task_id, run_id, error ]], 
-      columns = [ "dag_id", "task_id", "run_id", "error"],
-    )
+    return json.loads(airflow)
+  except JSONDecodeError as e:
+    return ast.literal_eval(airflow)
+
+def register_error(airflow, error, sink=ERROR_SINK):
+  try:
+    run_spec = parse_run_spec(airflow)
     
-    postgres_to_sql_from_secret(
-      secret_id = LIFEMED_PG_SECRET_ID,
-      df=error_df,
-      schema='teste',
-      table='airflow_errors'
-    )
+    sink.put({
+      'dag_id': run_spec['DAG_ID'],
+      'task_id': run_spec['TASK_ID'],
+      'run_id': run_spec['RUN_ID'],
+      'error': ' '.join([str(type(error)), str(error)]),
+    })
 
   except Exception as e:
     logger.error(e)
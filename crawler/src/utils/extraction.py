@@ -0,0 +1,27 @@
+import soupsieve as sv
+
+class Field:
+  """
+  Campo extraível de uma página: seletores CSS tentados em ordem (compilados uma vez)
+  e um pós-processador aplicado ao primeiro elemento encontrado.
+  Sem seletores, o pós-processador recebe o documento inteiro.
+  """
+  __slots__ = ('name', 'selectors', 'extract', 'default')
+
+  def __init__(self, name, selectors, extract, default=None):
+    self.name = name
+    self.selectors = [sv.compile(selector) for selector in selectors or []]
+    self.extract = extract
+    self.default = default
+
+  def __call__(self, soup):
+    if not self.selectors:
+      return self.extract(soup)
+    for selector in self.selectors:
+      element = selector.select_one(soup)
+      if element is not None:
+        return self.extract(element)
+    return self.default
+
+def run_fields(fields, soup):
+  return {field.name: field(soup) for field in fields}
@@ -0,0 +1,168 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+
+from utils.logger import get_logger
+from utils.s3 import s3_extract_bucket_path
+from utils.secret_manager import get_boto3_client
+
+logger = get_logger(__name__)
+
+HTML_ARCHIVE_ZSTD_LEVEL = int(os.environ.get('HTML_ARCHIVE_ZSTD_LEVEL', 6))
+HTML_ARCHIVE_MANIFEST_BATCH = int(os.environ.get('HTML_ARCHIVE_MANIFEST_BATCH', 500))
+
+def _zstd():
+  # dependência opcional: só é necessária quando o arquivo de HTML está ligado
+  import zstandard
+  return zstandard
+
+class HtmlArchive:
+  """
+  Arquivo do HTML bruto capturado pelo crawler (página e snapshots das abas).
+
+  Cada HTML vira um blob zstd endereçado pelo sha256 do conteúdo em
+  `<root>/blobs/<aa>/<sha256>.zst`, então páginas repetidas são gravadas uma vez.
+  O manifest (`<root>/manifests/<run_id>/<writer>-<seq>.jsonl`) tem uma linha por
+  código com os digests, e é o que o re-parse percorre. `root` é um caminho local
+  ou s3://.
+  """
+  def __init__(self, root, run_id, writer_id='crawler', zstd_level=HTML_ARCHIVE_ZSTD_LEVEL, manifest_batch=HTML_ARCHIVE_MANIFEST_BATCH):
+    self.root = root.rstrip('/')
+    self.run_id = run_id
+    self.writer_id = writer_id
+    self.manifest_batch = manifest_batch
+    self.is_s3 = self.root.startswith('s3://')
+    self._zstd_level = zstd_level
+    self._local = threading.local()
+    self._lock = threading.Lock()
+    self._entries = []
+    self._seq = 0
+    self._written = set()
+
+  def _compressor(self):
+    compressor = getattr(self._local, 'compressor', None)
+    if compressor is None:
+      compressor = self._local.compressor = _zstd().ZstdCompressor(level=self._zstd_level)
+    return compressor
+
+  def _path(self, relative):
+    return f"{self.root}/{relative}"
+
+  def _write(self, relative, body):
+    path = self._path(relative)
+    if self.is_s3:
+      bucket, key = s3_extract_bucket_path(path)
+      get_boto3_client('s3').put_object(Bucket=bucket, Key=key, Body=body)
+    else:
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+      tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+      with open(tmp_path, 'wb') as f:
+        f.write(body)
+      os.replace(tmp_path, path)
+
+  def _read(self, relative):
+    path = self._path(relative)
+    if self.is_s3:
+      bucket, key = s3_extract_bucket_path(path)
+      return get_boto3_client('s3').get_object(Bucket=bucket, Key=key)['Body'].read()
+    with open(path, 'rb') as f:
+      return f.read()
+
+  @staticmethod
+  def _blob_key(digest):
+    return f"blobs/{digest[:2]}/{digest}.zst"
+
+  def put_blob(self, html):
+    data = html.encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+    with self._lock:
+      if digest in self._written:
+        return digest
+    relative = self._blob_key(digest)
+    if self.is_s3 or not os.path.exists(self._path(relative)):
+      self._write(relative, self._compressor().compress(data))
+    with self._lock:
+      self._written.add(digest)
+    return digest
+
+  def get_blob(self, digest):
+    return _zstd().ZstdDecompressor().decompress(self._read(self._blob_key(digest))).decode('utf-8')
+
+  def add(self, code, html, tabs=None, is_cpt=None, page_kind=None, merge_tabs=False):
+    """
+    Arquiva o HTML de um código; `tabs` mapeia estágio -> (aba, snapshots).
+    Com `merge_tabs` (retry só das abas que falharam) a entrada não substitui a captura
+    anterior do código em `entries`: as abas dela são sobrepostas às da captura anterior.
+    """
+    entry = {
+      'code': code,
+      'run_id': self.run_id,
+      'captured_at': datetime.now().isoformat(),
+      'is_cpt': is_cpt,
+      'page_kind': page_kind,
+      'html': self.put_blob(html),
+      'tabs': {
+        stage: [name, [self.put_blob(snapshot) for snapshot in snapshots]]
+        for stage, (name, snapshots) in (tabs or {}).items()
+      },
+    }
+    if merge_tabs:
+      entry['merge_tabs'] = True
+    with self._lock:
+      self._entries.append(entry)
+      full = len(self._entries) >= self.manifest_batch
+    if full:
+      self.flush()
+
+  def flush(self):
+    with self._lock:
+      entries, self._entries = self._entries, []
+      if not entries:
+        return
+      self._seq += 1
+      relative = f"manifests/{self.run_id}/{self.writer_id}-{self._seq:05d}.jsonl"
+    body = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries)
+    try:
+      self._write(relative, body.encode('utf-8'))
+      logger.info(f"{len(entries)} archived pages written to manifest {relative}")
+    except Exception as e:
+      with self._lock:
+        self._entries = entries + self._entries
+      logger.error(f"Fail to write archive manifest {relative}")
+      logger.error(e)
+      raise e
+
+  def manifest_paths(self, run_id=None):
+    prefix = f"manifests/{run_id or self.run_id}/"
+    if self.is_s3:
+      bucket, key = s3_extract_bucket_path(self._path(prefix))
+      paginator = get_boto3_client('s3').get_paginator('list_objects_v2')
+      keys = []
+      for page in paginator.paginate(Bucket=bucket, Prefix=key):
+        keys += [obj['Key'][len(key):] for obj in page.get('Contents', [])]
+    else:
+      directory = self._path(prefix)
+      keys = os.listdir(directory) if os.path.isdir(directory) else []
+    return [prefix + name for name in sorted(keys) if name.endswith('.jsonl')]
+
+  def entries(self, run_id=None):
+    """
+    Percorre as entradas do manifest do run; com o mesmo código arquivado mais de
+    uma vez (retry, outro nó), vale a última captura, e as entradas `merge_tabs`
+    posteriores a ela sobrepõem as abas que foram recapturadas.
+    """
+    manifest = []
+    for relative in self.manifest_paths(run_id):
+      for line in self._read(relative).decode('utf-8').splitlines():
+        if line.strip():
+          manifest.append(json.loads(line))
+    manifest.sort(key=lambda entry: entry['captured_at'])
+    latest = {}
+    for entry in manifest:
+      current = latest.get(entry['code'])
+      if entry.pop('merge_tabs', False) and current is not None:
+        entry = {**current, 'captured_at': entry['captured_at'], 'tabs': {**current['tabs'], **entry['tabs']}}
+      latest[entry['code']] = entry
+    return list(latest.values())
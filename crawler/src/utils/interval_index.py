@@ -0,0 +1,115 @@
+import re
+import bisect
+import threading
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+INTERVAL_DIMENSION_COLUMNS = ['leaf_interval', 'range_start', 'range_end', 'main_interval', 'main_interval_name', 'is_leaf']
+
+MAX_NESTING = 4
+
+RE_CODE = re.compile(r'^([A-Z]?)(\d+)([A-Z]?)$')
+
+def code_sort_key(code):
+  """
+  Chave de ordenação de códigos CPT/HCPCS: letra inicial (HCPCS), sufixo
+  (categorias II/III e PLA: F, T, U) e parte numérica.
+  """
+  match = RE_CODE.match(code.strip().upper())
+  if not match:
+    return None
+  prefix, number, suffix = match.groups()
+  return (prefix, suffix, int(number))
+
+def split_interval(interval):
+  parts = interval.split('-', 1) if interval else []
+  if len(parts) != 2:
+    return None, None
+  return code_sort_key(parts[0]), code_sort_key(parts[1])
+
+class IntervalIndex:
+  """
+  Índice ordenado dos intervalos do breadcrumb ("CPT Codes" -> seção -> subseção).
+  Resolve um código para o seu `main_interval` e `main_interval_name` por busca binária,
+  sem precisar reprocessar o breadcrumb de cada página.
+
+  Só intervalos folha (o último nível do breadcrumb, que lista códigos e não subintervalos)
+  resolvem um código: se o intervalo mais interno conhecido for um ancestral, o código pode
+  estar num subintervalo ainda não indexado, com um `main_interval_name` mais profundo.
+  """
+  def __init__(self):
+    self._starts = []
+    self._entries = []
+    self._lock = threading.Lock()
+
+  def __len__(self):
+    return len(self._entries)
+
+  def add(self, leaf_interval, main_interval, main_interval_name, is_leaf=True):
+    """
+    is_leaf: True para o último intervalo do breadcrumb de um código, False para um intervalo
+    com subintervalos e None quando não se sabe (linhas da dimensão gravadas sem is_leaf).
+    Um intervalo que contém outro já indexado deixa de ser folha.
+    """
+    start, end = split_interval(leaf_interval)
+    if start is None or end is None or start[:2] != end[:2]:
+      return False
+    with self._lock:
+      i = bisect.bisect_left(self._starts, start)
+      for entry in self._entries[i:]:
+        if entry[0] != start:
+          break
+        if entry[2] == leaf_interval:
+          if is_leaf is False:
+            entry[5] = False
+          elif entry[5] is None:
+            entry[5] = is_leaf
+          return False
+      # mesmo início: o mais externo vem antes, para o lookup encontrar o mais interno primeiro
+      while i < len(self._entries) and self._entries[i][0] == start and self._entries[i][1] >= end:
+        i += 1
+      for entry in self._entries:
+        if entry[0][:2] != start[:2]:
+          continue
+        if entry[0] <= start and end <= entry[1]:
+          entry[5] = False
+        elif start <= entry[0] and entry[1] <= end:
+          is_leaf = False
+      self._starts.insert(i, start)
+      self._entries.insert(i, [start, end, leaf_interval, main_interval, list(main_interval_name) if main_interval_name else None, is_leaf])
+    return True
+
+  def lookup(self, code):
+    """
+    (main_interval, main_interval_name) do intervalo folha que contém o código, ou None
+    quando o intervalo mais interno conhecido não é folha e o breadcrumb precisa ser lido.
+    """
+    key = code_sort_key(code)
+    if key is None:
+      return None
+    with self._lock:
+      i = bisect.bisect_right(self._starts, key) - 1
+      # intervalos aninhados: o mais interno é o de maior início <= código
+      for start, end, _, main_interval, main_interval_name, is_leaf in reversed(self._entries[max(0, i - MAX_NESTING + 1):i + 1]):
+        if start[:2] == key[:2] and start <= key <= end:
+          return (main_interval, main_interval_name) if is_leaf else None
+    return None
+
+  def rows(self):
+    with self._lock:
+      return [
+        [leaf_interval, leaf_interval.split('-', 1)[0], leaf_interval.split('-', 1)[1], main_interval, main_interval_name, is_leaf]
+        for _, _, leaf_interval, main_interval, main_interval_name, is_leaf in self._entries
+      ]
+
+  def load_rows(self, rows):
+    # linhas gravadas antes da coluna is_leaf só resolvem códigos depois que um breadcrumb confirma a folha
+    loaded = 0
+    for row in rows:
+      is_leaf = row.get('is_leaf')
+      is_leaf = bool(is_leaf) if is_leaf in (True, False) else None
+      loaded += self.add(row['leaf_interval'], row['main_interval'], row['main_interval_name'], is_leaf=is_leaf)
+    logger.info(f"{loaded} intervals loaded into the interval index")
+    return loaded
@@ -0,0 +1,40 @@
+import importlib
+import threading
+
+class LazyImport:
+  """
+  Proxy de um módulo (ou de um atributo dele) importado no primeiro uso.
+
+  Mantém pandas, awswrangler, selenium, boto3 e requests fora do import dos módulos
+  do crawler: workers de parse e ferramentas que só usam os parsers sobem sem elas.
+  """
+  __slots__ = ('_module_name', '_attribute', '_target', '_lock')
+
+  def __init__(self, module_name, attribute=None):
+    self._module_name = module_name
+    self._attribute = attribute
+    self._target = None
+    self._lock = threading.Lock()
+
+  def _resolve(self):
+    target = self._target
+    if target is None:
+      with self._lock:
+        if self._target is None:
+          module = importlib.import_module(self._module_name)
+          self._target = getattr(module, self._attribute) if self._attribute else module
+        target = self._target
+    return target
+
+  def __getattr__(self, name):
+    return getattr(self._resolve(), name)
+
+  def __call__(self, *args, **kwargs):
+    return self._resolve()(*args, **kwargs)
+
+  def __repr__(self):
+    name = f"{self._module_name}.{self._attribute}" if self._attribute else self._module_name
+    return f"<lazy {name} ({'loaded' if self._target is not None else 'not loaded'})>"
+
+def lazy_import(module_name, attribute=None):
+  return LazyImport(module_name, attribute)
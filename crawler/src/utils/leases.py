@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+LEASE_TTL_SECONDS = float(os.environ.get('LEASE_TTL_SECONDS', 900))
+
+class LeaseStore:
+  """
+  Leases de códigos compartilhados entre nós do crawl distribuído.
+  Um lease é um lote de códigos; o nó que o reivindica precisa renová-lo antes de
+  `expires_at`, senão o lease volta a ficar disponível para outros nós.
+  """
+  def __init__(self, connection, placeholder, table='crawl_leases', ttl=LEASE_TTL_SECONDS):
+    self._connection = connection
+    self._p = placeholder
+    self.table = table
+    self.ttl = ttl
+
+  def _sql(self, query):
+    return query.format(table=self.table).replace('?', self._p)
+
+  def _execute(self, query, params=()):
+    with self._connection() as conn:
+      cursor = conn.cursor()
+      cursor.execute(self._sql(query), params)
+      rows = cursor.fetchall() if cursor.description else None
+      rowcount = cursor.rowcount
+    return rows, rowcount
+
+  def create_table(self):
+    self._execute("""
+      CREATE TABLE IF NOT EXISTS {table} (
+        run_id      VARCHAR(128) NOT NULL,
+        lease_id    INTEGER NOT NULL,
+        codes       TEXT NOT NULL,
+        status      VARCHAR(16) NOT NULL,
+        owner       VARCHAR(256),
+        expires_at  DOUBLE PRECISION,
+        PRIMARY KEY (run_id, lease_id)
+      )
+    """)
+
+  def create_leases(self, run_id, codes, lease_size):
+    rows, _ = self._execute("SELECT COUNT(*) FROM {table} WHERE run_id = ?", (run_id,))
+    if rows[0][0]:
+      logger.info(f"Leases for run {run_id} already exist ({rows[0][0]})")
+      return rows[0][0]
+    codes = list(codes)
+    with self._connection() as conn:
+      cursor = conn.cursor()
+      for lease_id, start in enumerate(range(0, len(codes), lease_size)):
+        cursor.execute(
+          self._sql("INSERT INTO {table} (run_id, lease_id, codes, status) VALUES (?, ?, ?, 'pending')"),
+          (run_id, lease_id, json.dumps(codes[start:start + lease_size]))
+        )
+    total = (len(codes) + lease_size - 1) // lease_size
+    logger.info(f"Created {total} leases for run {run_id} ({len(codes)} codes)")
+    return total
+
+  def claim(self, run_id, owner):
+    while True:
+      now = time.time()
+      rows, _ = self._execute("""
+        SELECT lease_id, codes FROM {table}
+        WHERE run_id = ? AND (status = 'pending' OR (status = 'claimed' AND expires_at < ?))
+        ORDER BY lease_id LIMIT 1
+      """, (run_id, now))
+      if not rows:
+        return None
+      lease_id, codes = rows[0]
+      _, updated = self._execute("""
+        UPDATE {table} SET status = 'claimed', owner = ?, expires_at = ?
+        WHERE run_id = ? AND lease_id = ? AND (status = 'pending' OR (status = 'claimed' AND expires_at < ?))
+      """, (owner, now + self.ttl, run_id, lease_id, now))
+      if updated == 1:
+        logger.info(f"Lease {run_id}/{lease_id} claimed by {owner}")
+        return lease_id, json.loads(codes)
+
+  def renew(self, run_id, lease_id, owner):
+    _, updated = self._execute("""
+      UPDATE {table} SET expires_at = ?
+      WHERE run_id = ? AND lease_id = ? AND owner = ? AND status = 'claimed'
+    """, (time.time() + self.ttl, run_id, lease_id, owner))
+    return updated == 1
+
+  def complete(self, run_id, lease_id, owner):
+    _, updated = self._execute("""
+      UPDATE {table} SET status = 'done', expires_at = NULL
+      WHERE run_id = ? AND lease_id = ? AND owner = ?
+    """, (run_id, lease_id, owner))
+    return updated == 1
+
+  def release(self, run_id, lease_id, owner):
+    _, updated = self._execute("""
+      UPDATE {table} SET status = 'pending', owner = NULL, expires_at = NULL
+      WHERE run_id = ? AND lease_id = ? AND owner = ? AND status = 'claimed'
+    """, (run_id, lease_id, owner))
+    return updated == 1
+
+  def requeue(self, run_id, lease_id, owner, codes):
+    _, updated = self._execute("""
+      UPDATE {table} SET status = 'pending', owner = NULL, expires_at = NULL, codes = ?
+      WHERE run_id = ? AND lease_id = ? AND owner = ? AND status = 'claimed'
+    """, (json.dumps(list(codes)), run_id, lease_id, owner))
+    return updated == 1
+
+  def progress(self, run_id):
+    rows, _ = self._execute("SELECT status, COUNT(*) FROM {table} WHERE run_id = ? GROUP BY status", (run_id,))
+    return dict(rows)
+
+class LeaseRenewer:
+  """
+  Renova um lease em background enquanto o nó o processa.
+  `lost` indica que o lease expirou ou foi reivindicado por outro nó.
+  """
+  def __init__(self, store, run_id, lease_id, owner, interval=None):
+    self.store = store
+    self.run_id = run_id
+    self.lease_id = lease_id
+    self.owner = owner
+    self.interval = interval or store.ttl / 3
+    self.lost = threading.Event()
+    self._stopped = threading.Event()
+    self._thread = threading.Thread(target=self._run, name=f'lease-{lease_id}', daemon=True)
+
+  def _run(self):
+    while not self._stopped.wait(self.interval):
+      try:
+        if not self.store.renew(self.run_id, self.lease_id, self.owner):
+          logger.error(f"Lease {self.run_id}/{self.lease_id} lost by {self.owner}")
+          self.lost.set()
+          return
+      except Exception as e:
+        logger.warning(f"Fail to renew lease {self.run_id}/{self.lease_id}: {e}")
+
+  def __enter__(self):
+    self._thread.start()
+    return self
+
+  def __exit__(self, *exc):
+    self._stopped.set()
+    self._thread.join()
+
+def postgres_lease_store(secret_id, schema, table='crawl_leases'):
+  from utils.postgres import postgres_pooled_connection
+  return LeaseStore(lambda: postgres_pooled_connection(secret_id), '%s', table=f'{schema}.{table}')
+
+def sqlite_lease_store(path, table='crawl_leases'):
+  @contextmanager
+  def connection():
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+      yield conn
+      conn.commit()
+    except Exception:
+      conn.rollback()
+      raise
+    finally:
+      conn.close()
+  return LeaseStore(connection, '?', table=table)
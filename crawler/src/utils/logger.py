@@ -1,26 +1,142 @@
 import logging
+import logging.handlers
 import sys
 import os
+import json
+import queue
+import atexit
+import itertools
+import threading
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
 
 DEBUG = os.environ.get('DEBUG', False)
+# 'text' (padrão) ou 'json', uma linha por registro com code, stage e worker_id
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+# registros vão para uma fila e são escritos no stdout por uma thread; '0' escreve direto
+LOG_ASYNC = str(os.environ.get('LOG_ASYNC', 'true')).lower() in ('1', 'true', 'yes')
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+# 1 em cada N mensagens por item (página, letra do ICD-10) é registrada
+LOG_SAMPLE_EVERY = int(os.environ.get('LOG_SAMPLE_EVERY', 100))
+
+TEXT_FORMAT = '[%(asctime)s] [%(levelname)s] [%(name)s] : %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_log_context = contextvars.ContextVar('log_context', default={})
+_sample_counters = defaultdict(itertools.count)
+_handler = None
+_listener = None
+_handler_lock = threading.Lock()
+
+@contextmanager
+def log_context(**fields):
+    """
+    Campos (code, stage, worker_id) anexados aos registros emitidos dentro do bloco, na thread atual.
+    """
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+class ContextFilter(logging.Filter):
+    def filter(self, record):
+        context = _log_context.get()
+        record.code = context.get('code')
+        record.stage = context.get('stage')
+        record.worker_id = context.get('worker_id') or f"{record.process}-{record.threadName}"
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, DATE_FORMAT),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'code': getattr(record, 'code', None),
+            'stage': getattr(record, 'stage', None),
+            'worker_id': getattr(record, 'worker_id', None),
+        }
+        if getattr(record, 'sampled', None):
+            entry['sampled'] = record.sampled
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que nunca bloqueia quem loga: com a fila cheia o registro é descartado e contado.
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def _formatter():
+    if LOG_FORMAT == 'json':
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        if _handler.dropped:
+            sys.stdout.write(f"{_handler.dropped} log records dropped with the log queue full\n")
+
+def _shared_handler():
+    """
+    Handler único dos loggers do crawler: no modo assíncrono só enfileira o registro e a
+    thread do QueueListener formata e escreve no stdout.
+    """
+    global _handler, _listener
+    if _handler is None:
+        with _handler_lock:
+            if _handler is None:
+                stream_handler = logging.StreamHandler(sys.stdout)
+                stream_handler.setFormatter(_formatter())
+                if LOG_ASYNC:
+                    handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+                    _listener = logging.handlers.QueueListener(handler.queue, stream_handler)
+                    _listener.start()
+                    atexit.register(_stop_listener)
+                else:
+                    handler = stream_handler
+                handler.addFilter(ContextFilter())
+                _handler = handler
+    return _handler
+
+def log_sampled(logger, key, message, *args, level=logging.DEBUG, every=LOG_SAMPLE_EVERY):
+    """
+    Registra 1 a cada `every` chamadas com a mesma `key`, para mensagens por item do hot
+    path. Os argumentos só são formatados quando o registro é de fato emitido.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if next(_sample_counters[key]) % every:
+        return
+    logger.log(level, message, *args, extra={'sampled': every})
 
 def get_logger(logger_name):
     logger = logging.getLogger(logger_name)
-    
+
     if not logger.hasHandlers():
         for handler in logger.handlers[:]:
             logger.removeHandler(handler)
-        
+
         if(DEBUG):
             logger.setLevel(logging.DEBUG)
         else:
             logger.setLevel(logging.INFO)
-        
-        handler = logging.StreamHandler(sys.stdout)
-        
-        formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(name)s] : %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-        handler.setFormatter(formatter)
-        
-        logger.addHandler(handler)
-    
-    return logger
\ No newline at end of file
+
+        logger.addHandler(_shared_handler())
+
+    return logger
@@ -1,10 +1,11 @@
 from time import sleep
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
 from utils.logger import get_logger
+from utils.lazy import lazy_import
+
+By = lazy_import('selenium.webdriver.common.by', 'By')
+WebDriverWait = lazy_import('selenium.webdriver.support.ui', 'WebDriverWait')
+EC = lazy_import('selenium.webdriver.support.expected_conditions')
 
 logger = get_logger('login')
 
@@ -1,40 +1,160 @@
-import awswrangler as wr
-import pandas as pd
+from __future__ import annotations
+import io
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+from contextlib import contextmanager
 from utils.logger import get_logger
+from utils.secret_manager import get_secret, invalidate_secret
+from utils.lazy import lazy_import
+
+wr = lazy_import('awswrangler')
+pd = lazy_import('pandas')
+pg8000 = lazy_import('pg8000')
 
 logger = get_logger(__name__)
 
+POSTGRES_POOL_SIZE = int(os.environ.get('POSTGRES_POOL_SIZE', 4))
+POSTGRES_POOL_HEALTH_CHECK_SECONDS = int(os.environ.get('POSTGRES_POOL_HEALTH_CHECK_SECONDS', 60))
+
+def _postgres_connect_from_secret(secret_id):
+  # mesmas chaves do segredo que o wr.postgresql.connect lê, mas via o cache de get_secret
+  credentials = json.loads(get_secret(secret_name=secret_id))
+  return pg8000.connect(
+    user=credentials['username'],
+    password=credentials['password'],
+    host=credentials['host'],
+    port=int(credentials.get('port', 5432)),
+    database=credentials.get('dbname', credentials.get('database', 'postgres')),
+    tcp_keepalive=True
+  )
+
 def postgres_connect(secret_id):
   try:
-    conn = wr.postgresql.connect(secret_id=secret_id)
+    try:
+      conn = _postgres_connect_from_secret(secret_id)
+    except pg8000.exceptions.DatabaseError:
+      # senha rotacionada: descarta o segredo em cache e tenta de novo
+      invalidate_secret(secret_id)
+      conn = _postgres_connect_from_secret(secret_id)
     logger.debug(f"Success to connect on Postgres secret {secret_id[:((len(secret_id))//2)]}***")
     return conn
   except Exception as e:
     logger.error(f"Fail to connect on postgres database with secret {secret_id[:((len(secret_id))//2)]}***")
     logger.error(e)
     raise e
-  
-  
+
+class PostgresConnectionPool:
+  def __init__(self, secret_id, max_size=POSTGRES_POOL_SIZE, health_check_seconds=POSTGRES_POOL_HEALTH_CHECK_SECONDS):
+    self.secret_id = secret_id
+    self.health_check_seconds = health_check_seconds
+    self._idle = queue.LifoQueue()
+    self._slots = threading.BoundedSemaphore(max_size)
+
+  def _is_alive(self, conn):
+    try:
+      cursor = conn.cursor()
+      cursor.execute("SELECT 1")
+      cursor.fetchall()
+      conn.rollback()
+      return True
+    except Exception:
+      return False
+
+  def _close(self, conn):
+    try:
+      conn.close()
+    except Exception:
+      pass
+
+  def acquire(self):
+    self._slots.acquire()
+    try:
+      while True:
+        try:
+          conn, last_used = self._idle.get_nowait()
+        except queue.Empty:
+          return postgres_connect(secret_id=self.secret_id)
+        if time.monotonic() - last_used < self.health_check_seconds or self._is_alive(conn):
+          return conn
+        logger.debug("Discarding stale pooled Postgres connection")
+        self._close(conn)
+    except Exception:
+      self._slots.release()
+      raise
+
+  def release(self, conn, discard=False):
+    try:
+      if discard:
+        self._close(conn)
+      else:
+        self._idle.put((conn, time.monotonic()))
+    finally:
+      self._slots.release()
+
+  @contextmanager
+  def connection(self):
+    conn = self.acquire()
+    try:
+      yield conn
+      conn.commit()
+    except Exception:
+      try:
+        conn.rollback()
+        broken = False
+      except Exception:
+        broken = True
+      self.release(conn, discard=broken)
+      raise
+    self.release(conn)
+
+  def close_all(self):
+    while True:
+      try:
+        conn, _ = self._idle.get_nowait()
+      except queue.Empty:
+        break
+      self._close(conn)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def postgres_get_pool(secret_id):
+  with _pools_lock:
+    pool = _pools.get(secret_id)
+    if pool is None:
+      pool = PostgresConnectionPool(secret_id)
+      _pools[secret_id] = pool
+    return pool
+
+def postgres_pooled_connection(secret_id):
+  return postgres_get_pool(secret_id).connection()
+
+@atexit.register
+def postgres_close_pools():
+  with _pools_lock:
+    for pool in _pools.values():
+      pool.close_all()
 
 def postgres_execute_queries(secret_id, queries):
   try:
-    con = postgres_connect(secret_id=secret_id)
-    logger.debug(f"Executing {len(queries)} queries on postgres")
-    cursor = con.cursor()
-    for q in queries:
-      logger.debug(f"\n{q}")
-      cursor.execute(q)
-    con.commit()
-    con.close()
+    with postgres_pooled_connection(secret_id) as con:
+      logger.debug(f"Executing {len(queries)} queries on postgres")
+      cursor = con.cursor()
+      for q in queries:
+        logger.debug(f"\n{q}")
+        cursor.execute(q)
   except Exception as e:
-    con.rollback()
     logger.error("Error to execute postgres queries")
     logger.error(e)
     raise e
 
 def postgres_execute_query(secret_id, query):
   try:
-    with postgres_connect(secret_id=secret_id) as pg_connection:
+    with postgres_pooled_connection(secret_id) as pg_connection:
       df = wr.postgresql.read_sql_query(
         sql = query,
         con = pg_connection
@@ -47,11 +167,10 @@ def postgres_execute_query(secret_id, query):
 
 def postgres_create_table(secret_id, create_table_query):
   try:
-    with postgres_connect(secret_id=secret_id) as pg_connection:
+    with postgres_pooled_connection(secret_id) as pg_connection:
       cursor = pg_connection.cursor()
       logger.debug(f"Executing create table query: \n{create_table_query}")
       cursor.execute(create_table_query) 
-      pg_connection.commit()  
       logger.info(f"Table creation executed successfully.")
   except Exception as e:
     logger.error("Failed to create table in PostgreSQL.")
@@ -61,7 +180,7 @@ def postgres_create_table(secret_id, create_table_query):
 
 def postgres_to_sql_from_secret(secret_id, df:pd.DataFrame, table, schema, mode='append', **kwargs):
   try:
-    with postgres_connect(secret_id=secret_id) as pg_connection:
+    with postgres_pooled_connection(secret_id) as pg_connection:
       logger.debug(f"Save {df.shape[0]} lines on {schema}.{table} with {mode} mode")
       postgres_to_sql_from_connection(pg_connection, df ,table ,schema ,mode ,**kwargs)
   except Exception as e:
@@ -84,6 +203,7 @@ def postgres_to_sql_from_connection(pg_connection, df:pd.DataFrame, table, schem
   except Exception as e:
     logger.error("Fail send data to Postgres")
     logger.error(e)
+    raise e
 
 def postgres_pd_from_query(pg_connection, qry):
   
@@ -93,4 +213,79 @@ def postgres_pd_from_query(pg_connection, qry):
   )
   logger.debug("Postgres query:")
   logger.debug(qry)
-  return df
\ No newline at end of file
+  return df
+
+def _postgres_array_items(value):
+  # colunas lista do Arrow chegam do to_pandas() como numpy.ndarray, não como list
+  if isinstance(value, (list, tuple)):
+    return value
+  if hasattr(value, 'tolist') and getattr(value, 'ndim', 0) >= 1:
+    return value.tolist()
+  return None
+
+def _postgres_copy_value(value):
+  items = _postgres_array_items(value)
+  if items is None:
+    return value
+  encoded = []
+  for item in items:
+    if _postgres_array_items(item) is not None:
+      encoded.append(_postgres_copy_value(item))
+    elif item is None or (isinstance(item, float) and item != item):
+      encoded.append('NULL')
+    else:
+      encoded.append('"' + str(item).replace('\\', '\\\\').replace('"', '\\"') + '"')
+  return '{' + ','.join(encoded) + '}'
+
+def postgres_copy_buffer(df:pd.DataFrame):
+  df = df.copy()
+  for column in df.columns:
+    if df[column].dtype == object:
+      df[column] = df[column].map(_postgres_copy_value)
+  buffer = io.StringIO()
+  df.to_csv(buffer, index=False, header=False, na_rep='\\N')
+  buffer.seek(0)
+  return buffer
+
+def postgres_copy_upsert_from_connection(pg_connection, df:pd.DataFrame, table, schema, key_columns=('code',)):
+  start = time.perf_counter()
+  columns = list(df.columns)
+  key_columns = list(key_columns)
+  quoted_columns = ', '.join(f'"{c}"' for c in columns)
+  quoted_keys = ', '.join(f'"{c}"' for c in key_columns)
+  staging = f"_stg_{table}"
+
+  update_columns = [c for c in columns if c not in key_columns]
+  if update_columns:
+    on_conflict = "DO UPDATE SET " + ', '.join(f'"{c}" = EXCLUDED."{c}"' for c in update_columns)
+  else:
+    on_conflict = "DO NOTHING"
+
+  cursor = pg_connection.cursor()
+  cursor.execute(f'CREATE TEMP TABLE "{staging}" (LIKE "{schema}"."{table}" INCLUDING DEFAULTS) ON COMMIT DROP')
+  cursor.execute(
+    f"""COPY "{staging}" ({quoted_columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')""",
+    stream=postgres_copy_buffer(df)
+  )
+  cursor.execute(f"""
+    INSERT INTO "{schema}"."{table}" ({quoted_columns})
+    SELECT DISTINCT ON ({quoted_keys}) {quoted_columns}
+    FROM "{staging}"
+    ORDER BY {quoted_keys}, ctid DESC
+    ON CONFLICT ({quoted_keys}) {on_conflict}
+  """)
+  elapsed = time.perf_counter() - start
+  logger.debug(f"({elapsed}s) Upserted {df.shape[0]} lines on {schema}.{table} through COPY")
+
+def postgres_copy_upsert(secret_id, data, table, schema, key_columns=('code',)):
+  if not isinstance(data, pd.DataFrame) and hasattr(data, 'to_pandas'):
+    data = data.to_pandas()
+  if data.shape[0] == 0:
+    return
+  try:
+    with postgres_pooled_connection(secret_id) as pg_connection:
+      postgres_copy_upsert_from_connection(pg_connection, data, table, schema, key_columns)
+  except Exception as e:
+    logger.error(f"Fail to COPY data to Postgres {schema}.{table}")
+    logger.error(e)
+    raise e
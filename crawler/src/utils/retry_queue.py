@@ -0,0 +1,90 @@
+import os
+import time
+from collections import OrderedDict
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+RETRY_MAX_ATTEMPTS = int(os.environ.get('RETRY_MAX_ATTEMPTS', 3))
+RETRY_BASE_DELAY_SECONDS = float(os.environ.get('RETRY_BASE_DELAY_SECONDS', 5))
+RETRY_MAX_DELAY_SECONDS = float(os.environ.get('RETRY_MAX_DELAY_SECONDS', 120))
+
+class RetryQueue:
+  """
+  Fila de itens que falharam em algum estágio da extração.
+  Cada entrada guarda os estágios que falharam e o resultado parcial já obtido,
+  para que só os estágios com falha sejam refeitos.
+  """
+  def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY_SECONDS, max_delay=RETRY_MAX_DELAY_SECONDS):
+    self.max_attempts = max_attempts
+    self.base_delay = base_delay
+    self.max_delay = max_delay
+    self._entries = OrderedDict()
+
+  def __len__(self):
+    return len(self._entries)
+
+  def add(self, key, failures, partial=None):
+    entry = self._entries.get(key) or {'key': key, 'failures': {}, 'partial': None, 'attempts': 0}
+    entry['failures'] = dict(failures)
+    if partial is not None:
+      entry['partial'] = partial
+    self._entries[key] = entry
+    logger.info(f"{key} enviado para retry nos estágios {sorted(entry['failures'])}")
+
+  def entries(self):
+    return list(self._entries.values())
+
+  def delay(self, attempt):
+    return min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+
+  def process(self, handler, before_attempt=None, should_stop=None, wait=time.sleep):
+    """
+    handler(entry) -> (result, failures). Uma falha reenfileira a entrada com o novo
+    resultado parcial; após max_attempts as entradas restantes são devolvidas como esgotadas.
+    Se `should_stop()` interromper o processamento, as entradas que não chegaram à última
+    tentativa ficam na fila como pendentes, inclusive as puladas durante ela.
+    `wait(segundos)` faz o backoff entre tentativas; com um prazo de run, use uma espera
+    que acorde no prazo ou no sinal de parada (RunBudget.wait).
+    """
+    completed = []
+    for attempt in range(1, self.max_attempts + 1):
+      if not self._entries:
+        break
+      if should_stop and should_stop():
+        logger.warning(f"Retry interrompido com {len(self._entries)} itens pendentes")
+        return completed, []
+      delay = self.delay(attempt)
+      logger.info(f"Retry {attempt}/{self.max_attempts} de {len(self._entries)} itens em {delay}s")
+      wait(delay)
+      if should_stop and should_stop():
+        break
+      if before_attempt:
+        before_attempt(attempt)
+
+      pending, self._entries = self._entries, OrderedDict()
+      for key, entry in pending.items():
+        if should_stop and should_stop():
+          self._entries[key] = entry
+          continue
+        entry['attempts'] = attempt
+        try:
+          result, failures = handler(entry)
+        except Exception as e:
+          result, failures = None, {'retry': str(e)}
+        if failures:
+          entry['failures'] = dict(failures)
+          if result is not None:
+            entry['partial'] = result
+          self._entries[key] = entry
+        else:
+          completed.append(result)
+
+    exhausted = [entry for entry in self.entries() if entry['attempts'] >= self.max_attempts]
+    for entry in exhausted:
+      logger.error(f"{entry['key']} esgotou {self.max_attempts} tentativas: {entry['failures']}")
+    self._entries = OrderedDict((key, entry) for key, entry in self._entries.items() if entry['attempts'] < self.max_attempts)
+    if self._entries:
+      logger.warning(f"Retry interrompido com {len(self._entries)} itens pendentes")
+    return completed, exhausted
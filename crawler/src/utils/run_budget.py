@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import signal
+import threading
+from datetime import datetime
+
+from utils.logger import get_logger
+from utils.s3 import s3_extract_bucket_path
+from utils.secret_manager import get_boto3_client
+
+logger = get_logger(__name__)
+
+MAX_RUNTIME_SECONDS = float(os.environ.get('MAX_RUNTIME_SECONDS', 0)) or None
+DRAIN_MARGIN_SECONDS = float(os.environ.get('DRAIN_MARGIN_SECONDS', 300))
+
+class RunBudget:
+  """
+  Prazo de execução do crawl. `should_stop` fica verdadeiro `drain_margin` segundos
+  antes do prazo (tempo para terminar os códigos em andamento e gravar os buffers)
+  ou quando o processo recebe SIGTERM/SIGINT.
+  """
+  def __init__(self, max_runtime_seconds=MAX_RUNTIME_SECONDS, drain_margin_seconds=DRAIN_MARGIN_SECONDS):
+    self.started_at = time.monotonic()
+    self.deadline = self.started_at + max_runtime_seconds if max_runtime_seconds else None
+    self.drain_margin_seconds = drain_margin_seconds
+    self._stop = threading.Event()
+    self._logged = False
+
+  def install_signal_handlers(self):
+    for sig in (signal.SIGTERM, signal.SIGINT):
+      signal.signal(sig, self._on_signal)
+
+  def _on_signal(self, signum, frame):
+    logger.warning(f"Signal {signum} received, draining crawl")
+    self._stop.set()
+
+  def request_stop(self):
+    self._stop.set()
+
+  def remaining(self):
+    if self.deadline is None:
+      return None
+    return self.deadline - time.monotonic()
+
+  def wait(self, seconds):
+    """
+    Espera até `seconds` segundos, acordando antes se o run for interrompido. Retorna should_stop().
+    """
+    remaining = self.remaining()
+    if remaining is not None:
+      seconds = min(seconds, max(0.0, remaining - self.drain_margin_seconds))
+    self._stop.wait(seconds)
+    return self.should_stop()
+
+  def should_stop(self):
+    if not self._stop.is_set() and self.deadline is not None and self.remaining() <= self.drain_margin_seconds:
+      self._stop.set()
+    if self._stop.is_set() and not self._logged:
+      self._logged = True
+      logger.warning(f"Run budget exhausted after {time.monotonic() - self.started_at:.0f}s, no new codes will be started")
+    return self._stop.is_set()
+
+def load_progress(path):
+  """
+  Lê os códigos pendentes gravados pelo último run (caminho local ou s3://).
+  """
+  if not path:
+    return []
+  try:
+    if path.startswith('s3://'):
+      bucket, key = s3_extract_bucket_path(path)
+      client = get_boto3_client('s3')
+      try:
+        body = client.get_object(Bucket=bucket, Key=key)['Body'].read()
+      except client.exceptions.NoSuchKey:
+        return []
+      progress = json.loads(body)
+    else:
+      if not os.path.exists(path):
+        return []
+      with open(path, 'r') as f:
+        progress = json.load(f)
+    logger.info(f"{len(progress['pending_codes'])} pending codes from run {progress.get('run_id')}")
+    return progress['pending_codes']
+  except Exception as e:
+    logger.error(f"Fail to load crawl progress from {path}")
+    logger.error(e)
+    return []
+
+def save_progress(path, run_id, pending_codes):
+  if not path:
+    return
+  progress = json.dumps({
+    'run_id': run_id,
+    'pending_codes': list(pending_codes),
+    'updated_at': datetime.now().isoformat(),
+  })
+  if path.startswith('s3://'):
+    bucket, key = s3_extract_bucket_path(path)
+    get_boto3_client('s3').put_object(Bucket=bucket, Key=key, Body=progress.encode('utf-8'))
+  else:
+    with open(path, 'w') as f:
+      f.write(progress)
+  logger.info(f"Crawl progress saved to {path} ({len(pending_codes)} pending codes)")
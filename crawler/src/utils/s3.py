@@ -1,11 +1,13 @@
 import re
-import awswrangler as wr
-import pandas as pd
 import time
 from uuid import uuid4
 from datetime import datetime
 
 from utils.logger import get_logger
+from utils.lazy import lazy_import
+
+wr = lazy_import('awswrangler')
+pd = lazy_import('pandas')
 
 logger = get_logger(__name__)
 
@@ -34,7 +36,7 @@ def s3_extract_bucket_path(uri):
   else:
     return None, None
   
-def s3_athena_load_table_parquet_snappy(df, database, table_name, table_location, partition_cols=None, s3_file_prefix = f'{datetime.now().strftime("%Y%m%d")}_', insert_mode='overwrite') :
+def s3_athena_load_table_parquet_snappy(df, database, table_name, table_location, partition_cols=None, s3_file_prefix = f'{datetime.now().strftime("%Y%m%d")}_', insert_mode='overwrite', bucketing_info=None) :
   start = time.perf_counter()
       
   if df.shape[0] > 0:
@@ -48,7 +50,8 @@ def s3_athena_load_table_parquet_snappy(df, database, table_name, table_location
       mode=insert_mode,
       path=table_location,
       index=False,
-      partition_cols= partition_cols
+      partition_cols= partition_cols,
+      bucketing_info=bucketing_info
     )
       
   elapsed = time.perf_counter() - start
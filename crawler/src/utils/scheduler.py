@@ -0,0 +1,64 @@
+import os
+
+from utils.logger import get_logger
+from utils.lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+logger = get_logger(__name__)
+
+SCHEDULER_STALENESS_WEIGHT = float(os.environ.get('SCHEDULER_STALENESS_WEIGHT', 1.0))
+SCHEDULER_CHANGE_WEIGHT = float(os.environ.get('SCHEDULER_CHANGE_WEIGHT', 2.0))
+SCHEDULER_NEW_WEIGHT = float(os.environ.get('SCHEDULER_NEW_WEIGHT', 5.0))
+SCHEDULER_DELETED_WEIGHT = float(os.environ.get('SCHEDULER_DELETED_WEIGHT', 1.5))
+SCHEDULER_STALENESS_DAYS = float(os.environ.get('SCHEDULER_STALENESS_DAYS', 30))
+
+HISTORY_COLUMNS = ['code', 'last_crawled_at', 'crawl_count', 'change_count', 'is_deleted']
+
+def priority_scores(codes, df_history=None, now=None):
+  """
+  Score de prioridade por código. `df_history` tem uma linha por código já coletado:
+    last_crawled_at  data do último crawl com sucesso
+    crawl_count      quantidade de crawls
+    change_count     quantas vezes o fingerprint da linha mudou entre crawls consecutivos
+    is_deleted       se o último crawl marcou o código como deletado
+  Códigos sem histórico são tratados como novos.
+  """
+  df = pd.DataFrame({'code': list(codes)})
+  if df_history is None or df_history.empty:
+    df['score'] = SCHEDULER_NEW_WEIGHT
+    return df
+
+  now = pd.Timestamp(now or pd.Timestamp.now(tz='UTC'))
+  if now.tzinfo is None:
+    now = now.tz_localize('UTC')
+  history = df_history[HISTORY_COLUMNS].drop_duplicates('code', keep='last')
+  df = df.merge(history, on='code', how='left')
+
+  is_new = df['last_crawled_at'].isna()
+  last_crawled_at = pd.to_datetime(df['last_crawled_at'], utc=True, errors='coerce')
+  days_since = ((now - last_crawled_at).dt.total_seconds() / 86400).fillna(0).clip(lower=0)
+  staleness = (days_since / SCHEDULER_STALENESS_DAYS).clip(upper=3)
+
+  crawl_count = pd.to_numeric(df['crawl_count'], errors='coerce').fillna(0)
+  change_count = pd.to_numeric(df['change_count'], errors='coerce').fillna(0)
+  change_rate = (change_count / (crawl_count - 1).clip(lower=1)).clip(upper=1)
+
+  is_deleted = df['is_deleted'].fillna(False).astype(bool)
+
+  df['score'] = (
+    SCHEDULER_STALENESS_WEIGHT * staleness
+    + SCHEDULER_CHANGE_WEIGHT * change_rate
+    + SCHEDULER_NEW_WEIGHT * is_new.astype(float)
+    + SCHEDULER_DELETED_WEIGHT * is_deleted.astype(float)
+  )
+  return df[['code', 'score']]
+
+def prioritize_codes(codes, df_history=None, now=None):
+  scores = priority_scores(codes, df_history, now)
+  ordered = scores.sort_values('score', ascending=False, kind='stable')
+  logger.info(
+    f"Scheduled {ordered.shape[0]} codes, score max {ordered['score'].max() if not ordered.empty else 0:.2f} "
+    f"median {ordered['score'].median() if not ordered.empty else 0:.2f}"
+  )
+  return ordered['code'].tolist()
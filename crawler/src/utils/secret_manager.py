@@ -1,23 +1,65 @@
-import boto3
-from botocore.exceptions import ClientError
+import os
+import time
+import threading
 
 from utils.logger import get_logger
+from utils.lazy import lazy_import
+
+boto3 = lazy_import('boto3')
+botocore_exceptions = lazy_import('botocore.exceptions')
 
 logger = get_logger(__name__)
 
-def get_secret( secret_name:str, region_name:str = "us-east-1" ):
-  logger.debug("Boto3 session")
-  session = boto3.session.Session()
-  
-  logger.debug("Secret manager client")
-  client = session.client( service_name='secretsmanager', region_name=region_name )
+SECRET_CACHE_TTL_SECONDS = int(os.environ.get('SECRET_CACHE_TTL_SECONDS', 300))
+
+_lock = threading.Lock()
+# boto3.Session não é thread-safe: uma por thread (os clients criados a partir dela podem ser compartilhados)
+_local = threading.local()
+_clients = {}
+_secrets = {}
+
+def get_boto3_session():
+  session = getattr(_local, 'session', None)
+  if session is None:
+    logger.debug("Boto3 session")
+    session = _local.session = boto3.session.Session()
+  return session
+
+def get_boto3_client( service_name:str, region_name:str = "us-east-1" ):
+  key = (service_name, region_name)
+  client = _clients.get(key)
+  if client is None:
+    session = get_boto3_session()
+    with _lock:
+      client = _clients.get(key)
+      if client is None:
+        logger.debug(f"Boto3 client {service_name} ({region_name})")
+        client = session.client( service_name=service_name, region_name=region_name )
+        _clients[key] = client
+  return client
+
+def get_secret( secret_name:str, region_name:str = "us-east-1", ttl:int = SECRET_CACHE_TTL_SECONDS ):
+  key = (secret_name, region_name)
+  cached = _secrets.get(key)
+  if cached and cached[1] > time.monotonic():
+    return cached[0]
+
+  client = get_boto3_client( service_name='secretsmanager', region_name=region_name )
   
   try:
     logger.debug("Getting secrets")
     get_secret_value_response = client.get_secret_value(
       SecretId=secret_name
     )
-  except ClientError as e:
+  except botocore_exceptions.ClientError as e:
     raise e
   secret = get_secret_value_response['SecretString']
+  if ttl and ttl > 0:
+    _secrets[key] = (secret, time.monotonic() + ttl)
   return secret
+
+def invalidate_secret( secret_name:str = None ):
+  with _lock:
+    for key in list(_secrets):
+      if secret_name is None or key[0] == secret_name:
+        del _secrets[key]
@@ -0,0 +1,214 @@
+import os
+import re
+import json
+from collections import Counter, deque
+from datetime import datetime
+
+from utils.logger import get_logger
+from utils.s3 import s3_extract_bucket_path
+from utils.secret_manager import get_boto3_client
+
+logger = get_logger(__name__)
+
+VALIDATION_WINDOW = int(os.environ.get('VALIDATION_WINDOW', 200))
+VALIDATION_MIN_BASELINE_FILL = float(os.environ.get('VALIDATION_MIN_BASELINE_FILL', 0.2))
+VALIDATION_COLLAPSE_RATIO = float(os.environ.get('VALIDATION_COLLAPSE_RATIO', 0.25))
+
+RE_CODE = re.compile(r'^(\d{4}[0-9A-Z]|[A-Z]\d{4})$')
+RE_INTERVAL = re.compile(r'^(\d{4,5}[A-Z]?-\d{4,5}[A-Z]?|[A-Z]\d{4}-[A-Z]\d{4})$')
+RE_NDC = re.compile(r'^(\d{4,5}-\d{3,4}-\d{1,2}|\d{10,11})$')
+
+# coluna -> padrão dos valores preenchidos (em colunas lista, de cada item)
+FIELD_PATTERNS = {
+  'code': RE_CODE,
+  'main_interval': RE_INTERVAL,
+  'ndc_alternate_id': RE_NDC,
+}
+# obrigatórias em páginas ativas; páginas de código deletado só trazem date_deleted e textos
+REQUIRED_FIELDS = ('code', 'code_type', 'short_description')
+
+def is_filled(value):
+  return value is not None and value != '' and value != []
+
+def _mismatches(value, pattern):
+  values = value if isinstance(value, list) else [value]
+  return [item for item in values if is_filled(item) and not pattern.match(str(item))]
+
+class OutputValidator:
+  """
+  Validação em fluxo das linhas extraídas, entre a extração e o flush. Cada linha
+  passa pelos campos obrigatórios e pelos padrões de FIELD_PATTERNS; as que falham
+  vão para a quarentena. A taxa de preenchimento de cada coluna, por tipo de código
+  ('CPT:guidelines', 'HCPCS:betos_code'...), é acompanhada numa janela das últimas
+  `window` páginas ativas do tipo: se ela cai abaixo de `collapse_ratio` vezes a taxa
+  do run anterior, o run é abortado (`aborted`).
+  """
+  def __init__(self, columns, baseline=None, window=VALIDATION_WINDOW,
+               min_baseline_fill=VALIDATION_MIN_BASELINE_FILL, collapse_ratio=VALIDATION_COLLAPSE_RATIO):
+    self.columns = list(columns)
+    self.baseline = baseline or {}
+    self.window = window
+    self.min_baseline_fill = min_baseline_fill
+    self.collapse_ratio = collapse_ratio
+    self.rows = 0
+    self.quarantined = 0
+    self.type_rows = Counter()
+    self.filled = Counter()
+    self.failed_checks = Counter()
+    self.collapsed = {}
+    self._recent = {}
+    self._recent_filled = Counter()
+
+  @property
+  def aborted(self):
+    return bool(self.collapsed)
+
+  def _track_fill(self, key, filled):
+    recent = self._recent.get(key)
+    if recent is None:
+      recent = self._recent[key] = deque(maxlen=self.window)
+    if len(recent) == recent.maxlen:
+      self._recent_filled[key] -= recent[0]
+    recent.append(filled)
+    self._recent_filled[key] += filled
+    self.filled[key] += filled
+
+  def check_row(self, record):
+    row = record._asdict()
+    deleted = is_filled(row.get('date_deleted'))
+    reasons = []
+    for column in REQUIRED_FIELDS:
+      if not deleted and not is_filled(row.get(column)):
+        reasons.append(f"{column} empty")
+    for column, pattern in FIELD_PATTERNS.items():
+      bad = _mismatches(row.get(column), pattern)
+      if bad:
+        reasons.append(f"{column} malformed: {bad[:3]}")
+    if not deleted:
+      code_type = row.get('code_type')
+      self.rows += 1
+      self.type_rows[code_type] += 1
+      for column in self.columns:
+        self._track_fill(f"{code_type}:{column}", is_filled(row.get(column)))
+    for reason in reasons:
+      self.failed_checks[reason.split(' ')[0]] += 1
+    return reasons
+
+  def check_ndc(self, ndc):
+    bad = _mismatches(ndc.ndc_alternate_id, RE_NDC)
+    if bad or not is_filled(ndc.ndc_alternate_id):
+      self.failed_checks['ndc_row'] += 1
+      return [f"ndc_alternate_id malformed: {bad[:3] or [ndc.ndc_alternate_id]}"]
+    return []
+
+  def fill_rates(self):
+    return {key: self.filled[key] / self.type_rows[key.split(':', 1)[0]] for key in self._recent}
+
+  def _check_collapse(self):
+    for key, recent in self._recent.items():
+      baseline = self.baseline.get(key)
+      if key in self.collapsed or baseline is None or baseline < self.min_baseline_fill or len(recent) < recent.maxlen:
+        continue
+      rate = self._recent_filled[key] / len(recent)
+      if rate < baseline * self.collapse_ratio:
+        self.collapsed[key] = rate
+        logger.error(
+          f"Fill rate of '{key}' collapsed to {rate:.1%} over the last {len(recent)} pages "
+          f"(previous run {baseline:.1%})"
+        )
+
+  def validate(self, procedure_codes, ndcs):
+    """
+    Valida um lote e devolve (procedure_codes válidos, ndcs válidos, quarentena).
+    Depois de um colapso de preenchimento o lote inteiro vai para a quarentena.
+    """
+    valid_codes, valid_ndcs, quarantine = [], [], []
+    for record in procedure_codes:
+      reasons = self.check_row(record)
+      if reasons:
+        quarantine.append({'table': 'procedure_code', 'row': record._asdict(), 'reasons': reasons})
+      else:
+        valid_codes.append(record)
+    for ndc in ndcs:
+      reasons = self.check_ndc(ndc)
+      if reasons:
+        quarantine.append({'table': 'procedure_code_ndc', 'row': ndc._asdict(), 'reasons': reasons})
+      else:
+        valid_ndcs.append(ndc)
+
+    self._check_collapse()
+    if self.aborted:
+      reasons = [f"fill rate of {key} collapsed" for key in self.collapsed]
+      quarantine += [{'table': 'procedure_code', 'row': record._asdict(), 'reasons': reasons} for record in valid_codes]
+      quarantine += [{'table': 'procedure_code_ndc', 'row': ndc._asdict(), 'reasons': reasons} for ndc in valid_ndcs]
+      valid_codes, valid_ndcs = [], []
+    self.quarantined += len(quarantine)
+    return valid_codes, valid_ndcs, quarantine
+
+  def summary(self):
+    rates = ', '.join(f"{key}={rate:.0%}" for key, rate in sorted(self.fill_rates().items()))
+    return f"rows={self.rows} quarantined={self.quarantined} failed_checks={dict(self.failed_checks)} fill_rates: {rates}"
+
+def _read_text(path):
+  if path.startswith('s3://'):
+    bucket, key = s3_extract_bucket_path(path)
+    client = get_boto3_client('s3')
+    try:
+      return client.get_object(Bucket=bucket, Key=key)['Body'].read().decode('utf-8')
+    except client.exceptions.NoSuchKey:
+      return None
+  if not os.path.exists(path):
+    return None
+  with open(path, 'r') as f:
+    return f.read()
+
+def _write_text(path, text):
+  if path.startswith('s3://'):
+    bucket, key = s3_extract_bucket_path(path)
+    get_boto3_client('s3').put_object(Bucket=bucket, Key=key, Body=text.encode('utf-8'))
+  else:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+      f.write(text)
+
+def load_fill_rates(path):
+  """
+  Lê as taxas de preenchimento gravadas pelo último run completo (caminho local ou s3://).
+  """
+  if not path:
+    return {}
+  try:
+    text = _read_text(path)
+    if text is None:
+      return {}
+    stats = json.loads(text)
+    logger.info(f"Fill rate baseline from run {stats.get('run_id')} ({stats.get('rows')} rows)")
+    return stats['fill_rates']
+  except Exception as e:
+    logger.error(f"Fail to load fill rate baseline from {path}")
+    logger.error(e)
+    return {}
+
+def save_fill_rates(path, run_id, validator):
+  if not path or not validator.rows:
+    return
+  _write_text(path, json.dumps({
+    'run_id': run_id,
+    'rows': validator.rows,
+    # colunas fora do perfil deste run mantêm a taxa do baseline anterior
+    'fill_rates': {**validator.baseline, **validator.fill_rates()},
+    'updated_at': datetime.now().isoformat(),
+  }))
+  logger.info(f"Fill rate baseline saved to {path}")
+
+def write_quarantine(root, run_id, label, quarantine):
+  """
+  Grava as linhas em quarentena de um lote como JSON lines em <root>/<run_id>/<label>.jsonl.
+  """
+  if not quarantine:
+    return
+  name = re.sub(r'[^0-9A-Za-z_.-]+', '_', label).strip('_') or 'chunk'
+  lines = '\n'.join(json.dumps(entry, default=str) for entry in quarantine) + '\n'
+  path = f"{root.rstrip('/')}/{run_id}/{name}.jsonl"
+  _write_text(path, lines)
+  logger.warning(f"{len(quarantine)} rows quarantined to {path}")
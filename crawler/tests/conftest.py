@@ -0,0 +1,5 @@
+import os
+import sys
+
+# os módulos do crawler são importados a partir de crawler/src, como no `python -m`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
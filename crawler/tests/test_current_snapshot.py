@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+import current_snapshot
+import procedure_code
+
+CONFIG = SimpleNamespace(
+    ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_SCHEMA='crawler',
+    ATHENA_OUTPUT_PROCEDURE_CODES_TABLE_NAME='procedure_code',
+    ATHENA_OUTPUT_PROCEDURE_CODES_CURRENT_TABLE_NAME='procedure_code_current',
+    ATHENA_OUTPUT_PROCEDURE_CODES_CURRENT_TABLE_LOCATION='s3://bucket/procedure_code_current/',
+    CRAWL_MODE='standalone',
+    CRAWL_RUN_ID='2026-10-19',
+    CRAWL_NODE_ID='node-1',
+)
+
+def test_merge_selects_only_run_files_and_orders_by_write_time(monkeypatch):
+    monkeypatch.setattr(current_snapshot, 'CONFIG', CONFIG)
+    query = current_snapshot.merge_current_query({'20261019120000_2026-10-19_'}, skipped_columns=('guidelines',))
+    assert "regexp_like(\"$path\", '/(20261019120000_2026\\-10\\-19_)[^/]*$')" in query
+    assert 'ORDER BY coalesce(crawled_at' in query
+    assert 'ORDER BY "$path"' not in query
+    assert '"guidelines" = s."guidelines"' not in query
+
+def test_file_prefix_separates_runs_on_the_same_day(monkeypatch):
+    monkeypatch.setattr(procedure_code, 'CONFIG', CONFIG)
+    monkeypatch.setattr(procedure_code, 'RUN_STARTED_AT', '20261019120000')
+    assert procedure_code.output_file_prefix() == '20261019120000_2026-10-19_'
+    monkeypatch.setattr(procedure_code, 'CONFIG', SimpleNamespace(**{**vars(CONFIG), 'CRAWL_MODE': 'worker', 'CRAWL_RUN_ID': 'run 2/b'}))
+    assert procedure_code.output_file_prefix() == '20261019120000_run_2_b_node-1_'
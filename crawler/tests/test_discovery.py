@@ -0,0 +1,28 @@
+import pytest
+
+import discovery
+
+SITE = {
+    'root': ({'range-a', 'range-b'}, set()),
+    'range-a': ({'range-a1'}, {'99202'}),
+    'range-b': (set(), {'99211'}),
+    'range-a1': (set(), {'99203'}),
+}
+
+@pytest.fixture
+def site(monkeypatch):
+    monkeypatch.setattr(discovery, 'fetch_range_page', lambda session, url: (*SITE[url], None))
+
+def test_discovers_codes_from_every_range_page(site):
+    assert discovery.discover_codes(['root'], workers=2) == {'99202', '99203', '99211'}
+
+def test_page_cap_with_unvisited_pages_raises(site, monkeypatch):
+    monkeypatch.setattr(discovery, 'DISCOVERY_MAX_PAGES', 2)
+    with pytest.raises(RuntimeError):
+        discovery.discover_codes(['root'], workers=2)
+
+def test_plan_crawl_splits_new_and_retired():
+    codes, new_codes, retired_codes = discovery.plan_crawl({'99202', '99203'}, ['99202', '99211'])
+    assert codes == ['99203', '99202']
+    assert new_codes == {'99203'}
+    assert retired_codes == {'99211'}
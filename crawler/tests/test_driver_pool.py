@@ -0,0 +1,67 @@
+import pytest
+
+from utils.driver_manager import ManagedDriver
+from utils.driver_pool import DriverPool, DriverPoolError
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_calls = 0
+
+    def quit(self):
+        self.quit_calls += 1
+
+    def get_cookies(self):
+        return []
+
+    def execute_script(self, script):
+        return 'complete'
+
+def new_manager(driver_factory, login):
+    return ManagedDriver(driver_factory, login, 'https://example.com/', lambda driver: True)
+
+def failing_login(driver):
+    raise RuntimeError('login refused')
+
+def test_start_quits_driver_when_login_fails():
+    drivers = []
+    manager = new_manager(lambda: drivers.append(FakeDriver()) or drivers[-1], failing_login)
+    with pytest.raises(RuntimeError):
+        manager.start()
+    assert drivers[0].quit_calls == 1
+    assert manager.driver is None
+
+def test_pool_start_raises_after_consecutive_failures():
+    drivers = []
+    pool = DriverPool(
+        lambda: new_manager(lambda: drivers.append(FakeDriver()) or drivers[-1], failing_login),
+        size=2, max_create_failures=3, retry_base_delay=0.01, start_timeout=30
+    )
+    with pytest.raises(DriverPoolError):
+        pool.start()
+    assert 3 <= len(drivers) <= 4
+    assert all(driver.quit_calls == 1 for driver in drivers)
+
+def test_pool_start_raises_on_timeout():
+    pool = DriverPool(
+        lambda: new_manager(FakeDriver, failing_login),
+        size=1, max_create_failures=1000, retry_base_delay=10, start_timeout=0.5
+    )
+    with pytest.raises(DriverPoolError):
+        pool.start()
+
+def test_pool_starts_after_transient_failure():
+    attempts = []
+
+    def flaky_login(driver):
+        attempts.append(driver)
+        if len(attempts) == 1:
+            raise RuntimeError('login refused')
+
+    pool = DriverPool(lambda: new_manager(FakeDriver, flaky_login), size=1, retry_base_delay=0.01)
+    pool.start()
+    try:
+        assert pool.create_failures == 0
+        with pool.lease() as manager:
+            assert manager.driver is attempts[1]
+    finally:
+        pool.close()
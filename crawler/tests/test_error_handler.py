@@ -0,0 +1,35 @@
+import os
+
+from utils.error_handler import ErrorSink
+
+def record(n):
+    return {'dag_id': 'dag', 'task_id': 'task', 'run_id': 'run', 'error': f"error {n}"}
+
+class FlakySink(ErrorSink):
+    def __init__(self, spill_path):
+        super().__init__(spill_path=spill_path)
+        self.up = False
+        self.written = []
+
+    def _write(self, records):
+        if not self.up:
+            raise ConnectionError('postgres down')
+        self.written += [r['error'] for r in records]
+
+def test_spilled_errors_survive_a_failed_replay(tmp_path):
+    sink = FlakySink(str(tmp_path / 'errors.spill.jsonl'))
+    sink._buffer = [record(1), record(2)]
+    sink.flush()
+    assert os.path.exists(sink.spill_path)
+
+    # o replay falha: os registros lidos do spill não podem se perder
+    sink._buffer = [record(3)]
+    sink.flush()
+    assert os.path.exists(sink.spill_path + '.replay')
+
+    sink.up = True
+    sink.flush()
+    sink.flush()
+    assert sorted(sink.written) == ['error 1', 'error 2', 'error 3']
+    assert not os.path.exists(sink.spill_path)
+    assert not os.path.exists(sink.spill_path + '.replay')
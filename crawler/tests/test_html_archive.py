@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip('zstandard')
+
+from utils.html_archive import HtmlArchive
+
+def test_partial_retry_tabs_merge_into_previous_capture(tmp_path):
+    archive = HtmlArchive(str(tmp_path), 'run')
+    archive.add('99213', '<html>page</html>', tabs={
+        'modifiers': ('Modifiers', ['<div>mod</div>']),
+        'ndc': ('NDC', ['<div>timeout</div>']),
+    }, is_cpt=True, page_kind='active_cpt')
+    archive.flush()
+    # retry só da aba que falhou
+    archive.add('99213', '<html>retry</html>', tabs={'ndc': ('NDC', ['<div>ndc 1</div>', '<div>ndc 2</div>'])},
+                is_cpt=True, page_kind='active_cpt', merge_tabs=True)
+    archive.flush()
+
+    [entry] = archive.entries()
+    assert archive.get_blob(entry['html']) == '<html>page</html>'
+    assert 'merge_tabs' not in entry
+    tabs = {stage: [archive.get_blob(digest) for digest in digests] for stage, (_, digests) in entry['tabs'].items()}
+    assert tabs == {'modifiers': ['<div>mod</div>'], 'ndc': ['<div>ndc 1</div>', '<div>ndc 2</div>']}
+
+def test_full_capture_replaces_previous_one(tmp_path):
+    archive = HtmlArchive(str(tmp_path), 'run')
+    archive.add('99213', '<html>old</html>', tabs={'ndc': ('NDC', ['<div>old</div>'])})
+    archive.add('99213', '<html>new</html>')
+    archive.flush()
+
+    [entry] = archive.entries()
+    assert archive.get_blob(entry['html']) == '<html>new</html>'
+    assert entry['tabs'] == {}
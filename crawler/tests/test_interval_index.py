@@ -0,0 +1,50 @@
+from utils.interval_index import IntervalIndex
+
+SECTION = ('99202-99499', ['Evaluation and Management'])
+OFFICE = ('99202-99499', ['Evaluation and Management', 'Office or Other Outpatient Services'])
+NEW_PATIENT = ('99202-99499', ['Evaluation and Management', 'Office or Other Outpatient Services', 'New Patient'])
+
+def test_leaf_resolves_codes():
+    index = IntervalIndex()
+    index.add('99202-99205', *NEW_PATIENT)
+    assert index.lookup('99203') == NEW_PATIENT
+    assert index.lookup('99211') is None
+
+def test_ancestor_does_not_resolve_codes():
+    index = IntervalIndex()
+    index.add('99202-99215', *OFFICE, is_leaf=False)
+    assert index.lookup('99203') is None
+
+def test_interval_containing_another_is_not_a_leaf():
+    index = IntervalIndex()
+    # primeiro código visto estava direto no intervalo pai; depois aparece um subintervalo
+    index.add('99202-99215', *OFFICE)
+    assert index.lookup('99212') == OFFICE
+    index.add('99202-99205', *NEW_PATIENT)
+    assert index.lookup('99203') == NEW_PATIENT
+    assert index.lookup('99212') is None
+
+def test_leaf_added_inside_known_ancestor():
+    index = IntervalIndex()
+    index.add('99202-99499', *SECTION, is_leaf=False)
+    index.add('99202-99215', *OFFICE, is_leaf=False)
+    assert index.lookup('99203') is None
+    index.add('99202-99205', *NEW_PATIENT)
+    assert index.lookup('99203') == NEW_PATIENT
+
+def test_rows_round_trip_keeps_leaf_flag():
+    index = IntervalIndex()
+    index.add('99202-99215', *OFFICE, is_leaf=False)
+    index.add('99202-99205', *NEW_PATIENT)
+    rows = [dict(zip(['leaf_interval', 'range_start', 'range_end', 'main_interval', 'main_interval_name', 'is_leaf'], row)) for row in index.rows()]
+    loaded = IntervalIndex()
+    assert loaded.load_rows(rows) == 2
+    assert loaded.lookup('99203') == NEW_PATIENT
+    assert loaded.lookup('99212') is None
+
+def test_rows_without_leaf_flag_wait_for_a_breadcrumb():
+    index = IntervalIndex()
+    index.load_rows([{'leaf_interval': '99202-99205', 'main_interval': NEW_PATIENT[0], 'main_interval_name': NEW_PATIENT[1]}])
+    assert index.lookup('99203') is None
+    index.add('99202-99205', *NEW_PATIENT)
+    assert index.lookup('99203') == NEW_PATIENT
@@ -0,0 +1,68 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import procedure_code
+from utils.leases import sqlite_lease_store
+from utils.run_budget import RunBudget
+
+RUN_ID = 'run-1'
+
+@pytest.fixture
+def store(tmp_path):
+    lease_store = sqlite_lease_store(str(tmp_path / 'leases.db'))
+    lease_store.create_table()
+    lease_store.create_leases(RUN_ID, ['99211', '99212', '99213'], lease_size=2)
+    return lease_store
+
+def test_claim_hands_out_each_lease_once(store):
+    assert store.claim(RUN_ID, 'node-a') == (0, ['99211', '99212'])
+    assert store.claim(RUN_ID, 'node-b') == (1, ['99213'])
+    assert store.claim(RUN_ID, 'node-c') is None
+    assert store.progress(RUN_ID) == {'claimed': 2}
+
+def test_create_leases_is_idempotent(store):
+    assert store.create_leases(RUN_ID, ['99211'], lease_size=1) == 2
+    assert store.progress(RUN_ID) == {'pending': 2}
+
+def test_renew_only_by_owner(store):
+    lease_id, _ = store.claim(RUN_ID, 'node-a')
+    assert store.renew(RUN_ID, lease_id, 'node-a')
+    assert not store.renew(RUN_ID, lease_id, 'node-b')
+
+def test_expired_lease_is_claimed_by_another_node(store):
+    store.ttl = 0.05
+    lease_id, codes = store.claim(RUN_ID, 'node-a')
+    store.claim(RUN_ID, 'node-a')
+    time.sleep(0.1)
+    assert store.claim(RUN_ID, 'node-b') == (lease_id, codes)
+    assert not store.renew(RUN_ID, lease_id, 'node-a')
+    assert not store.complete(RUN_ID, lease_id, 'node-a')
+    assert store.renew(RUN_ID, lease_id, 'node-b')
+
+def test_requeue_returns_pending_codes(store):
+    lease_id, _ = store.claim(RUN_ID, 'node-a')
+    assert store.requeue(RUN_ID, lease_id, 'node-a', ['99212'])
+    assert store.claim(RUN_ID, 'node-b') == (lease_id, ['99212'])
+
+def test_complete_and_release(store):
+    first, _ = store.claim(RUN_ID, 'node-a')
+    second, _ = store.claim(RUN_ID, 'node-a')
+    assert store.complete(RUN_ID, first, 'node-a')
+    assert store.release(RUN_ID, second, 'node-a')
+    assert store.progress(RUN_ID) == {'done': 1, 'pending': 1}
+
+def test_worker_waits_for_leases_held_by_other_nodes(store, monkeypatch):
+    store.ttl = 0.3
+    # node-a reivindica um lease e cai sem renovar
+    _, crashed_codes = store.claim(RUN_ID, 'node-a')
+    crawled = []
+    monkeypatch.setattr(procedure_code, 'CONFIG', SimpleNamespace(CRAWL_RUN_ID=RUN_ID, CRAWL_NODE_ID='node-b'))
+    monkeypatch.setattr(procedure_code, 'crawl_codes', lambda ctx, codes, label='': crawled.append(codes) or [])
+    monkeypatch.setattr(procedure_code, 'process_retries', lambda ctx, label='': [])
+
+    procedure_code.run_worker(SimpleNamespace(budget=RunBudget(max_runtime_seconds=30, drain_margin_seconds=0)), store)
+
+    assert crawled == [['99213'], crashed_codes]
+    assert store.progress(RUN_ID) == {'done': 2}
@@ -0,0 +1,25 @@
+from procedure_parsers import PAGE_KIND_404, PAGE_KIND_ACTIVE_CPT, classify_page, has_logout_header
+
+def test_logout_header_matches_the_breadcrumb_tag():
+    assert has_logout_header('<body><div class="newbread logout-header"><a href="/">CPT Codes</a></div></body>')
+    assert has_logout_header('<div id="crumbs" class="col logout-header newbread">')
+    assert has_logout_header("<DIV class='newbread logout-header'>")
+
+def test_logout_header_ignores_css_js_and_other_tags():
+    assert not has_logout_header('<style>.newbread.logout-header { display: none; }</style>')
+    assert not has_logout_header('<script>document.querySelector("div.newbread.logout-header")</script>')
+    assert not has_logout_header('<span class="newbread logout-header"></span>')
+    assert not has_logout_header('<div class="div newbread"><a href="/">CPT Codes</a></div>')
+    assert not has_logout_header('<div class="newbread logout-header-mobile">')
+
+def test_404_page_is_detected_by_its_container_tag():
+    assert classify_page('<body><div class="container container404"><h1>Page not found</h1></div></body>', '/cpt-codes/99999/') == PAGE_KIND_404
+    assert classify_page('<p>ok</p>', '/cpt-codes/99213/', status=404) == PAGE_KIND_404
+
+def test_404_class_name_in_css_or_js_does_not_flag_the_page():
+    html = (
+        '<style>.container404 { margin: auto; }</style>'
+        '<script>if (document.querySelector(".container404")) { track(); }</script>'
+        '<div class="layout2_code"><h1>99213, Office visit</h1></div>'
+    )
+    assert classify_page(html, '/cpt-codes/99213/') == PAGE_KIND_ACTIVE_CPT
@@ -0,0 +1,49 @@
+from utils.retry_queue import RetryQueue
+
+def test_entries_skipped_on_last_attempt_stay_pending():
+    queue = RetryQueue(max_attempts=2, base_delay=0)
+    for key in ('a', 'b', 'c'):
+        queue.add(key, {'navigation': 'timeout'})
+    handled = []
+
+    def handler(entry):
+        handled.append(entry['key'])
+        return None, {'navigation': 'timeout'}
+
+    # 'a', 'b', 'c' na 1ª tentativa e 'a' na 2ª; depois disso o prazo acaba
+    completed, exhausted = queue.process(handler, should_stop=lambda: len(handled) >= 4)
+
+    assert completed == []
+    assert [entry['key'] for entry in exhausted] == ['a']
+    assert [entry['key'] for entry in queue.entries()] == ['b', 'c']
+
+def test_exhausted_after_max_attempts():
+    queue = RetryQueue(max_attempts=2, base_delay=0)
+    queue.add('a', {'icd10_cm': 'timeout'}, partial='partial')
+    queue.add('b', {'icd10_cm': 'timeout'})
+
+    def handler(entry):
+        if entry['key'] == 'b':
+            return 'b', {}
+        return 'partial 2', {'icd10_cm': 'timeout'}
+
+    completed, exhausted = queue.process(handler)
+
+    assert completed == ['b']
+    assert [(entry['key'], entry['partial']) for entry in exhausted] == [('a', 'partial 2')]
+    assert queue.entries() == []
+
+def test_backoff_wait_stops_with_the_run_budget():
+    queue = RetryQueue(max_attempts=3, base_delay=120)
+    queue.add('a', {'navigation': 'timeout'})
+    stopped = []
+
+    def wait(seconds):
+        # o prazo acaba durante o backoff
+        stopped.append(seconds)
+
+    completed, exhausted = queue.process(lambda entry: (None, {}), should_stop=lambda: bool(stopped), wait=wait)
+
+    assert stopped == [120]
+    assert (completed, exhausted) == ([], [])
+    assert [entry['key'] for entry in queue.entries()] == ['a']
@@ -0,0 +1,23 @@
+import pandas as pd
+
+from procedure_records import ProcedureCodeRecord, records_frame, with_row_metadata
+from utils.scheduler import prioritize_codes
+
+def test_fingerprint_covers_tab_columns():
+    base = ProcedureCodeRecord(code='99213', short_description='Office visit', modifiers=['25'], icd10_cm=['A00.0'])
+    same = ProcedureCodeRecord(code='99213', short_description='Office visit', modifiers=['25'], icd10_cm=['A00.0'])
+    tab_changed = ProcedureCodeRecord(code='99213', short_description='Office visit', modifiers=['25'], icd10_cm=['A00.0', 'A00.1'])
+    page_changed = ProcedureCodeRecord(code='99213', short_description='Office visit, new', modifiers=['25'], icd10_cm=['A00.0'])
+    df = with_row_metadata(records_frame([base, same, tab_changed, page_changed], ProcedureCodeRecord), '2026-01-01 00:00:00')
+    fingerprints = df['content_fingerprint'].tolist()
+    assert fingerprints[0] == fingerprints[1]
+    assert len(set(fingerprints)) == 3
+    assert (df['crawled_at'] == pd.Timestamp('2026-01-01')).all()
+
+def test_new_and_changing_codes_come_first():
+    now = pd.Timestamp('2026-01-31', tz='UTC')
+    df_history = pd.DataFrame([
+        {'code': 'stable', 'last_crawled_at': '2026-01-30', 'crawl_count': 10, 'change_count': 0, 'is_deleted': False},
+        {'code': 'changing', 'last_crawled_at': '2026-01-30', 'crawl_count': 10, 'change_count': 9, 'is_deleted': False},
+    ])
+    assert prioritize_codes(['stable', 'changing', 'new'], df_history, now=now) == ['new', 'changing', 'stable']
@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+import procedure_code
+from procedure_records import ModifierRecord, NdcRecord, ProcedureCodeRecord
+from utils.validation import OutputValidator
+
+def code_record(code, modifiers, ndcs, short_description='Office visit'):
+    return ProcedureCodeRecord(
+        code=code, code_type='CPT', short_description=short_description,
+        modifiers=modifiers, ndc_alternate_id=ndcs
+    )
+
+def test_quarantined_code_takes_its_modifiers_and_ndcs_out_of_the_flush(monkeypatch):
+    monkeypatch.setattr(procedure_code, 'CONFIG', SimpleNamespace(VALIDATION_QUARANTINE_PATH=None))
+    ctx = SimpleNamespace(validator=OutputValidator(['code', 'code_type', 'short_description']), budget=None)
+    procedure_codes = [
+        code_record('99213', ['25', '59'], ['12345-678-90']),
+        code_record('99214', ['59', 'GT'], ['00002-1433-80'], short_description=''),
+    ]
+    modifiers = [ModifierRecord('25', 'a'), ModifierRecord('59', 'b'), ModifierRecord('59', 'b'), ModifierRecord('GT', 'c')]
+    ndcs = [NdcRecord('12345-678-90', 'x', 'y', '1', 'mg'), NdcRecord('00002-1433-80', 'x', 'y', '1', 'mg')]
+
+    accepted, modifiers, ndcs, quarantined = procedure_code.validate_outputs(ctx, procedure_codes, modifiers, ndcs, 'chunk')
+
+    assert [record.code for record in accepted] == ['99213']
+    assert [modifier.modifier for modifier in modifiers] == ['25', '59', '59']
+    assert [ndc.ndc_alternate_id for ndc in ndcs] == ['12345-678-90']
+    assert list(quarantined) == ['99214']
+
+def test_quarantined_code_is_retried_from_the_page():
+    assert procedure_code.retry_stages({'validation': 'missing short_description'}) is None